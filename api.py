@@ -0,0 +1,163 @@
+"""Headless JSON API for rosters and drafts, for bots and other tools.
+
+Rosters are the shared WAL-mode SQLite files from roster_store, so the API
+and Streamlit sessions attached to a roster see each other's changes. Run with:
+
+    uvicorn api:app --port 8000
+"""
+import random
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+import database as db
+import roster_store
+from ban_engine import generate_bans
+from draft_creator import split_teams, randomize_roles
+
+def get_pool(roster: str, create: bool = False) -> roster_store.ConnectionPool:
+    try:
+        return roster_store.get_pool(roster, create)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Roster '{roster}' not found.")
+
+# Read responses kept, least recently used dropped first (entries of deleted rosters age out too)
+MAX_CACHED_READS = 1024
+
+# Read responses, keyed by (roster, request key) -> (data_version, payload), oldest use first
+_cache: "OrderedDict[Tuple[str, str], Tuple[int, object]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cached_read(roster: str, key: str, read):
+    """Run read(conn) on a pooled connection unless the roster is unchanged since the last run."""
+    pool = get_pool(roster)
+    version = pool.data_version()
+    with _cache_lock:
+        hit = _cache.get((roster, key))
+        if hit is not None and hit[0] == version:
+            _cache.move_to_end((roster, key))
+            return hit[1]
+    with pool.connection() as conn:
+        payload = read(conn)
+    with _cache_lock:
+        _cache[(roster, key)] = (version, payload)
+        _cache.move_to_end((roster, key))
+        while len(_cache) > MAX_CACHED_READS:
+            _cache.popitem(last=False)
+    return payload
+
+def _write(roster: str, write):
+    with get_pool(roster).connection() as conn:
+        return write(conn)
+
+class PlayerIn(BaseModel):
+    name: str
+    rank: str
+    primary_champion_1: Optional[str] = None
+    primary_champion_2: Optional[str] = None
+    primary_champion_3: Optional[str] = None
+    notes: Optional[str] = None
+    opgg_link: Optional[str] = None
+
+class DraftRequest(BaseModel):
+    player_ids: List[int]
+    skill_balancing: bool = False
+    # Same limits as the draft pages
+    num_bans: int = Field(10, ge=0, le=20)
+    additional_random_bans: int = Field(0, ge=0, le=10)
+    weighted_bans: bool = True
+
+def _check_rank(player: PlayerIn):
+    if player.rank not in db.RANK_VALUES:
+        raise HTTPException(status_code=422, detail=f"Unknown rank '{player.rank}'.")
+
+app = FastAPI(title="LoL Custom Game Organizer API")
+
+@app.get("/rosters")
+async def list_rosters() -> List[str]:
+    return roster_store.list_rosters()
+
+@app.put("/rosters/{roster}", status_code=201)
+async def create_roster(roster: str):
+    await run_in_threadpool(_write_schema, roster)
+    return {"roster": roster}
+
+def _write_schema(roster: str):
+    pool = get_pool(roster, create=True)
+    with pool.connection() as conn:
+        db.init_db(conn)
+
+@app.get("/rosters/{roster}/players")
+async def list_players(roster: str) -> List[Dict]:
+    return await run_in_threadpool(_cached_read, roster, "players", db.get_all_players)
+
+@app.get("/rosters/{roster}/players/{player_id}")
+async def get_player(roster: str, player_id: int) -> Dict:
+    player = await run_in_threadpool(
+        _cached_read, roster, f"player:{player_id}", lambda conn: db.get_player_by_id(player_id, conn=conn)
+    )
+    if player is None:
+        raise HTTPException(status_code=404, detail=f"Player {player_id} not found.")
+    return player
+
+@app.post("/rosters/{roster}/players", status_code=201)
+async def add_player(roster: str, player: PlayerIn) -> Dict:
+    _check_rank(player)
+    added = await run_in_threadpool(_write, roster, lambda conn: db.add_player(**player.model_dump(), conn=conn))
+    if not added:
+        raise HTTPException(status_code=409, detail=f"A player named '{player.name}' already exists.")
+    return {"name": player.name}
+
+@app.put("/rosters/{roster}/players/{player_id}")
+async def update_player(roster: str, player_id: int, player: PlayerIn) -> Dict:
+    _check_rank(player)
+
+    def write(conn):
+        if db.get_player_by_id(player_id, conn=conn) is None:
+            raise HTTPException(status_code=404, detail=f"Player {player_id} not found.")
+        return db.update_player(player_id, **player.model_dump(), conn=conn)
+
+    if not await run_in_threadpool(_write, roster, write):
+        raise HTTPException(status_code=409, detail=f"A player named '{player.name}' already exists.")
+    return {"id": player_id}
+
+@app.delete("/rosters/{roster}/players/{player_id}", status_code=204)
+async def delete_player(roster: str, player_id: int):
+    def write(conn):
+        if db.get_player_by_id(player_id, conn=conn) is None:
+            raise HTTPException(status_code=404, detail=f"Player {player_id} not found.")
+        return db.delete_player(player_id, conn=conn)
+
+    if not await run_in_threadpool(_write, roster, write):
+        raise HTTPException(status_code=500, detail=f"Could not delete player {player_id}.")
+    return Response(status_code=204)
+
+@app.post("/rosters/{roster}/drafts")
+async def create_draft(roster: str, request: DraftRequest) -> Dict:
+    """Split the given players into two teams with captains, roles and bans."""
+    if len(request.player_ids) != 10 or len(set(request.player_ids)) != 10:
+        raise HTTPException(status_code=422, detail="A draft needs exactly 10 distinct players.")
+    players_by_id = {p['id']: p for p in await list_players(roster)}
+    missing = [pid for pid in request.player_ids if pid not in players_by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown player ids: {missing}")
+    players = [players_by_id[pid] for pid in request.player_ids]
+
+    team_a, team_b = split_teams(players, request.skill_balancing)
+    if len(team_a) != len(team_b):
+        raise HTTPException(status_code=500, detail=f"Teams came out {len(team_a)}v{len(team_b)}.")
+    return {
+        "team_a": team_a,
+        "team_b": team_b,
+        "team_a_captain": random.choice(team_a)['name'],
+        "team_b_captain": random.choice(team_b)['name'],
+        "team_a_roles": randomize_roles(team_a),
+        "team_b_roles": randomize_roles(team_b),
+        "bans": generate_bans(players, request.num_bans, request.additional_random_bans, request.weighted_bans),
+    }
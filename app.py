@@ -9,9 +9,10 @@ import database as db
 from player_management import show_player_management
 from draft_creator import show_draft_creator
 from manual_draft import show_manual_draft
+from tournament import show_tournament_planner
 
 # Tab navigation at the top
-TABS = ["Player Management", "Draft Creator", "Manual Draft"]
+TABS = ["Player Management", "Draft Creator", "Manual Draft", "Tournament Planner"]
 
 # Use st.query_params to track the active tab (for future extensibility, but not for sidebar logic)
 query_params = st.query_params
@@ -51,4 +52,6 @@ with tab_objs[2]:
         """,
         unsafe_allow_html=True
     )
-    show_manual_draft() 
\ No newline at end of file
+    show_manual_draft()
+with tab_objs[3]:
+    show_tournament_planner()
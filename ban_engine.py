@@ -0,0 +1,71 @@
+import random
+from collections import Counter
+from heapq import nlargest
+from typing import List, Dict, Tuple
+import database as db
+
+CHAMPION_FIELDS = ('primary_champion_1', 'primary_champion_2', 'primary_champion_3')
+
+_champions: Tuple[str, ...] = ()
+
+def champion_pool() -> Tuple[str, ...]:
+    """All champion names, read from champions.csv once per process.
+
+    A missing or empty file isn't remembered, so it is read again on the next call.
+    """
+    global _champions
+    if not _champions:
+        _champions = tuple(db.get_champions())
+    return _champions
+
+def champion_frequencies(players: List[Dict]) -> Counter:
+    """Count how many of the given players have each champion in their primary pool."""
+    counts = Counter()
+    for player in players:
+        # A champion listed twice by the same player still only counts once
+        counts.update({player[field] for field in CHAMPION_FIELDS if player.get(field)})
+    return counts
+
+def weighted_sample(weights: Dict[str, int], k: int, rng=random) -> List[str]:
+    """Sample up to k keys without replacement, with probability proportional to their weight.
+
+    Uses the Efraimidis-Spirakis method: every key draws u ** (1 / weight) and the
+    k largest draws win, which is a single pass plus a size-k heap.
+    """
+    return nlargest(k, weights, key=lambda item: rng.random() ** (1.0 / weights[item]))
+
+class BanEngine:
+    """Ban generator for one set of selected players."""
+
+    def __init__(self, players: List[Dict]):
+        self.frequencies = champion_frequencies(players)
+
+    def pool_bans(self, num_bans: int, weighted: bool = True, rng=random) -> List[str]:
+        """Pick bans from the players' primary champions."""
+        if weighted:
+            return weighted_sample(self.frequencies, num_bans, rng)
+        pool = list(self.frequencies)
+        return rng.sample(pool, min(num_bans, len(pool)))
+
+    def random_bans(self, count: int, exclude: List[str], rng=random) -> List[str]:
+        """Pick random bans from the full champion list, skipping champions already banned.
+
+        Draws `count` more champions than there are exclusions and keeps the
+        first `count` not excluded, which is still a uniform sample of the rest.
+        """
+        pool = champion_pool()
+        excluded = set(exclude)
+        draws = rng.sample(pool, min(len(pool), count + len(excluded)))
+        return [champ for champ in draws if champ not in excluded][:count]
+
+    def generate(self, num_bans: int, additional_random_bans: int = 0,
+                 weighted: bool = True, rng=random) -> List[str]:
+        bans = self.pool_bans(num_bans, weighted, rng)
+        if additional_random_bans > 0:
+            bans.extend(self.random_bans(additional_random_bans, bans, rng))
+        return bans
+
+def generate_bans(players: List[Dict], num_bans: int, additional_random_bans: int = 0,
+                  weighted: bool = True) -> List[str]:
+    """Generate champion bans from players' primary champions, topped up with random bans."""
+    return BanEngine(players).generate(num_bans, additional_random_bans, weighted)
@@ -0,0 +1,144 @@
+"""Load-test the JSON API with a local, dependency-free load generator.
+
+Starts `uvicorn api:app` on a free port against a temporary roster directory,
+seeds a roster, then hammers it from keep-alive client threads and reports
+throughput and latency percentiles per endpoint. Drafts whose teams differ in
+size count as errors; a lopsided lobby (one Challenger, nine Iron) is always
+drafted once with skill balancing, since greedy balancing used to split it 4v6.
+
+    python benchmarks/bench_api.py --players 200 --clients 16 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RANKS = ['Iron', 'Bronze', 'Silver', 'Gold', 'Platinum', 'Emerald', 'Diamond', 'Master', 'Grandmaster', 'Challenger']
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def request(conn, method, path, body=None):
+    payload = json.dumps(body) if body is not None else None
+    conn.request(method, path, payload, {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, data
+
+def wait_for_server(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            request(conn, "GET", "/rosters")
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("API server did not start")
+
+def seed(port, roster, players):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    request(conn, "PUT", f"/rosters/{roster}")
+    for i in range(players):
+        request(conn, "POST", f"/rosters/{roster}/players", {"name": f"Player{i}", "rank": random.choice(RANKS)})
+    _, data = request(conn, "GET", f"/rosters/{roster}/players")
+    return [p['id'] for p in json.loads(data)]
+
+def even_teams(status, data) -> bool:
+    if status >= 400:
+        return True
+    draft = json.loads(data)
+    return len(draft["team_a"]) == len(draft["team_b"])
+
+def check_lopsided_lobby(port, roster) -> bool:
+    """Draft one Challenger and nine Iron players with skill balancing and check the teams are 5v5."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    request(conn, "PUT", f"/rosters/{roster}")
+    for i, rank in enumerate(['Challenger'] + ['Iron'] * 9):
+        request(conn, "POST", f"/rosters/{roster}/players", {"name": f"Lopsided{i}", "rank": rank})
+    _, data = request(conn, "GET", f"/rosters/{roster}/players")
+    ids = [p['id'] for p in json.loads(data)]
+    status, data = request(conn, "POST", f"/rosters/{roster}/drafts", {"player_ids": ids, "skill_balancing": True})
+    return status == 200 and even_teams(status, data)
+
+def client(port, roster, ids, write_ratio, stop, results):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    while not stop.is_set():
+        roll = random.random()
+        if roll < write_ratio:
+            kind, method, path = "update", "PUT", f"/rosters/{roster}/players/{random.choice(ids)}"
+            pid = int(path.rsplit("/", 1)[1])
+            body = {"name": f"Player{pid}-{random.randrange(10**6)}", "rank": random.choice(RANKS)}
+        elif roll < 0.5:
+            kind, method, path, body = "players", "GET", f"/rosters/{roster}/players", None
+        else:
+            kind, method, path = "draft", "POST", f"/rosters/{roster}/drafts"
+            body = {"player_ids": random.sample(ids, 10), "skill_balancing": True}
+        start = time.perf_counter()
+        status, data = request(conn, method, path, body)
+        elapsed = time.perf_counter() - start
+        if kind == "draft" and not even_teams(status, data):
+            status = 500
+        results.append((kind, elapsed, status))
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as roster_dir:
+        env = dict(os.environ, LOL_ROSTER_DIR=roster_dir)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env
+        )
+        try:
+            wait_for_server(port)
+            lopsided_ok = check_lopsided_lobby(port, "lopsided")
+            ids = seed(port, "bench", args.players)
+            stop = threading.Event()
+            results = []
+            threads = [threading.Thread(target=client, args=(port, "bench", ids, args.write_ratio, stop, results))
+                       for _ in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{len(results)} requests in {args.seconds:.0f}s from {args.clients} clients: "
+          f"{len(results) / args.seconds:.0f} req/s")
+    errors = [r for r in results if r[2] >= 400]
+    print(f"errors: {len(errors)}")
+    print(f"lopsided lobby split evenly: {'yes' if lopsided_ok else 'NO'}")
+    for kind in sorted({r[0] for r in results}):
+        latencies = [r[1] * 1000 for r in results if r[0] == kind]
+        print(f"{kind:8} n={len(latencies):6}  mean={statistics.mean(latencies):6.2f}ms  "
+              f"p50={percentile(latencies, 50):6.2f}ms  p95={percentile(latencies, 95):6.2f}ms  "
+              f"p99={percentile(latencies, 99):6.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Time the import dedupe pipeline on a synthetic combined roster.
+
+Builds --players distinct players and copies about --duplicate-rate of them
+with the kinds of differences organizers' sheets have: case and spacing,
+Riot #tags, one-letter typos and the same OP.GG link written differently.
+Reports the time per pipeline stage, the number of pairs compared against
+all-pairs comparison, precision/recall against the known copies, and the
+time to merge every group in one transaction.
+
+    python benchmarks/bench_dedupe.py --players 50000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # champions.csv is read relative to the repo root
+
+import database as db
+import dedupe
+
+SYLLABLES = ("ka ri no shi ta ze lo mu vex dra kon fel ix ar th or bel sky fox ash nyx zen rio ul tra "
+             "mo ga ne vi lux ro sa wolf storm blade frost night shadow king fire ice moon sun dark "
+             "light jin yu hao min woo seo ran kei taro pix byte crow raven ghost echo nova bolt").split()
+
+def make_name(rng: random.Random) -> str:
+    name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    if rng.random() < 0.3:
+        name += str(rng.randint(1, 999))
+    return name.capitalize() if rng.random() < 0.5 else name
+
+def variant(name: str, rng: random.Random) -> str:
+    kind = rng.randrange(4)
+    if kind == 0:
+        return f"  {name.upper()} "
+    if kind == 1:
+        return f"{name}#{rng.choice(['EUW', 'NA1', 'KR1'])}"
+    if kind == 2 and len(name) >= dedupe.MIN_FUZZY_LENGTH:
+        i = rng.randrange(1, len(name))
+        return name[:i] + rng.choice("aeiou") + name[i + 1:]
+    return name[:1] + " " + name[1:]
+
+def make_roster(players: int, duplicate_rate: float, seed: int):
+    """Rows as [name, rank, champions..., notes, link] plus the set of true duplicate pairs."""
+    rng = random.Random(seed)
+    champions = db.get_champions()
+    names, seen = [], set()
+    while len(names) < players:
+        name = make_name(rng)
+        if dedupe.normalize_name(name) not in seen:
+            seen.add(dedupe.normalize_name(name))
+            names.append(name)
+    rows = []
+    for name in names:
+        link = f"https://www.op.gg/summoners/euw/{name}-EUW" if rng.random() < 0.5 else None
+        rows.append([name, rng.choice(list(db.RANK_VALUES)), *rng.sample(champions, 3), None, link])
+    truth, taken = set(), set(names)
+    for original in rng.sample(range(players), int(players * duplicate_rate)):
+        name, link = rows[original][0], rows[original][6]
+        if link and rng.random() < 0.3:
+            # Same account, name typed differently, link in another format
+            copy = [f"{name}_alt", rows[original][1], None, None, None, "from sheet 2",
+                    link.replace("https://www.", "").upper()]
+        else:
+            copy = [variant(name, rng), rows[original][1], None, None, None, "from sheet 2", None]
+        if copy[0] in taken:
+            continue
+        taken.add(copy[0])
+        rows.append(copy)
+        # Rows are inserted in order, so ids are list positions + 1
+        truth.add((original + 1, len(rows)))
+    return rows, truth
+
+def pairs_of(groups):
+    return {(a, b) for group in groups for i, a in enumerate(group) for b in group[i + 1:]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=50000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows, truth = make_roster(args.players, args.duplicate_rate, args.seed)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    db.create_schema(conn)
+    conn.executemany(
+        "INSERT INTO players (name, rank, primary_champion_1, primary_champion_2, primary_champion_3, notes, opgg_link) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    records = [tuple(r) for r in conn.execute("SELECT id, name, opgg_link FROM players ORDER BY id")]
+    n = len(records)
+    print(f"{n} rows ({n - args.players} planted copies)")
+
+    start = time.perf_counter()
+    names = [dedupe.normalize_name(name) for _, name, _ in records]
+    links = [dedupe.normalize_opgg(link) for _, _, link in records]
+    normalized = time.perf_counter()
+    candidates = dedupe.candidate_pairs(names, links)
+    blocked = time.perf_counter()
+    accepted = sum(dedupe.match_score(names[i], names[j], links[i], links[j]) >= dedupe.MATCH_THRESHOLD
+                   for i, j in candidates)
+    scored = time.perf_counter()
+    print(f"normalize {1000 * (normalized - start):.0f} ms, block {1000 * (blocked - normalized):.0f} ms, "
+          f"score {1000 * (scored - blocked):.0f} ms; {accepted} of {len(candidates):,} candidate pairs accepted "
+          f"(all pairs would be {n * (n - 1) // 2:,})")
+
+    start = time.perf_counter()
+    groups = dedupe.find_duplicates(records)
+    found_ms = (time.perf_counter() - start) * 1000
+    found = pairs_of(groups)
+    true_found = len(found & truth)
+    print(f"find_duplicates: {found_ms:.0f} ms, {len(groups)} groups; "
+          f"precision {true_found / max(1, len(found)):.3f}, recall {true_found / max(1, len(truth)):.3f}")
+
+    start = time.perf_counter()
+    removed = db.merge_players(groups, conn=conn)
+    print(f"merge_players: {(time.perf_counter() - start) * 1000:.0f} ms in one transaction, {removed} rows removed")
+
+    # For scale: naive all-pairs scoring on a slice, extrapolated
+    sample = 2000
+    start = time.perf_counter()
+    for i in range(sample):
+        for j in range(i + 1, sample):
+            dedupe.jaro_winkler(names[i], names[j])
+    per_pair = (time.perf_counter() - start) / (sample * (sample - 1) / 2)
+    print(f"all-pairs Jaro-Winkler would take ~{per_pair * n * (n - 1) / 2:.0f} s for {n} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time the draft event log: appends, undo, and encoding a draft for sharing.
+
+Plays --drafts random manual drafts (select, captains, eight picks, roles,
+bans) and a draft with --rerolls captain changes and re-picks, to show that
+append and undo cost the same however long the log gets.
+
+    python benchmarks/bench_draft_log.py --drafts 2000 --rerolls 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from draft_log import DraftLog, ROLES, SELECT, CAPTAINS, PICK, ROLE_SET, BANS
+
+def play_draft(log: DraftLog, rng: random.Random, roster: int):
+    ids = tuple(sorted(rng.sample(range(1, roster + 1), 10)))
+    log.append((SELECT, ids), (CAPTAINS, ids[0], ids[1]))
+    for i in range(8):
+        side = 'a' if i % 2 == 0 else 'b'
+        log.append((PICK, side, rng.choice(log.state.pool)))
+    for side in 'ab':
+        log.append((ROLE_SET, tuple(zip(log.state.team(side), rng.sample(ROLES, 5))), ""))
+    log.append((BANS, tuple(f"Champion{rng.randint(1, 160)}" for _ in range(10))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drafts", type=int, default=2000)
+    parser.add_argument("--rerolls", type=int, default=500)
+    parser.add_argument("--roster", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    times, sizes, decode_times = [], [], []
+    for _ in range(args.drafts):
+        log = DraftLog()
+        start = time.perf_counter()
+        play_draft(log, rng, args.roster)
+        times.append((time.perf_counter() - start) / len(log))
+        code = log.encode()
+        sizes.append(len(code))
+        start = time.perf_counter()
+        assert DraftLog.decode(code).state == log.state
+        decode_times.append(time.perf_counter() - start)
+    print(f"{args.drafts} drafts: {statistics.median(times) * 1e6:.1f} us per event appended; "
+          f"share code {statistics.median(sizes):.0f} chars (max {max(sizes)}); "
+          f"decode + replay {statistics.median(decode_times) * 1000:.2f} ms")
+
+    # One long draft: captains changed and the picks redone many times
+    log = DraftLog()
+    play_draft(log, rng, args.roster)
+    for length in (0, args.rerolls):
+        while len(log) < length:
+            log.append((CAPTAINS, *rng.sample(log.state.selected, 2)))
+            for i in range(8):
+                log.append((PICK, 'a' if i % 2 == 0 else 'b', rng.choice(log.state.pool)))
+        start = time.perf_counter()
+        for _ in range(100):
+            log.append((CAPTAINS, *rng.sample(log.state.selected, 2)))
+            log.undo()
+        elapsed = (time.perf_counter() - start) / 100
+        print(f"log of {len(log):>5} events: append + undo {elapsed * 1e6:.1f} us, "
+              f"share code {len(log.encode())} chars")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare roster export formats by size and time, and time importing each back.
+
+Builds a synthetic roster (long free-text notes, repeated champion names and
+links, like a real community roster) and reports each format against the
+raw .db export:
+
+    python benchmarks/bench_export.py --players 20000
+"""
+import argparse
+import io
+import os
+import random
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # champions.csv is read relative to the repo root
+
+import database as db
+import roster_io
+
+WORDS = ("plays mostly jungle and support, prefers early skirmishes, shotcalls in voice, "
+         "available weekends, duo with friends, learning new champions, tilts after losses").split()
+
+def make_roster(players: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    champions = db.get_champions()
+    conn = sqlite3.connect(":memory:")
+    db.create_schema(conn)
+    conn.executemany(
+        "INSERT INTO players (name, rank, primary_champion_1, primary_champion_2, primary_champion_3, notes, opgg_link) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"Summoner{i}", rng.choice(list(db.RANK_VALUES)), *rng.sample(champions, 3),
+          " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60))),
+          f"https://www.op.gg/summoners/na/Summoner{i}-NA1") for i in range(players))
+    )
+    conn.commit()
+    data = db.connection_to_bytes(conn)
+    conn.close()
+    return data
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    raw = make_roster(args.players, args.seed)
+    conn = sqlite3.connect(":memory:")
+    conn.deserialize(raw)
+    writers = {
+        ".db.gz": lambda out: roster_io.write_db_image(raw, out, "gzip"),
+        ".jsonl.gz": lambda out: roster_io.write_jsonl(conn, out),
+    }
+    if roster_io.zstandard is not None:
+        writers[".db.zst"] = lambda out: roster_io.write_db_image(raw, out, "zstd")
+    if roster_io.pq is not None:
+        writers[".parquet"] = lambda out: roster_io.write_parquet(conn, out)
+
+    print(f"{args.players} players, raw .db export: {len(raw) / 1024:.0f} KB")
+    print(f"{'format':<10} {'size KB':>9} {'vs raw':>7} {'export ms':>10} {'import ms':>10}")
+    for extension, write in writers.items():
+        out = io.BytesIO()
+        start = time.perf_counter()
+        write(out)
+        export_ms = (time.perf_counter() - start) * 1000
+        data = out.getvalue()
+        start = time.perf_counter()
+        roster_io.read_roster_upload(io.BytesIO(data))
+        import_ms = (time.perf_counter() - start) * 1000
+        print(f"{extension:<10} {len(data) / 1024:>9.0f} {len(data) / len(raw):>6.0%} "
+              f"{export_ms:>10.1f} {import_ms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Time the manual draft's pick advisor and show how even its drafts end.
+
+Plays --lobbies random 10-player drafts with both captains following the
+advice, both taking the best-ranked player left, both picking at random, and
+Team A picking at random or best-ranked against an advised Team B. Reports
+the mean rank-total gap between the final teams and the advice time per pick.
+Then times a first pick in bigger pools, where iterative deepening stops at
+the time budget.
+
+    python benchmarks/bench_pick_advisor.py --lobbies 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pick_advisor import TIME_BUDGET, advise, next_side
+
+CHAMPIONS = [f"Champion{i}" for i in range(160)]
+
+def make_lobby(rng: random.Random, size: int):
+    values = [rng.randint(1, 10) for _ in range(size)]
+    # Popular champions show up in many pools, as in real rosters
+    champions = [[CHAMPIONS[int(rng.paretovariate(1.2)) % len(CHAMPIONS)] for _ in range(3)] for _ in range(size)]
+    return values, champions
+
+def play(values, champions, strategies: dict, rng: random.Random, times: list) -> int:
+    """Draft the lobby from captains 0 and 1 and return Team A's final rank-total lead."""
+    team_a, team_b = [0], [1]
+    pool = list(range(2, len(values)))
+    while pool:
+        side = next_side(len(team_a), len(team_b), len(values) // 2)
+        strategy = strategies[side]
+        if strategy == "advisor":
+            start = time.perf_counter()
+            pick = advise(values, champions, team_a, team_b)[0]
+            times.append(time.perf_counter() - start)
+        elif strategy == "best ranked":
+            pick = max(pool, key=values.__getitem__)
+        else:
+            pick = rng.choice(pool)
+        pool.remove(pick)
+        (team_a if side == 'a' else team_b).append(pick)
+    return sum(values[i] for i in team_a) - sum(values[i] for i in team_b)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lobbies", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    lobbies = [make_lobby(rng, 10) for _ in range(args.lobbies)]
+    for a, b in (("advisor", "advisor"), ("best ranked", "best ranked"), ("random", "random"),
+                 ("random", "advisor"), ("best ranked", "advisor")):
+        times = []
+        leads = [play(values, champions, {'a': a, 'b': b}, rng, times) for values, champions in lobbies]
+        line = (f"{a:>11} vs {b:<11}: mean gap {statistics.mean(map(abs, leads)):.2f} tiers, "
+                f"Team A leads by {statistics.mean(leads):+.2f}")
+        if times:
+            times.sort()
+            line += (f"; advice p50 {statistics.median(times) * 1000:.1f} ms, "
+                     f"p99 {times[int(len(times) * 0.99)] * 1000:.1f} ms, max {times[-1] * 1000:.1f} ms")
+        print(line)
+
+    print(f"First pick in bigger pools (budget {TIME_BUDGET * 1000:.0f} ms):")
+    for size in (12, 16, 20, 30, 40):
+        values, champions = make_lobby(rng, size)
+        start = time.perf_counter()
+        _, _, _, depth, exhaustive = advise(values, champions, [0], [1])
+        elapsed = time.perf_counter() - start
+        print(f"  {size:>2} players: {elapsed * 1000:.1f} ms, {depth} of {size - 2} picks searched"
+              f"{' (to the end)' if exhaustive else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Simulate many sessions sharing one server-side roster and check WAL behaviour.
+
+Each simulated session is a thread with a short think time between actions.
+One organizer repeatedly rewrites every player's rank in a single slow
+transaction while many viewer sessions read the roster, an exporter holds
+long read snapshots and a few editor sessions add players. The run fails
+(exit code 1) if:
+
+- a reader ever sees a half-applied bulk edit (mixed ranks),
+- no read ever completes while the organizer's transaction is still open
+  (i.e. readers wait for the writer instead of reading the last committed
+  snapshot),
+- the organizer can never commit while the exporter's snapshot is open
+  (i.e. readers block the writer), or
+- any added player is lost.
+
+    python benchmarks/bench_roster_concurrency.py --readers 50 --editors 4 --seconds 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RANKS = ['Iron', 'Bronze', 'Silver', 'Gold', 'Platinum', 'Emerald', 'Diamond', 'Master', 'Grandmaster', 'Challenger']
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=50)
+    parser.add_argument("--editors", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--hold", type=float, default=0.2, help="seconds the organizer holds each bulk-edit transaction")
+    args = parser.parse_args()
+
+    os.environ["LOL_ROSTER_DIR"] = tempfile.mkdtemp()
+    import database as db
+    import roster_store
+
+    pool = roster_store.create_roster("bench")
+    with pool.connection() as conn:
+        db.init_db(conn)
+        for i in range(args.players):
+            db.add_player(f"Player{i}", "Gold", conn=conn)
+
+    stop = threading.Event()
+    failures = []
+    read_latencies = []
+    probe_latencies = []
+    added = []
+    holding = threading.Event()
+    transactions = [0]
+    overlapped = [0]
+    commits_during_snapshot = [0]
+    bulk_edits = [0]
+
+    def organizer():
+        step = 0
+        while not stop.is_set():
+            step += 1
+            rank = RANKS[step % len(RANKS)]
+            with pool.connection() as conn:
+                with conn:
+                    conn.execute("UPDATE players SET rank = ? WHERE name LIKE 'Player%'", (rank,))
+                    # Keep the write transaction open, like a slow bulk edit
+                    transactions[0] += 1
+                    holding.set()
+                    time.sleep(args.hold)
+                    holding.clear()
+            bulk_edits[0] += 1
+            time.sleep(args.hold)
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            with pool.connection() as conn:
+                players = db.get_all_players(conn=conn)
+            read_latencies.append(time.perf_counter() - start)
+            ranks = {p['rank'] for p in players if p['name'].startswith('Player')}
+            if len(ranks) != 1:
+                failures.append(f"reader saw a partial bulk edit: {sorted(ranks)}")
+            time.sleep(0.01)
+
+    def probe():
+        # Times a cheap read while the organizer's write transaction is open
+        with pool.connection() as conn:
+            while not stop.is_set():
+                if not holding.wait(0.05):
+                    continue
+                transaction = transactions[0]
+                start = time.perf_counter()
+                conn.execute("SELECT COUNT(*) FROM players").fetchone()
+                probe_latencies.append(time.perf_counter() - start)
+                if holding.is_set() and transactions[0] == transaction:
+                    overlapped[0] += 1
+                time.sleep(0.01)
+
+    def exporter():
+        # Holds a read snapshot open for a while, like exporting a large roster
+        with pool.connection() as conn:
+            while not stop.is_set():
+                conn.execute("BEGIN")
+                before = conn.execute("SELECT rank FROM players WHERE name = 'Player0'").fetchone()[0]
+                commits = bulk_edits[0]
+                time.sleep(args.hold * 3)
+                commits_during_snapshot[0] += bulk_edits[0] - commits
+                after = conn.execute("SELECT rank FROM players WHERE name = 'Player0'").fetchone()[0]
+                conn.rollback()
+                if before != after:
+                    failures.append("exporter snapshot changed while it was open")
+                time.sleep(args.hold)
+
+    def editor(number):
+        count = 0
+        while not stop.is_set():
+            name = f"Editor{number}-{count}"
+            with pool.connection() as conn:
+                if db.add_player(name, "Silver", conn=conn):
+                    added.append(name)
+                else:
+                    failures.append(f"could not add {name}")
+            count += 1
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=organizer), threading.Thread(target=probe),
+               threading.Thread(target=exporter)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=editor, args=(n,)) for n in range(args.editors)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with pool.connection() as conn:
+        names = {p['name'] for p in db.get_all_players(conn=conn)}
+    lost = [name for name in added if name not in names]
+    if lost:
+        failures.append(f"{len(lost)} added players were lost")
+    if not commits_during_snapshot[0]:
+        failures.append("no bulk edit committed while the exporter's snapshot was open; readers are blocking the writer")
+    if not overlapped[0]:
+        failures.append("no read completed while a write transaction was open; readers are waiting on the writer")
+
+    ms = [latency * 1000 for latency in read_latencies]
+    print(f"{args.readers} readers, {args.editors} editors, 1 organizer, {args.seconds:.0f}s "
+          f"(pool size {roster_store.POOL_SIZE})")
+    print(f"bulk edits committed: {bulk_edits[0]} ({commits_during_snapshot[0]} during exporter snapshots), "
+          f"players added: {len(added)}")
+    print(f"reads: {len(ms)}  mean={statistics.mean(ms):.2f}ms  p50={percentile(ms, 50):.2f}ms  "
+          f"p99={percentile(ms, 99):.2f}ms  max={max(ms):.2f}ms")
+    if probe_latencies:
+        print(f"reads issued during open write transactions: {len(probe_latencies)} "
+              f"({overlapped[0]} completed before the commit)  max={max(probe_latencies) * 1000:.2f}ms")
+    if failures:
+        print("FAILED")
+        for failure in sorted(set(failures))[:10]:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
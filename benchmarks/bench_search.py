@@ -0,0 +1,85 @@
+"""Time roster searches with the FTS5/champion index against scanning the players table.
+
+    python benchmarks/bench_search.py --players 50000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # champions.csv is read relative to the repo root
+
+import database as db
+
+WORDS = ("support jungle mid top adc weekends weekdays evenings shotcaller chill tryhard duo "
+         "learning flex coach streamer newbie veteran").split()
+
+def make_roster(players: int, seed: int) -> sqlite3.Connection:
+    """A database without the search index, like one saved by an older version."""
+    rng = random.Random(seed)
+    champions = db.get_champions()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute('''CREATE TABLE players (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE,
+        rank TEXT NOT NULL, primary_champion_1 TEXT, primary_champion_2 TEXT, primary_champion_3 TEXT,
+        notes TEXT, opgg_link TEXT)''')
+    conn.executemany(
+        "INSERT INTO players (name, rank, primary_champion_1, primary_champion_2, primary_champion_3, notes) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"Summoner{i}", rng.choice(list(db.RANK_VALUES)), *rng.sample(champions, 3),
+          " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))) for i in range(players))
+    )
+    conn.commit()
+    return conn
+
+def timed(func, repeat: int = 20) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    conn = make_roster(args.players, args.seed)
+    start = time.perf_counter()
+    with conn:
+        db.create_search_index(conn)
+    print(f"{args.players} players; building the index on an existing roster: "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def scan(text, champion):
+        words = text.split()
+        return [p['id'] for p in db.get_all_players(conn=conn)
+                if all(w in (p['name'] + ' ' + (p['notes'] or '')).lower() for w in words)
+                and (not champion or champion in (p['primary_champion_1'], p['primary_champion_2'], p['primary_champion_3']))]
+
+    cases = [("shotcaller weekends", None), ("", "Thresh"), ("support", "Thresh"), ("summoner4999", None)]
+    print(f"{'query':<32} {'matches':>8} {'index ms':>9} {'scan ms':>9}")
+    for text, champion in cases:
+        matches = db._search(conn, text, champion)
+        index_ms = timed(lambda: db._search(conn, text, champion))
+        scan_ms = timed(lambda: scan(text, champion), repeat=3)
+        label = " + ".join(part for part in (repr(text) if text else "", champion or "") if part)
+        print(f"{label:<32} {len(matches):>8} {index_ms:>9.2f} {scan_ms:>9.1f}")
+
+    # Cost of keeping the index current on writes
+    player_id = args.players // 2
+    edit_ms = timed(lambda: db.update_player(player_id, f"Summoner{player_id}", "Gold", "Thresh", "Lux", None,
+                                             "support weekends", conn=conn))
+    rank_ms = timed(lambda: db.update_player_ranks({pid: "Iron" for pid in range(1, 501)}, conn=conn), repeat=5)
+    print(f"edit one player: {edit_ms:.2f} ms   update 500 ranks: {rank_ms:.2f} ms")
+    conn.execute("INSERT INTO players_fts (players_fts) VALUES ('integrity-check')")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Measure how much memory one browser session's state takes.
+
+Runs the app headless (Streamlit's AppTest) on a synthetic roster, drives the
+manual draft through to the ban phase and selects players on the other
+pages, then reports the deep size of each st.session_state entry. Objects
+shared between entries (e.g. player records referenced by both the player
+table and a draft) are counted once. The uploaded database image is
+reported separately because every session holds its own copy.
+
+With --viewers N it also opens N sessions that upload the same file and only
+look at it, and reports what each adds on top of the one shared copy kept in
+the upload store. One more viewer then drafts through to the bans, which
+records teammates, and must still be sharing the upload afterwards.
+
+    python benchmarks/bench_session_memory.py --players 2000 --viewers 20
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from collections.abc import Mapping
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the app reads champions.csv relative to the repo root
+
+from streamlit.testing.v1 import AppTest
+
+import database as db
+import upload_store
+
+def make_roster(players: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    champions = db.get_champions()
+    conn = sqlite3.connect(":memory:")
+    db.create_schema(conn)
+    conn.executemany(
+        "INSERT INTO players (name, rank, primary_champion_1, primary_champion_2, primary_champion_3, notes, opgg_link) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"Summoner{i}", rng.choice(list(db.RANK_VALUES)), *rng.sample(champions, 3),
+          "Mains support, available most weekends, prefers voice comms. " * rng.randint(1, 4),
+          f"https://www.op.gg/summoners/na/Summoner{i}-NA1") for i in range(players))
+    )
+    conn.commit()
+    data = db.connection_to_bytes(conn)
+    conn.close()
+    return data
+
+def deep_size(obj, seen: set) -> int:
+    """Size of obj and everything it references that hasn't been counted yet."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, Mapping):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_size(vars(obj), seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_size(getattr(obj, slot), seen)
+    return size
+
+def run_session(db_bytes: bytes, shared: bool = False) -> AppTest:
+    at = AppTest.from_file("app.py", default_timeout=60)
+    if shared:
+        # What load_db_file_to_session stores for an upload
+        at.session_state['shared_db'] = upload_store.get_store().add(db_bytes, prepare=db._prepare_upload)
+    else:
+        at.session_state['db_bytes'] = db_bytes
+    at.run()
+    names = [f"Summoner{i}" for i in range(10)]
+    at.multiselect(key="manual_selected_players").set_value(names).run()
+    for i in range(8):
+        at.button(key=f"manual_add_{'a' if i % 2 == 0 else 'b'}").click().run()
+    for side in 'ab':
+        at.button(key=f"manual_randomize_roles_{side}").click().run()
+    [b for b in at.button if b.label == "Generate Bans"][-1].click().run()
+    at.multiselect[0].set_value(names).run()
+    if at.exception:
+        raise RuntimeError([e.value for e in at.exception])
+    return at
+
+def viewer_sizes(db_bytes: bytes, viewers: int) -> list:
+    """Session state size of each of `viewers` sessions sharing one upload, not counting the shared data."""
+    store = upload_store.get_store()
+    sessions = []
+    for _ in range(viewers):
+        at = AppTest.from_file("app.py", default_timeout=60)
+        # What load_db_file_to_session stores for an upload
+        at.session_state['shared_db'] = store.add(db_bytes, prepare=db._prepare_upload)
+        at.run()
+        if at.exception:
+            raise RuntimeError([e.value for e in at.exception])
+        sessions.append(at)
+    handle = sessions[0].session_state['shared_db']
+    shared = set()
+    deep_size(store.get(handle), shared)
+    deep_size(store.cache(handle), shared)
+    return [sum(deep_size(value, set(shared)) for value in at.session_state.filtered_state.values())
+            for at in sessions]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--viewers", type=int, default=0)
+    args = parser.parse_args()
+
+    db_bytes = make_roster(args.players, args.seed)
+    at = run_session(db_bytes)
+    state = at.session_state.filtered_state
+    seen = {id(state.get('db_bytes'))}
+    sizes = {key: deep_size(value, seen) for key, value in state.items() if key != 'db_bytes'}
+
+    print(f"{args.players} players; session database image: {len(db_bytes) / 1024:.0f} KB")
+    print(f"{'session state key':<36} {'bytes':>10}")
+    for key, size in sorted(sizes.items(), key=lambda item: -item[1])[:15]:
+        print(f"{key:<36} {size:>10,}")
+    print(f"{'total (without database image)':<36} {sum(sizes.values()):>10,}  ({len(sizes)} keys)")
+    # For comparison: the same roster as the full player dicts the pages used to copy into state
+    conn = sqlite3.connect(":memory:")
+    conn.deserialize(db_bytes)
+    conn.row_factory = sqlite3.Row
+    full = [dict(row) for row in conn.execute("SELECT * FROM players")]
+    print(f"{'(full player dicts for whole roster)':<36} {deep_size(full, set()):>10,}")
+
+    if args.viewers:
+        sizes = viewer_sizes(db_bytes, args.viewers)
+        stats = upload_store.get_store().stats()
+        print(f"{args.viewers} viewer sessions of one upload: {sum(sizes) / len(sizes) / 1024:.1f} KB of state each "
+              f"(max {max(sizes) / 1024:.1f} KB); upload store holds {stats['uploads']} upload(s), "
+              f"{stats['bytes'] / 1024:.0f} KB, {stats['references']} references")
+        at = run_session(db_bytes, shared=True)
+        state = at.session_state.filtered_state
+        handle = state.get('shared_db')
+        shared = set()
+        deep_size(upload_store.get_store().get(handle), shared)
+        deep_size(upload_store.get_store().cache(handle), shared)
+        size = sum(deep_size(value, set(shared)) for value in state.values())
+        sharing = 'db_bytes' not in state and handle is not None
+        print(f"viewer who drafted and generated bans: {size / 1024:.1f} KB of state, "
+              f"{'still sharing the upload' if sharing else 'COPIED THE UPLOAD'} "
+              f"({len(state.get(db.PENDING_TEAMMATES_KEY, {}))} teammate pairs pending)")
+        if not sharing:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
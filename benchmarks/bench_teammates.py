@@ -0,0 +1,93 @@
+"""Time the teammate co-occurrence store and show its effect on team variety.
+
+Records --drafts random drafts over a --players roster, then times looking
+up ten players' counts and scoring all 126 splits, and compares a group of
+ten friends playing night after night with and without repeat avoidance.
+
+    python benchmarks/bench_teammates.py --players 5000 --drafts 20000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import database as db
+import teammates
+
+def timed(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def friends_night(nights: int, avoid: bool, seed: int):
+    """Ten friends drafting every night: (fewest, most) games any pair of them has shared."""
+    random.seed(seed)
+    counts = np.zeros((10, 10), dtype=np.int32)
+    for _ in range(nights):
+        if avoid:
+            on_team_a = teammates.pick_split([0] * 10, counts)
+        else:
+            on_team_a = np.zeros(10, dtype=bool)
+            on_team_a[random.sample(range(10), 5)] = True
+        for team in (on_team_a, ~on_team_a):
+            counts[np.ix_(team, team)] += 1
+    shared = counts[np.triu_indices(10, 1)]
+    return int(shared.min()), int(shared.max())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=5000)
+    parser.add_argument("--drafts", type=int, default=20000)
+    parser.add_argument("--nights", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    db.create_schema(conn)
+
+    def draft():
+        ids = rng.sample(range(1, args.players + 1), 10)
+        return [ids[:5], ids[5:]]
+
+    start = time.perf_counter()
+    for _ in range(args.drafts):
+        db.record_teammates(draft(), conn=conn)
+    elapsed = time.perf_counter() - start
+    pairs = conn.execute("SELECT count(*) FROM teammate_counts").fetchone()[0]
+    size = conn.execute("SELECT sum(pgsize) FROM dbstat WHERE name = 'teammate_counts'").fetchone()[0] \
+        if conn.execute("SELECT 1 FROM pragma_module_list WHERE name = 'dbstat'").fetchone() else None
+    print(f"{args.drafts} drafts recorded over {args.players} players: {elapsed / args.drafts * 1000:.2f} ms each; "
+          f"{pairs:,} pairs stored" + (f" in {size / 1024:.0f} KB" if size else "")
+          + f" (a dense matrix would hold {args.players ** 2:,} cells)")
+
+    # A draft between players who have history together
+    ids = [i for team in draft() for i in team]
+    db.record_teammates([ids[:5], ids[5:]], conn=conn)
+    lookup_ms = timed(lambda: teammates.pair_matrix(ids, db.get_teammate_counts(ids, conn=conn)), 200)
+    counts = teammates.pair_matrix(ids, db.get_teammate_counts(ids, conn=conn))
+    ranks = [rng.randint(1, 10) for _ in ids]
+    random_ms = timed(lambda: teammates.pick_split(ranks, counts), 200)
+    balanced_ms = timed(lambda: teammates.pick_split(ranks, counts, skill_balancing=True), 200)
+    print(f"10-player lookup {lookup_ms:.3f} ms; score all splits: random {random_ms:.3f} ms, "
+          f"balanced {balanced_ms:.3f} ms")
+
+    for avoid in (False, True):
+        fewest, most = friends_night(args.nights, avoid, args.seed)
+        print(f"{args.nights} nights, same 10 friends, {'avoiding repeats' if avoid else 'plain random':<16}: "
+              f"each pair were teammates {fewest}-{most} times (even would be {args.nights * 4 / 9:.1f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""Load-test the app with many concurrent browser-like sessions.
+
+Starts `streamlit run app.py` headless on a free port (or uses --url) and
+opens --sessions websocket sessions that talk to it the way the browser
+does. Each session scripts an organizer's evening:
+
+  upload a roster .db -> add a player -> Draft Creator (select ten players,
+  randomize teams, roles, bans) -> Manual Draft (select ten players, eight
+  picks, randomize roles, bans)
+
+Every step is timed from sending the widget change until the server
+reports the rerun finished (including any st.rerun() it triggered). The
+report gives p50/p95/p99 latency per step and overall, reruns per second
+and the server's memory.
+
+Each session uploads its own roster (players named after the session), and
+after every step it checks that the player list it is shown is its own.
+Seeing another session's players counts as an integrity error. With
+--shared-upload all sessions upload the same file instead.
+
+--save-baseline NAME writes the results to benchmarks/baselines/NAME.json,
+and --baseline PATH prints the change against a saved run.
+
+    python benchmarks/load_test.py --sessions 20 --save-baseline main
+    python benchmarks/load_test.py --sessions 20 --baseline benchmarks/baselines/main.json
+
+A server started elsewhere (--url) must run with
+--server.enableXsrfProtection=false so the harness can upload files.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+sys.path.insert(0, ROOT)
+
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.websocket import websocket_connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.Common_pb2 import FileURLsRequest
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+import database as db
+
+WIDGET_TYPES = {"button", "multiselect", "selectbox", "text_input", "text_area", "checkbox",
+                "number_input", "file_uploader", "download_button"}
+
+class ScriptError(Exception):
+    pass
+
+class Widget:
+    __slots__ = ("kind", "id", "proto")
+
+    def __init__(self, kind: str, proto):
+        self.kind = kind
+        self.id = proto.id
+        self.proto = proto
+
+    @property
+    def label(self) -> str:
+        return self.proto.label
+
+class AppSession:
+    """One browser tab: a websocket to the server plus the widgets of the last finished run."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.ws = None
+        self.session_id = ""
+        self.page_script_hash = ""
+        self.widgets: List[Widget] = []
+        self.exceptions: List[str] = []
+        self.script_runs = 0
+        self._cache: Dict[str, ForwardMsg] = {}
+
+    async def connect(self):
+        url = self.base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.ws = await websocket_connect(url, subprotocols=["streamlit"], max_message_size=256 * 1024 * 1024)
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def _send(self, msg: BackMsg):
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+
+    async def _receive(self) -> ForwardMsg:
+        data = await self.ws.read_message()
+        if data is None:
+            raise ConnectionError("The server closed the connection.")
+        msg = ForwardMsg()
+        msg.ParseFromString(data)
+        if msg.WhichOneof("type") == "ref_hash":
+            # A large message this session was sent before; the browser keeps a cache of them
+            msg = self._cache.get(msg.ref_hash) or await self._fetch_cached(msg.ref_hash)
+        elif msg.hash:
+            self._cache[msg.hash] = msg
+        return msg
+
+    async def _fetch_cached(self, ref_hash: str) -> ForwardMsg:
+        response = await AsyncHTTPClient().fetch(f"{self.base_url}/_stcore/message?hash={ref_hash}")
+        msg = ForwardMsg()
+        msg.ParseFromString(response.body)
+        self._cache[ref_hash] = msg
+        return msg
+
+    async def rerun(self, widget_states: List[WidgetState] = ()) -> float:
+        """Send widget changes and wait for the rerun (and any reruns it triggers) to finish. Returns seconds."""
+        state = ClientState(query_string="", page_script_hash=self.page_script_hash)
+        state.widget_states.widgets.extend(widget_states)
+        start = time.perf_counter()
+        await self._send(BackMsg(rerun_script=state))
+        while True:
+            msg = await self._receive()
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = msg.new_session.initialize.session_id or self.session_id
+                self.page_script_hash = msg.new_session.page_script_hash
+                self.widgets, self.exceptions = [], []
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type in WIDGET_TYPES:
+                    self.widgets.append(Widget(element_type, getattr(element, element_type)))
+                elif element_type == "exception":
+                    self.exceptions.append(f"{element.exception.type}: {element.exception.message}")
+            elif kind == "script_finished":
+                self.script_runs += 1
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        elapsed = time.perf_counter() - start
+        if self.exceptions:
+            raise ScriptError("; ".join(self.exceptions))
+        return elapsed
+
+    def find(self, kind: str, label: Optional[str] = None, key: Optional[str] = None,
+             prefix: Optional[str] = None, last: bool = False) -> Widget:
+        matches = [w for w in self.widgets if w.kind == kind
+                   and (label is None or w.label == label)
+                   and (prefix is None or w.label.startswith(prefix))
+                   and (key is None or w.id.endswith(f"-{key}"))]
+        if not matches:
+            raise LookupError(f"No {kind} with label={label or prefix!r} key={key!r} on the page")
+        return matches[-1] if last else matches[0]
+
+    async def click(self, button: Widget) -> float:
+        return await self.rerun([WidgetState(id=button.id, trigger_value=True)])
+
+    async def multiselect(self, widget: Widget, values: List[str]) -> float:
+        options = list(widget.proto.options)
+        state = WidgetState(id=widget.id)
+        state.int_array_value.data.extend(options.index(value) for value in values)
+        return await self.rerun([state])
+
+    async def upload(self, uploader: Widget, name: str, data: bytes) -> float:
+        """Upload a file the way the browser does: ask for an upload URL, PUT the file, then rerun."""
+        start = time.perf_counter()
+        request_id = uuid.uuid4().hex
+        await self._send(BackMsg(file_urls_request=FileURLsRequest(
+            request_id=request_id, file_names=[name], session_id=self.session_id)))
+        while True:
+            msg = await self._receive()
+            if msg.WhichOneof("type") == "file_urls_response" and msg.file_urls_response.response_id == request_id:
+                break
+        urls = msg.file_urls_response.file_urls[0]
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"UploadedFile\"; filename=\"{name}\"\r\n"
+                f"Content-Type: application/octet-stream\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        await AsyncHTTPClient().fetch(HTTPRequest(
+            self.base_url + urls.upload_url, method="PUT", body=body,
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}))
+        state = WidgetState(id=uploader.id)
+        info = state.file_uploader_state_value.uploaded_file_info.add()
+        info.file_id, info.name, info.size = urls.file_id, name, len(data)
+        info.file_urls.CopyFrom(urls)
+        await self.rerun([state])
+        return time.perf_counter() - start
+
+def make_roster(prefix: str, players: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    champions = db.get_champions()
+    conn = sqlite3.connect(":memory:")
+    db.create_schema(conn)
+    conn.executemany(
+        "INSERT INTO players (name, rank, primary_champion_1, primary_champion_2, primary_champion_3, notes) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"{prefix}P{i}", rng.choice(list(db.RANK_VALUES)), *rng.sample(champions, 3), "Plays most weekends")
+         for i in range(players)))
+    conn.commit()
+    data = db.connection_to_bytes(conn)
+    conn.close()
+    return data
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: List[str] = []
+        self.integrity_errors: List[str] = []
+        self.script_runs = 0
+        self.sessions_completed = 0
+
+async def run_flow(index: int, args, base_url: str, roster: bytes, prefix: str, results: Results):
+    rng = random.Random(args.seed * 1000 + index)
+    session = AppSession(base_url)
+
+    async def step(name: str, action):
+        await asyncio.sleep(rng.uniform(0, 2 * args.think))
+        results.latencies[name].append(await action)
+
+    def check_players():
+        """Every player this session is offered must come from its own roster."""
+        options = session.find("multiselect", key="draft_selected_players").proto.options
+        foreign = [name for name in options if not name.startswith(prefix)]
+        if foreign:
+            results.integrity_errors.append(f"session {index} was shown another roster's players, e.g. {foreign[0]}")
+        return list(options)
+
+    try:
+        await session.connect()
+        await step("initial load", session.rerun())
+        await step("upload roster", session.upload(session.find("file_uploader"), "roster.db", roster))
+        names = check_players()
+        await step("expand add form", session.click(session.find("button", key="expand_add_player_form")))
+        name_input = session.find("text_input", label="Player Name")
+        submit = session.find("button", label="Add Player")
+        await step("add player", session.rerun([WidgetState(id=name_input.id, string_value=f"{prefix}New{index}"),
+                                                WidgetState(id=submit.id, trigger_value=True)]))
+        check_players()
+
+        picks = rng.sample(names, 10)
+        await step("draft: select players", session.multiselect(
+            session.find("multiselect", key="draft_selected_players"), picks))
+        await step("draft: randomize teams", session.click(session.find("button", prefix="Randomize Teams")))
+        await step("draft: roles", session.click(session.find("button", key="randomize_all_roles")))
+        await step("draft: bans", session.click(session.find("button", label="Generate Bans")))
+        check_players()
+
+        await step("manual: select players", session.multiselect(
+            session.find("multiselect", key="manual_selected_players"), picks))
+        for pick in range(8):
+            side = "a" if pick % 2 == 0 else "b"
+            await step("manual: pick", session.click(session.find("button", key=f"manual_add_{side}")))
+        await step("manual: roles", session.click(session.find("button", label="Randomize Team A Roles")))
+        await step("manual: roles", session.click(session.find("button", label="Randomize Team B Roles")))
+        await step("manual: bans", session.click(session.find("button", label="Generate Bans", last=True)))
+        check_players()
+        results.sessions_completed += 1
+    except Exception as e:
+        results.errors.append(f"session {index}: {type(e).__name__}: {e}")
+    finally:
+        results.script_runs += session.script_runs
+        session.close()
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {"count": len(values), "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000, "p99_ms": percentile(values, 99) * 1000}
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port: int, log_path: str) -> subprocess.Popen:
+    command = [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless=true",
+               f"--server.port={port}", "--server.address=127.0.0.1", "--browser.gatherUsageStats=false",
+               "--server.fileWatcherType=none", "--server.enableXsrfProtection=false"]
+    log = open(log_path, "wb")
+    return subprocess.Popen(command, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+
+async def wait_for_server(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await AsyncHTTPClient().fetch(f"{base_url}/_stcore/health", raise_error=False)
+            if response.code == 200:
+                return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"The app at {base_url} did not come up within {timeout} s.")
+        await asyncio.sleep(0.25)
+
+async def run(args) -> Dict:
+    process = None
+    base_url = args.url.rstrip("/") if args.url else None
+    log_path = os.path.join(tempfile.gettempdir(), "load_test_server.log")
+    if base_url is None:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_server(port, log_path)
+    server_pid = process.pid if process else args.server_pid
+    try:
+        await wait_for_server(base_url)
+        # Load the app once so the first session doesn't pay for imports
+        warmup = AppSession(base_url)
+        await warmup.connect()
+        await warmup.rerun()
+        warmup.close()
+
+        rosters = []
+        for index in range(args.sessions):
+            prefix = "Shared" if args.shared_upload else f"S{index}-"
+            if not args.shared_upload or not rosters:
+                data = make_roster(prefix, args.players, args.seed + index)
+            rosters.append((prefix, data))
+
+        results = Results()
+        memory = [rss_mb(server_pid)] if server_pid else []
+        sampling = True
+
+        async def sample_memory():
+            while sampling:
+                memory.append(rss_mb(server_pid))
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.ensure_future(sample_memory()) if server_pid else None
+        start = time.perf_counter()
+        await asyncio.gather(*(run_flow(i, args, base_url, roster, prefix, results)
+                               for i, (prefix, roster) in enumerate(rosters)))
+        wall = time.perf_counter() - start
+        sampling = False
+        if sampler:
+            await sampler
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+
+    memory = [m for m in memory if m is not None]
+    all_latencies = [value for values in results.latencies.values() for value in values]
+    return {
+        "config": {"sessions": args.sessions, "players": args.players, "think_s": args.think,
+                   "shared_upload": args.shared_upload, "seed": args.seed,
+                   "python": platform.python_version(), "machine": platform.machine()},
+        "steps": {name: summarize(values) for name, values in results.latencies.items()},
+        "overall": summarize(all_latencies) if all_latencies else {},
+        "wall_s": wall,
+        "reruns_per_s": results.script_runs / wall,
+        "memory_mb": {"start": memory[0], "peak": max(memory), "end": memory[-1]} if memory else None,
+        "sessions_completed": results.sessions_completed,
+        "errors": results.errors,
+        "integrity_errors": results.integrity_errors,
+    }
+
+def print_report(report: Dict, baseline: Optional[Dict]):
+    def change(new: float, old: Optional[float]) -> str:
+        if old is None or not old:
+            return ""
+        return f"{(new - old) / old * 100:+.0f}%"
+
+    old_steps = baseline["steps"] if baseline else {}
+    print(f"{report['config']['sessions']} sessions, {report['config']['players']} players each, "
+          f"{report['wall_s']:.1f} s")
+    print(f"{'step':<24} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}" + ("  vs baseline p50/p95/p99" if baseline else ""))
+    rows = list(report["steps"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        if not stats:
+            continue
+        old = old_steps.get(name) if name != "overall" else (baseline or {}).get("overall")
+        line = (f"{name:<24} {stats['count']:>5} {stats['p50_ms']:>9.0f} {stats['p95_ms']:>9.0f} "
+                f"{stats['p99_ms']:>9.0f}")
+        if old:
+            line += "  " + " ".join(change(stats[k], old.get(k)) for k in ("p50_ms", "p95_ms", "p99_ms"))
+        print(line)
+    line = f"throughput: {report['reruns_per_s']:.1f} reruns/s"
+    if baseline:
+        line += f" ({change(report['reruns_per_s'], baseline.get('reruns_per_s'))})"
+    print(line)
+    if report["memory_mb"]:
+        m = report["memory_mb"]
+        line = f"server memory: start {m['start']:.0f} MB, peak {m['peak']:.0f} MB, end {m['end']:.0f} MB"
+        if baseline and baseline.get("memory_mb"):
+            line += f" (peak {change(m['peak'], baseline['memory_mb']['peak'])})"
+        print(line)
+    print(f"sessions completed: {report['sessions_completed']}/{report['config']['sessions']}, "
+          f"errors: {len(report['errors'])}, integrity errors: {len(report['integrity_errors'])}")
+    for error in (report["errors"] + report["integrity_errors"])[:10]:
+        print(f"  {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--players", type=int, default=200, help="players per uploaded roster")
+    parser.add_argument("--think", type=float, default=0.3, help="mean pause between a session's steps (s)")
+    parser.add_argument("--shared-upload", action="store_true", help="every session uploads the same roster")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="test a server that is already running instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="with --url: the server's pid, to report its memory")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--baseline", metavar="PATH")
+    args = parser.parse_args()
+    os.chdir(ROOT)  # champions.csv is read relative to the repo root
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report = asyncio.run(run(args))
+    print_report(report, baseline)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {path}")
+    if report["errors"] or report["integrity_errors"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 import sqlite3
+import re
+import itertools
 import pandas as pd
-from typing import List, Dict, Optional, Tuple
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Sequence, Tuple
 import os
 import sys
 import streamlit as st
+import roster_store
+import history
+import dedupe
+import upload_store
 
 # Rank to numerical value mapping
 RANK_VALUES = {
@@ -19,30 +26,329 @@ RANK_VALUES = {
     'Challenger': 10
 }
 
+SQLITE_MAGIC = b"SQLite format 3\x00"
+SQLITE_HEADER_SIZE = 100
+# Uploads must have these players columns; older databases lacking the others get them added
+REQUIRED_PLAYER_COLUMNS = ('id', 'name', 'rank')
+OPTIONAL_PLAYER_COLUMNS = ('primary_champion_1', 'primary_champion_2', 'primary_champion_3', 'notes', 'opgg_link')
+# Teammate games an upload session has recorded but not yet written, {(player_a, player_b): games}.
+# Finishing a draft is not an edit: writing them right away would give every viewer of a shared upload
+# its own copy. They are written with the session's next edit, and into exports.
+PENDING_TEAMMATES_KEY = 'pending_teammates'
+
+def _session_db_bytes() -> Optional[bytes]:
+    """The uploaded database image: the session's private copy once it has edited, else the shared upload."""
+    if 'db_bytes' in st.session_state:
+        return st.session_state['db_bytes']
+    if 'shared_db' in st.session_state:
+        return upload_store.get_store().get(st.session_state['shared_db'])
+    return None
+
 def get_db_connection() -> sqlite3.Connection:
     """Create a new in-memory database connection from session DB bytes."""
-    if 'db_bytes' not in st.session_state:
+    db_bytes = _session_db_bytes()
+    if db_bytes is None:
         raise RuntimeError("No database loaded for this session. Please upload a .db file.")
-    import io
-    mem_conn = sqlite3.connect(":memory:")
-    mem_conn.row_factory = sqlite3.Row
-    with open("temp_uploaded.db", "wb") as tempf:
-        tempf.write(st.session_state['db_bytes'])
-    tempf = sqlite3.connect("temp_uploaded.db")
-    tempf.backup(mem_conn)
-    tempf.close()
-    return mem_conn
+    conn = connection_from_bytes(db_bytes)
+    conn.row_factory = sqlite3.Row
+    return conn
 
 # Utility to load a db file into session state
 def load_db_file_to_session(db_bytes: bytes):
-    st.session_state['db_bytes'] = db_bytes
+    """Use an uploaded database image. Sessions uploading the same file share one stored copy until they edit it.
 
-def init_db():
-    """Initialize the database with required tables."""
+    Raises ValueError if the image isn't an intact player database; the session is left as it was.
+    """
+    check_db_header(db_bytes)
+    # A file already in the store was validated when it was first uploaded
+    handle = upload_store.get_store().add(db_bytes, prepare=_prepare_upload)
+    st.session_state.pop('roster_name', None)
+    st.session_state.pop('db_history', None)
+    st.session_state.pop('db_bytes', None)
+    st.session_state.pop(PENDING_TEAMMATES_KEY, None)
+    st.session_state['shared_db'] = handle
+    st.session_state['db_version'] = st.session_state.get('db_version', 0) + 1
+
+def check_db_header(db_bytes: bytes):
+    """Check the 100-byte header of a SQLite file image, before any work is done on the rest of it."""
+    if len(db_bytes) < SQLITE_HEADER_SIZE or not db_bytes.startswith(SQLITE_MAGIC):
+        raise ValueError("Not a SQLite database.")
+    page_size = int.from_bytes(db_bytes[16:18], 'big')
+    page_size = 65536 if page_size == 1 else page_size
+    if page_size < 512 or page_size & (page_size - 1):
+        raise ValueError("The database header is corrupt (invalid page size).")
+    # The header's page count is trustworthy when its "version valid for" matches the change counter
+    page_count = int.from_bytes(db_bytes[28:32], 'big')
+    if len(db_bytes) % page_size or (db_bytes[24:28] == db_bytes[92:96]
+                                     and page_count * page_size != len(db_bytes)):
+        raise ValueError("The database file is truncated or has extra data at the end.")
+
+def _prepare_upload(db_bytes: bytes) -> bytes:
+    """Validate a new upload and add anything an older database lacks, so sessions sharing it only ever read it.
+
+    Cheap checks run first: the schema, then PRAGMA quick_check, and only then
+    any index building. An upload that needs no changes is stored as it is.
+    """
+    conn = connection_from_bytes(db_bytes)
+    try:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        missing = _check_players_table(conn)
+        problem = conn.execute("PRAGMA quick_check(1)").fetchone()[0]
+        if problem != 'ok':
+            # e.g. "*** in database main ***\nOn tree page 39 cell 5: Rowid 11482 out of order"
+            raise ValueError(f"The database is corrupt ({problem.splitlines()[-1]}).")
+        with conn:
+            for column in missing:
+                conn.execute(f"ALTER TABLE players ADD COLUMN {column} TEXT")
+            create_schema(conn)
+        unchanged = conn.total_changes == 0 and conn.execute("PRAGMA schema_version").fetchone()[0] == version
+        if unchanged and not _is_wal_image(db_bytes):
+            return db_bytes
+        return connection_to_bytes(conn)
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"The database can't be read: {e}")
+    finally:
+        conn.close()
+
+def _check_players_table(conn: sqlite3.Connection) -> List[str]:
+    """Raise ValueError unless the database has a usable players table; returns the optional columns it lacks."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'players'").fetchone()
+    if row is None or row[0] != 'table':
+        raise ValueError("The database has no 'players' table.")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(players)")}
+    missing = [column for column in REQUIRED_PLAYER_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"The 'players' table is missing the column(s): {', '.join(missing)}.")
+    return [column for column in OPTIONAL_PLAYER_COLUMNS if column not in columns]
+
+def has_uploaded_database() -> bool:
+    return 'db_bytes' in st.session_state or 'shared_db' in st.session_state
+
+def has_database() -> bool:
+    """Whether this session has a player database, either uploaded or a shared roster."""
+    return has_uploaded_database() or 'roster_name' in st.session_state
+
+def shared_upload_cache() -> Optional[Dict]:
+    """Cache for data derived from the session's upload while it is still the unedited shared copy, else None."""
+    if 'db_bytes' in st.session_state or 'shared_db' not in st.session_state:
+        return None
+    return upload_store.get_store().cache(st.session_state['shared_db'])
+
+def attach_roster(name: str):
+    """Use the named server-side roster as this session's database. Raises KeyError if it doesn't exist."""
+    roster_store.get_pool(name)
+    st.session_state.pop('db_bytes', None)
+    st.session_state.pop('shared_db', None)
+    st.session_state.pop('db_history', None)
+    st.session_state.pop(PENDING_TEAMMATES_KEY, None)
+    st.session_state['roster_name'] = name
+
+def detach_roster():
+    st.session_state.pop('roster_name', None)
+    st.session_state.pop('db_history', None)
+
+def save_session_as_roster(name: str):
+    """Copy the session's uploaded database into a new shared roster and attach to it."""
+    pool = roster_store.create_roster(name, _session_image())
+    with pool.connection() as conn:
+        init_db(conn)
+    attach_roster(name)
+
+def get_db_bytes() -> bytes:
+    """The session database as a SQLite file image, e.g. for download."""
+    if 'roster_name' in st.session_state:
+        with _connection() as conn:
+            return connection_to_bytes(conn)
+    return _session_image()
+
+def _session_image() -> bytes:
+    """The session's uploaded database image, including teammate games not yet written to it."""
+    pending = st.session_state.get(PENDING_TEAMMATES_KEY)
+    if not pending:
+        return _session_db_bytes()
     conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute('''
+    try:
+        with conn:
+            _add_teammate_counts(conn, pending)
+        return connection_to_bytes(conn)
+    finally:
+        conn.close()
+
+def database_version() -> Tuple:
+    """A value that changes whenever the session database changes, for invalidating derived data."""
+    if 'roster_name' in st.session_state:
+        name = st.session_state['roster_name']
+        return (name, roster_store.get_pool(name).data_version())
+    return (None, st.session_state.get('db_version', 0))
+
+def export_version() -> Tuple:
+    """Like database_version(), but also changing when teammate games are recorded without being written."""
+    return database_version() + (sum(st.session_state.get(PENDING_TEAMMATES_KEY, {}).values()),)
+
+def connection_to_bytes(conn: sqlite3.Connection) -> bytes:
+    """A SQLite file image of an open connection's database."""
+    if hasattr(conn, 'serialize'):
+        return conn.serialize()
+    # Connection.serialize needs Python 3.11+
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.db')
+        target = sqlite3.connect(path)
+        conn.backup(target)
+        target.close()
+        with open(path, 'rb') as f:
+            return f.read()
+
+def _is_wal_image(db_bytes: bytes) -> bool:
+    # Header bytes 18-19 are 2 for WAL mode, e.g. in an export of a shared roster
+    return db_bytes[18:20] == b"\x02\x02"
+
+def connection_from_bytes(db_bytes: bytes) -> sqlite3.Connection:
+    """A private in-memory connection to a copy of a SQLite file image."""
+    conn = sqlite3.connect(":memory:")
+    if hasattr(conn, 'deserialize'):
+        if _is_wal_image(db_bytes):
+            # An in-memory database can't open a WAL-mode image; read it in rollback-journal mode
+            db_bytes = bytearray(db_bytes)
+            db_bytes[18:20] = b"\x01\x01"
+        conn.deserialize(db_bytes)
+        return conn
+    # Connection.deserialize needs Python 3.11+; give each call its own file
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'import.db')
+        with open(path, 'wb') as f:
+            f.write(db_bytes)
+        source = sqlite3.connect(path)
+        source.backup(conn)
+        source.close()
+    return conn
+
+@contextmanager
+def _connection(conn: Optional[sqlite3.Connection] = None, write: bool = False,
+                label: Optional[str] = None):
+    """Yield `conn`, or a connection to the session database if none is given.
+
+    Writes are committed (or rolled back on error) when the block exits. A
+    caller-supplied connection stays open and is owned by the caller.
+    Session writes with a `label` are added to the session's undo history.
+    """
+    if conn is not None:
+        with _transaction(conn, write):
+            yield conn
+    elif 'roster_name' in st.session_state:
+        # Shared roster: borrow a pooled connection, writes go straight to the file
+        with roster_store.get_pool(st.session_state['roster_name']).connection() as conn:
+            with _recording(conn, label), _transaction(conn, write):
+                yield conn
+    else:
+        conn = get_db_connection()
+        try:
+            with _recording(conn, label), _transaction(conn, write):
+                if write and PENDING_TEAMMATES_KEY in st.session_state:
+                    _add_teammate_counts(conn, st.session_state[PENDING_TEAMMATES_KEY])
+                yield conn
+            if write:
+                _update_session_db_bytes(conn)
+                st.session_state.pop(PENDING_TEAMMATES_KEY, None)
+        finally:
+            conn.close()
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection, write: bool):
+    if write:
+        with conn:
+            yield
+    else:
+        yield
+
+@contextmanager
+def _recording(conn: sqlite3.Connection, label: Optional[str]):
+    """Record the player rows changed by the block's transaction in the undo history.
+
+    Temporary triggers copy each changed row's before/after values into a
+    temporary table, so only the touched rows are ever read back.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(players)")] if label else []
+    if not columns:
+        yield
+        return
+    count = len(columns)
+    nulls = ", ".join("NULL" for _ in columns)
+    before = ", ".join(f"old.{col}" for col in columns)
+    after = ", ".join(f"new.{col}" for col in columns)
+    slots = ", ".join(f"c{i}" for i in range(2 * count))
+    conn.execute(f"CREATE TEMP TABLE undo_log (op TEXT, {slots})")
+    for op, event, values in ((history.INSERT, "INSERT", f"{nulls}, {after}"),
+                              (history.UPDATE, "UPDATE", f"{before}, {after}"),
+                              (history.DELETE, "DELETE", f"{before}, {nulls}")):
+        conn.execute(f"CREATE TEMP TRIGGER undo_log_{op} AFTER {event} ON main.players "
+                     f"BEGIN INSERT INTO undo_log VALUES ('{op}', {values}); END")
+    try:
+        yield
+        rows = [(row[0],
+                 tuple(row[1:count + 1]) if row[0] != history.INSERT else None,
+                 tuple(row[count + 1:]) if row[0] != history.DELETE else None)
+                for row in conn.execute("SELECT * FROM undo_log ORDER BY rowid")]
+        if rows:
+            get_history().record(history.Change(label, columns, rows))
+    finally:
+        for op in (history.INSERT, history.UPDATE, history.DELETE):
+            conn.execute(f"DROP TRIGGER IF EXISTS temp.undo_log_{op}")
+        conn.execute("DROP TABLE IF EXISTS temp.undo_log")
+
+def get_history() -> history.History:
+    """This session's undo/redo history for the current database."""
+    if 'db_history' not in st.session_state:
+        st.session_state['db_history'] = history.History()
+    return st.session_state['db_history']
+
+def _apply_change(change: history.Change, undo: bool):
+    expected = change.expected_rows(undo)
+    statements = change.undo_statements() if undo else change.redo_statements()
+    select = f"SELECT {', '.join(change.columns)} FROM players WHERE id = ?"
+    try:
+        with _connection(write=True) as conn:
+            for player_id, row in expected.items():
+                current = conn.execute(select, (player_id,)).fetchone()
+                if (tuple(current) if current else None) != row:
+                    # Someone else (e.g. another session on a shared roster) changed it since
+                    raise ValueError(f"Can't {'undo' if undo else 'redo'} '{change.label}': "
+                                     "the players it changed have been edited since.")
+            for sql, params in statements:
+                conn.execute(sql, params)
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"Can't {'undo' if undo else 'redo'} '{change.label}': {e}")
+
+def undo() -> Optional[str]:
+    """Revert the most recent recorded edit and return its label (None if there is nothing to undo).
+
+    Raises ValueError if the edited players have changed since.
+    """
+    changes = get_history()
+    change = changes.next_undo()
+    if change is None:
+        return None
+    _apply_change(change, undo=True)
+    changes.undone()
+    return change.label
+
+def redo() -> Optional[str]:
+    """Re-apply the most recently undone edit and return its label (None if there is nothing to redo).
+
+    Raises ValueError if the edited players have changed since.
+    """
+    changes = get_history()
+    change = changes.next_redo()
+    if change is None:
+        return None
+    _apply_change(change, undo=False)
+    changes.redone()
+    return change.label
+
+def create_schema(conn: sqlite3.Connection):
+    """Create the required tables on an open connection."""
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS players (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL UNIQUE,
@@ -54,90 +360,309 @@ def init_db():
             opgg_link TEXT
         )
     ''')
-    
-    conn.commit()
-    conn.close()
+    create_search_index(conn)
+    create_teammate_table(conn)
+
+def create_teammate_table(conn: sqlite3.Connection):
+    """Games each pair of players has played on the same team (player_a < player_b), see teammates.py."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS teammate_counts (
+            player_a INTEGER NOT NULL,
+            player_b INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (player_a, player_b)
+        ) WITHOUT ROWID
+    ''')
+
+def init_db(conn: Optional[sqlite3.Connection] = None):
+    """Initialize the database with required tables."""
+    with _connection(conn, write=True) as conn:
+        create_schema(conn)
+
+# The champions of the row a trigger fired for, as (champion, player id) rows
+_NEW_CHAMPIONS_SQL = """
+    SELECT value, new.id FROM (
+        SELECT new.primary_champion_1 AS value UNION SELECT new.primary_champion_2
+        UNION SELECT new.primary_champion_3
+    ) WHERE value <> ''"""
+
+# Matches the (champion, player_id) primary key, so it doesn't scan the whole index
+_OLD_CHAMPIONS_DELETE_SQL = """DELETE FROM player_champions WHERE player_id = old.id
+            AND champion IN (old.primary_champion_1, old.primary_champion_2, old.primary_champion_3);"""
+
+_SEARCH_TRIGGERS = {
+    'players_search_insert': """
+        AFTER INSERT ON players BEGIN
+            {fts_insert}
+            INSERT OR IGNORE INTO player_champions (champion, player_id) {new_champions};
+        END""",
+    'players_search_delete': """
+        AFTER DELETE ON players BEGIN
+            {fts_delete}
+            {old_champions_delete}
+        END""",
+    'players_search_text': """
+        AFTER UPDATE OF name, notes ON players BEGIN
+            {fts_delete}
+            {fts_insert}
+        END""",
+    'players_search_champions': """
+        AFTER UPDATE OF primary_champion_1, primary_champion_2, primary_champion_3 ON players BEGIN
+            {old_champions_delete}
+            INSERT OR IGNORE INTO player_champions (champion, player_id) {new_champions};
+        END""",
+}
+
+def create_search_index(conn: sqlite3.Connection):
+    """Create the search tables: full-text over names/notes and a champion -> players index.
+
+    Triggers keep both current on every insert, update and delete, so searches
+    never have to scan the players table. Existing players are indexed once,
+    when the tables are first created (e.g. on a database from an older version).
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'player_champions'").fetchone():
+        return
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS players_fts USING fts5("
+                     "name, notes, content='players', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+        fts_insert = "INSERT INTO players_fts (rowid, name, notes) VALUES (new.id, new.name, new.notes);"
+        fts_delete = ("INSERT INTO players_fts (players_fts, rowid, name, notes) "
+                      "VALUES ('delete', old.id, old.name, old.notes);")
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: text searches fall back to LIKE
+        fts_insert = fts_delete = ""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS player_champions (
+            champion TEXT NOT NULL COLLATE NOCASE,
+            player_id INTEGER NOT NULL,
+            PRIMARY KEY (champion, player_id)
+        ) WITHOUT ROWID
+    ''')
+    for name, body in _SEARCH_TRIGGERS.items():
+        body = body.format(fts_insert=fts_insert, fts_delete=fts_delete,
+                           new_champions=_NEW_CHAMPIONS_SQL, old_champions_delete=_OLD_CHAMPIONS_DELETE_SQL)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if fts_insert:
+        conn.execute("INSERT INTO players_fts (players_fts) VALUES ('rebuild')")
+    conn.execute("INSERT OR IGNORE INTO player_champions (champion, player_id) " + " UNION ALL ".join(
+        f"SELECT {col}, id FROM players WHERE {col} <> ''"
+        for col in ('primary_champion_1', 'primary_champion_2', 'primary_champion_3')
+    ))
+
+def _fts_query(words: List[str]) -> str:
+    # Quoting each word keeps user input from being read as FTS syntax; '*' makes it a prefix match
+    return " ".join(f'"{word}"*' for word in words)
+
+def _like_escape(text: str) -> str:
+    # Without this, '_' in e.g. "xX_Faker_Xx" would match any character
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _search(conn: sqlite3.Connection, text: str, champion: Optional[str]) -> List[int]:
+    queries, params = [], []
+    words = re.findall(r"\w+", text)
+    if words and conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'players_fts'").fetchone():
+        queries.append("SELECT rowid FROM players_fts WHERE players_fts MATCH ?")
+        params.append(_fts_query(words))
+    else:
+        for word in words:
+            queries.append(r"SELECT id FROM players WHERE name LIKE ? ESCAPE '\' OR notes LIKE ? ESCAPE '\'")
+            params += [f"%{_like_escape(word)}%"] * 2
+    if champion:
+        queries.append("SELECT player_id FROM player_champions WHERE champion = ?")
+        params.append(champion)
+    if not queries:
+        return [row[0] for row in conn.execute("SELECT id FROM players ORDER BY id")]
+    return [row[0] for row in conn.execute(" INTERSECT ".join(queries) + " ORDER BY 1", params)]
+
+def _with_search_index(conn: Optional[sqlite3.Connection], read):
+    """Run read(conn), first building the search index if this database doesn't have one yet."""
+    with _connection(conn) as c:
+        if c.execute("SELECT 1 FROM sqlite_master WHERE name = 'player_champions'").fetchone():
+            return read(c)
+    with _connection(conn, write=True) as c:
+        create_search_index(c)
+        return read(c)
+
+def search_players(text: str = "", champion: Optional[str] = None,
+                   conn: Optional[sqlite3.Connection] = None) -> List[int]:
+    """Ids of players matching every word of `text` (as a name/notes word prefix) who play `champion`."""
+    return _with_search_index(conn, lambda c: _search(c, text, champion))
+
+def get_champion_player_counts(conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+    """How many players list each champion, for champions at least one player plays."""
+    return _with_search_index(conn, lambda c: dict(c.execute(
+        "SELECT champion, COUNT(*) FROM player_champions GROUP BY champion ORDER BY champion")))
 
 def _update_session_db_bytes(conn):
-    import io
     # Save the current in-memory db to bytes and update st.session_state['db_bytes']
-    with open("temp_uploaded.db", "wb") as f:
-        backup_conn = sqlite3.connect("temp_uploaded.db")
-        conn.backup(backup_conn)
-        backup_conn.close()
-    with open("temp_uploaded.db", "rb") as f:
-        st.session_state['db_bytes'] = f.read()
+    st.session_state['db_bytes'] = connection_to_bytes(conn)
+    # Copy-on-write: from its first edit on, the session keeps its own copy and lets go of the shared one
+    st.session_state.pop('shared_db', None)
+    st.session_state['db_version'] = st.session_state.get('db_version', 0) + 1
 
 def add_player(name: str, rank: str, primary_champion_1: str = None,
                primary_champion_2: str = None, primary_champion_3: str = None,
-               notes: str = None, opgg_link: str = None) -> bool:
+               notes: str = None, opgg_link: str = None,
+               conn: Optional[sqlite3.Connection] = None) -> bool:
     """Add a new player to the database."""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO players (name, rank, primary_champion_1, primary_champion_2,
-                               primary_champion_3, notes, opgg_link)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (name, rank, primary_champion_1, primary_champion_2,
-              primary_champion_3, notes, opgg_link))
-        conn.commit()
-        _update_session_db_bytes(conn)
-        conn.close()
+        with _connection(conn, write=True, label=f"Add {name}") as conn:
+            conn.execute('''
+                INSERT INTO players (name, rank, primary_champion_1, primary_champion_2,
+                                   primary_champion_3, notes, opgg_link)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, rank, primary_champion_1, primary_champion_2,
+                  primary_champion_3, notes, opgg_link))
         return True
     except sqlite3.IntegrityError:
         return False
 
-def get_all_players() -> List[Dict]:
+def get_all_players(conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
     """Retrieve all players from the database."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('SELECT * FROM players')
-    players = [dict(row) for row in c.fetchall()]
-    conn.close()
-    return players
+    with _connection(conn) as conn:
+        return [dict(row) for row in conn.execute('SELECT * FROM players')]
+
+def get_player_rows(columns: Sequence[str], conn: Optional[sqlite3.Connection] = None) -> List[tuple]:
+    """Only the given columns of every player, as tuples ordered by id."""
+    with _connection(conn) as conn:
+        return [tuple(row) for row in conn.execute(f"SELECT {', '.join(columns)} FROM players ORDER BY id")]
 
 def update_player(player_id: int, name: str, rank: str,
                  primary_champion_1: str = None, primary_champion_2: str = None,
-                 primary_champion_3: str = None, notes: str = None, opgg_link: str = None) -> bool:
+                 primary_champion_3: str = None, notes: str = None, opgg_link: str = None,
+                 conn: Optional[sqlite3.Connection] = None) -> bool:
     """Update an existing player's information."""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('''
-            UPDATE players
-            SET name = ?, rank = ?, primary_champion_1 = ?, primary_champion_2 = ?,
-                primary_champion_3 = ?, notes = ?, opgg_link = ?
-            WHERE id = ?
-        ''', (name, rank, primary_champion_1, primary_champion_2,
-              primary_champion_3, notes, opgg_link, player_id))
-        conn.commit()
-        _update_session_db_bytes(conn)
-        conn.close()
+        with _connection(conn, write=True, label=f"Edit {name}") as conn:
+            conn.execute('''
+                UPDATE players
+                SET name = ?, rank = ?, primary_champion_1 = ?, primary_champion_2 = ?,
+                    primary_champion_3 = ?, notes = ?, opgg_link = ?
+                WHERE id = ?
+            ''', (name, rank, primary_champion_1, primary_champion_2,
+                  primary_champion_3, notes, opgg_link, player_id))
         return True
     except sqlite3.IntegrityError:
         return False
 
-def delete_player(player_id: int) -> bool:
+def update_player_ranks(ranks: Dict[int, str], conn: Optional[sqlite3.Connection] = None) -> int:
+    """Set several players' ranks in one transaction. Returns the number of players updated."""
+    with _connection(conn, write=True, label="Update ranks") as conn:
+        cursor = conn.executemany('UPDATE players SET rank = ? WHERE id = ?',
+                                  [(rank, player_id) for player_id, rank in ranks.items()])
+        return cursor.rowcount
+
+def delete_player(player_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Delete a player from the database."""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('DELETE FROM players WHERE id = ?', (player_id,))
-        conn.commit()
-        _update_session_db_bytes(conn)
-        conn.close()
+        with _connection(conn, write=True, label="Delete player") as conn:
+            conn.execute('DELETE FROM players WHERE id = ?', (player_id,))
         return True
     except sqlite3.Error:
         return False
 
-def get_player_by_id(player_id: int) -> Optional[Dict]:
+def find_duplicate_players(conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """Groups of players that look like the same person (see dedupe.py).
+
+    Each group is {'certain': bool, 'players': [{'id', 'name', 'rank'}, ...]}; a
+    group is certain when its players share a normalized name or OP.GG link.
+    """
+    with _connection(conn) as conn:
+        rows = {row['id']: row for row in conn.execute('SELECT id, name, rank, opgg_link FROM players ORDER BY id')}
+    groups = dedupe.find_duplicates([(row['id'], row['name'], row['opgg_link']) for row in rows.values()])
+    return [{'certain': dedupe.is_certain([(rows[i]['name'], rows[i]['opgg_link']) for i in group]),
+             'players': [{'id': i, 'name': rows[i]['name'], 'rank': rows[i]['rank']} for i in group]}
+            for group in groups]
+
+def merge_players(groups: List[List[int]], conn: Optional[sqlite3.Connection] = None) -> int:
+    """Merge each group of duplicate player ids into one player, all in one transaction.
+
+    Returns the number of players removed.
+    """
+    removed = 0
+    with _connection(conn, write=True, label="Merge duplicates") as conn:
+        for group in groups:
+            placeholders = ", ".join("?" * len(group))
+            rows = [dict(row) for row in conn.execute(f'SELECT * FROM players WHERE id IN ({placeholders})', group)]
+            if len(rows) < 2:
+                continue
+            merged, duplicate_ids = dedupe.merge_rows(rows)
+            conn.executemany('DELETE FROM players WHERE id = ?', [(player_id,) for player_id in duplicate_ids])
+            _move_teammate_counts(conn, duplicate_ids, merged['id'])
+            conn.execute('''
+                UPDATE players
+                SET primary_champion_1 = ?, primary_champion_2 = ?, primary_champion_3 = ?,
+                    notes = ?, opgg_link = ?
+                WHERE id = ?
+            ''', (merged['primary_champion_1'], merged['primary_champion_2'], merged['primary_champion_3'],
+                  merged['notes'], merged['opgg_link'], merged['id']))
+            removed += len(duplicate_ids)
+    return removed
+
+def _move_teammate_counts(conn: sqlite3.Connection, from_ids: List[int], to_id: int):
+    """Credit the games of merged-away players to the player they were merged into."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'teammate_counts'").fetchone():
+        return
+    placeholders = ", ".join("?" * len(from_ids))
+    where = f"WHERE player_a IN ({placeholders}) OR player_b IN ({placeholders})"
+    rows = conn.execute(f"SELECT player_a, player_b, count FROM teammate_counts {where}",
+                        [*from_ids, *from_ids]).fetchall()
+    conn.execute(f"DELETE FROM teammate_counts {where}", [*from_ids, *from_ids])
+    moved = {}
+    for a, b, n in rows:
+        a, b = sorted(to_id if pid in from_ids else pid for pid in (a, b))
+        # Games the duplicates played with each other are games with themselves
+        if a != b:
+            moved[(a, b)] = moved.get((a, b), 0) + n
+    _add_teammate_counts(conn, moved)
+
+def record_teammates(teams: List[List[int]], conn: Optional[sqlite3.Connection] = None):
+    """Add one game together for every pair of players on the same team.
+
+    Without a connection, an uploaded session database only notes the games
+    in the session (see PENDING_TEAMMATES_KEY); a shared roster is written.
+    """
+    pairs = [pair for team in teams for pair in itertools.combinations(sorted(team), 2)]
+    counts = dict.fromkeys(pairs, 1)
+    if conn is None and 'roster_name' not in st.session_state:
+        pending = st.session_state.setdefault(PENDING_TEAMMATES_KEY, {})
+        for pair in pairs:
+            pending[pair] = pending.get(pair, 0) + 1
+        return
+    with _connection(conn, write=True) as conn:
+        _add_teammate_counts(conn, counts)
+
+def _add_teammate_counts(conn: sqlite3.Connection, counts: Dict[Tuple[int, int], int]):
+    create_teammate_table(conn)
+    conn.executemany('''
+        INSERT INTO teammate_counts (player_a, player_b, count) VALUES (?, ?, ?)
+        ON CONFLICT (player_a, player_b) DO UPDATE SET count = count + excluded.count
+    ''', [(a, b, n) for (a, b), n in counts.items()])
+
+def get_teammate_counts(player_ids: Sequence[int],
+                        conn: Optional[sqlite3.Connection] = None) -> List[Tuple[int, int, int]]:
+    """(player_a, player_b, games together) for the pairs of the given players that have been teammates."""
+    placeholders = ", ".join("?" * len(player_ids))
+    pending = st.session_state.get(PENDING_TEAMMATES_KEY) if conn is None else None
+    with _connection(conn) as conn:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'teammate_counts'").fetchone():
+            counts = {}
+        else:
+            counts = {(a, b): n for a, b, n in conn.execute(
+                f"SELECT player_a, player_b, count FROM teammate_counts "
+                f"WHERE player_a IN ({placeholders}) AND player_b IN ({placeholders})",
+                [*player_ids, *player_ids])}
+    if pending:
+        wanted = set(player_ids)
+        for (a, b), n in pending.items():
+            if a in wanted and b in wanted:
+                counts[(a, b)] = counts.get((a, b), 0) + n
+    return [(a, b, n) for (a, b), n in counts.items()]
+
+def get_player_by_id(player_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
     """Retrieve a specific player by their ID."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('SELECT * FROM players WHERE id = ?', (player_id,))
-    player = c.fetchone()
-    conn.close()
+    with _connection(conn) as conn:
+        player = conn.execute('SELECT * FROM players WHERE id = ?', (player_id,)).fetchone()
     return dict(player) if player else None
 
 def get_champions() -> List[str]:
@@ -152,36 +677,38 @@ def get_rank_value(rank: str) -> int:
     """Convert a rank string to its numerical value."""
     return RANK_VALUES.get(rank, 0)
 
-def get_balanced_teams(player_ids: List[int]) -> Tuple[List[Dict], List[Dict]]:
+def get_balanced_teams(player_ids: List[int],
+                       conn: Optional[sqlite3.Connection] = None) -> Tuple[List[Dict], List[Dict]]:
     """Create balanced teams based on player ranks."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    
     # Get players with their ranks
     players = []
-    for player_id in player_ids:
-        c.execute('SELECT * FROM players WHERE id = ?', (player_id,))
-        player = c.fetchone()
-        if player:
-            players.append(dict(player))
-    
+    with _connection(conn) as conn:
+        for player_id in player_ids:
+            player = conn.execute('SELECT * FROM players WHERE id = ?', (player_id,)).fetchone()
+            if player:
+                players.append(dict(player))
+    return balance_teams(players)
+
+def balance_teams(players: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Greedily split players into two teams of equal size with similar rank totals."""
     # Sort players by rank value (descending)
-    players.sort(key=lambda x: get_rank_value(x['rank']), reverse=True)
+    players = sorted(players, key=lambda x: get_rank_value(x['rank']), reverse=True)
     
     # Initialize teams
     team_a = []
     team_b = []
     team_a_sum = 0
     team_b_sum = 0
+    # Team A takes the extra player of an odd count
+    size_a, size_b = (len(players) + 1) // 2, len(players) // 2
     
-    # Distribute players
+    # Distribute players, to the weaker team unless it is full
     for player in players:
-        if team_a_sum <= team_b_sum:
+        if len(team_b) == size_b or (len(team_a) < size_a and team_a_sum <= team_b_sum):
             team_a.append(player)
             team_a_sum += get_rank_value(player['rank'])
         else:
             team_b.append(player)
             team_b_sum += get_rank_value(player['rank'])
     
-    conn.close()
-    return team_a, team_b 
\ No newline at end of file
+    return team_a, team_b
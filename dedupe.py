@@ -0,0 +1,219 @@
+"""Find and merge duplicate players, e.g. "Faker", "faker " and "Faker#KR1" from combined rosters.
+
+The pipeline:
+
+1. Normalize names (case, accents, spacing, Riot #tags) and OP.GG links.
+2. Give every player blocking keys: its normalized name, its OP.GG link and
+   its name with each single character deleted. Two names within one typo
+   of each other always share a key. Keys are hashed and sorted with NumPy,
+   and only players sharing a key are compared, never all pairs.
+3. Score each candidate pair with Jaro-Winkler similarity. A matching OP.GG
+   link counts as certain, two different links are never merged and names
+   with different numbers in them never match fuzzily.
+4. Group accepted pairs, surest first (union-find). Each group is merged in
+   a single transaction by database.merge_players.
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+import numpy as np
+
+MATCH_THRESHOLD = 0.9
+# Names shorter than this only match exactly ("Bob" and "Rob" are different people)
+MIN_FUZZY_LENGTH = 5
+# Longer names get no typo keys; their exact and link keys still apply
+MAX_FUZZY_LENGTH = 24
+# A key shared by more players than this is too common to tell anyone apart
+MAX_BLOCK_SIZE = 50
+
+FILL_FIELDS = ('primary_champion_1', 'primary_champion_2', 'primary_champion_3', 'opgg_link')
+
+def normalize_name(name: str) -> str:
+    """'  Fakér#KR1 ' -> 'faker': no accents, case, #tag, spaces or punctuation."""
+    name = unicodedata.normalize("NFKD", name or "")
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = name.split("#", 1)[0]
+    return re.sub(r"[\W_]+", "", name.casefold())
+
+def normalize_opgg(link: Optional[str]) -> Optional[str]:
+    """Reduce an OP.GG profile URL to 'region/summoner-tag' so differently written links compare equal."""
+    if not link or not link.strip():
+        return None
+    link = unquote(link).strip().casefold()
+    link = re.sub(r"^[a-z]+://", "", link)
+    link = re.sub(r"^www\.", "", link)
+    match = re.search(r"op\.gg/(?:lol/)?summoners?/([a-z0-9]+)/([^/?#]+)", link)
+    if match:
+        region, summoner = match.groups()
+    else:
+        # Old style: https://euw.op.gg/summoner/userName=Faker
+        match = re.search(r"(?:([a-z0-9]+)\.)?op\.gg/summoner/username=([^&#/]+)", link)
+        if not match:
+            return link.split("?", 1)[0].rstrip("/")
+        region, summoner = match.group(1) or "", match.group(2)
+    return f"{region}/{re.sub(r'[^a-z0-9-]+', '', summoner.replace('#', '-'))}"
+
+def jaro_winkler(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    b_matched = [False] * len(b)
+    a_matches = []
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not b_matched[j] and b[j] == ch:
+                b_matched[j] = True
+                a_matches.append(ch)
+                break
+    if not a_matches:
+        return 0.0
+    b_matches = [ch for ch, matched in zip(b, b_matched) if matched]
+    transpositions = sum(x != y for x, y in zip(a_matches, b_matches)) / 2
+    m = len(a_matches)
+    jaro = (m / len(a) + m / len(b) + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+def _blocking_keys(name: str, link: Optional[str]) -> Iterable[str]:
+    yield "n:" + name
+    if link:
+        yield "l:" + link
+    if MIN_FUZZY_LENGTH <= len(name) <= MAX_FUZZY_LENGTH:
+        yield "d:" + name
+        for i in range(len(name)):
+            yield "d:" + name[:i] + name[i + 1:]
+
+def candidate_pairs(names: Sequence[str], links: Sequence[Optional[str]]) -> set:
+    """Index pairs (i < j) of players sharing at least one blocking key."""
+    hashes, owners = [], []
+    for index, (name, link) in enumerate(zip(names, links)):
+        for key in _blocking_keys(name, link):
+            hashes.append(hash(key))
+            owners.append(index)
+    hashes = np.array(hashes, dtype=np.int64)
+    owners = np.array(owners, dtype=np.int64)
+    order = np.argsort(hashes, kind="stable")
+    hashes, owners = hashes[order], owners[order]
+    # Runs of equal hashes are the blocks
+    starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+    sizes = np.diff(np.r_[starts, len(hashes)])
+    pairs = set()
+    for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+        members = np.unique(owners[start:start + size])
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        members = members.tolist()
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pairs.add((members[x], members[y]))
+    return pairs
+
+def match_score(name_a: str, name_b: str, link_a: Optional[str], link_b: Optional[str]) -> float:
+    if link_a and link_b:
+        # Two different OP.GG accounts are two different players, however alike the names
+        return 1.0 if link_a == link_b else 0.0
+    if name_a == name_b:
+        return 1.0
+    if min(len(name_a), len(name_b)) < MIN_FUZZY_LENGTH:
+        return 0.0
+    if re.sub(r"\D", "", name_a) != re.sub(r"\D", "", name_b):
+        # "Player1" and "Player2" are numbered on purpose
+        return 0.0
+    return jaro_winkler(name_a, name_b)
+
+def find_duplicates(players: Sequence[Tuple[int, str, Optional[str]]],
+                    threshold: float = MATCH_THRESHOLD) -> List[List[int]]:
+    """Group (id, name, opgg_link) rows that look like the same player.
+
+    Returns lists of two or more player ids, each sorted, ordered by their lowest id.
+    """
+    names = [normalize_name(name) for _, name, _ in players]
+    links = [normalize_opgg(link) for _, _, link in players]
+    parent = list(range(len(players)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    matches = []
+    for i, j in candidate_pairs(names, links):
+        if not names[i] and not names[j]:
+            continue
+        score = match_score(names[i], names[j], links[i], links[j])
+        if score >= threshold:
+            matches.append((score, i, j))
+    # A fuzzy match only counts if it is the best either player has: a copy
+    # that exactly matches its original doesn't also join a look-alike.
+    best = [0.0] * len(players)
+    for score, i, j in matches:
+        best[i], best[j] = max(best[i], score), max(best[j], score)
+    matches = [(score, i, j) for score, i, j in matches if score == 1.0 or score >= max(best[i], best[j])]
+    # Join the surest pairs first. A group is named by its first player and
+    # carries the one OP.GG link it may have.
+    matches.sort(key=lambda match: -match[0])
+    group_links = list(links)
+    for score, i, j in matches:
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            continue
+        link_i, link_j = group_links[root_i], group_links[root_j]
+        if link_i and link_j and link_i != link_j:
+            continue
+        # Fuzzy joins must also hold between the groups, or typo chains
+        # (karin ~ karon ~ baron) would snowball into one group
+        if score < 1.0 and match_score(names[root_i], names[root_j], link_i, link_j) < threshold:
+            continue
+        root, other = min(root_i, root_j), max(root_i, root_j)
+        parent[other] = root
+        group_links[root] = link_i or link_j
+    groups: Dict[int, List[int]] = {}
+    for index, (player_id, _, _) in enumerate(players):
+        groups.setdefault(find(index), []).append(player_id)
+    return sorted((sorted(ids) for ids in groups.values() if len(ids) > 1), key=lambda ids: ids[0])
+
+def is_certain(players: Sequence[Tuple[str, Optional[str]]]) -> bool:
+    """Whether (name, opgg_link) rows share one normalized name or one OP.GG link, not just similar names."""
+    names = {normalize_name(name) for name, _ in players}
+    links = {normalize_opgg(link) for _, link in players}
+    return len(names) == 1 or (len(links) == 1 and None not in links)
+
+def merge_rows(rows: List[Dict]) -> Tuple[Dict, List[int]]:
+    """Combine duplicate player rows into one.
+
+    The row with the most filled-in fields (then the lowest id) survives. Its
+    empty champion/link fields are filled from the others and all distinct
+    notes are kept. Returns the merged survivor row and the ids to delete.
+    """
+    def filled(row: Dict) -> int:
+        return sum(1 for field in FILL_FIELDS + ('notes',) if row.get(field))
+
+    rows = sorted(rows, key=lambda row: (-filled(row), row['id']))
+    merged = dict(rows[0])
+    for row in rows[1:]:
+        for field in FILL_FIELDS:
+            if not merged.get(field) and row.get(field):
+                merged[field] = row[field]
+    # Champions moved in from other rows may repeat ones the survivor already has
+    champions = []
+    for field in FILL_FIELDS[:3]:
+        if merged.get(field) and merged[field] not in champions:
+            champions.append(merged[field])
+    for field, champion in zip(FILL_FIELDS[:3], champions + [None] * 3):
+        merged[field] = champion
+    notes = []
+    for row in rows:
+        note = (row.get('notes') or "").strip()
+        if note and note not in notes:
+            notes.append(note)
+    merged['notes'] = " | ".join(notes) or None
+    return merged, [row['id'] for row in rows[1:]]
@@ -0,0 +1,174 @@
+import streamlit as st
+from functools import lru_cache
+from html import escape
+from typing import List, Dict, Optional, Tuple
+from draft_log import DraftLog, DraftState, PICK, RESET
+from pick_advisor import Advice, advise_draft
+
+# Fragments let a pick rerun only the board instead of the whole page.
+# Older Streamlit releases only ship the experimental name, or nothing at all (None).
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+HAS_FRAGMENTS = fragment is not None
+
+def _fragment(func):
+    return fragment(func) if HAS_FRAGMENTS else func
+
+BOARD_CSS = '''
+<style>
+.team-col {
+    background: #e3f2fd;
+    border: 2px solid #1976d2;
+    border-radius: 12px;
+    padding: 18px 12px 12px 12px;
+    margin-bottom: 8px;
+    min-height: 320px;
+    box-shadow: 0 2px 8px rgba(25, 118, 210, 0.08);
+    transition: box-shadow 0.3s;
+}
+.team-col.team-b {
+    background: #fce4ec;
+    border-color: #d81b60;
+    box-shadow: 0 2px 8px rgba(216, 27, 96, 0.08);
+}
+.team-col.available {
+    background: #f3e5f5;
+    border-color: #7b1fa2;
+    box-shadow: 0 2px 8px rgba(123, 31, 162, 0.08);
+}
+.player-flash {
+    animation: flash 0.7s;
+}
+@keyframes flash {
+    0% { background: #fffde7; }
+    50% { background: #fff176; }
+    100% { background: inherit; }
+}
+</style>
+'''
+
+# (name, rank, is_captain, flash)
+PlayerRow = Tuple[str, str, bool, bool]
+
+
+class DraftBoard:
+    """The manual draft's players by id, placed in the pool or on a team by the draft log."""
+
+    def __init__(self, players: List[Dict], log: DraftLog):
+        self.players = {p['id']: p for p in players}
+        self.id_of = {p['name']: p['id'] for p in players}
+        self.log = log
+
+    @property
+    def state(self) -> DraftState:
+        return self.log.state
+
+    def can_pick(self, side: str) -> bool:
+        return self.state.can_pick(side)
+
+    def pick(self, side: str, player_id: int) -> bool:
+        """Move a player from the pool to a team. Returns False if the pick is not allowed."""
+        if player_id not in self.state.pool or not self.can_pick(side):
+            return False
+        self.log.append((PICK, side, player_id))
+        return True
+
+    def reset(self):
+        """Put every non-captain back into the pool."""
+        if len(self.state.team_a) > 1 or len(self.state.team_b) > 1:
+            self.log.append((RESET, "picks"))
+
+    def is_complete(self) -> bool:
+        return self.state.is_complete()
+
+    def team_players(self, side: str) -> List[Dict]:
+        return [self.players[i] for i in self.state.team(side)]
+
+    def name(self, player_id: int) -> str:
+        return self.players[player_id]['name']
+
+    def rows(self, player_ids: Tuple[int, ...], side: Optional[str], flash: Optional[tuple]) -> Tuple[PlayerRow, ...]:
+        captain = {'a': self.state.captain_a, 'b': self.state.captain_b}.get(side)
+        return tuple(
+            (self.players[i]['name'], self.players[i]['rank'], i == captain, flash == (PICK, side, i))
+            for i in player_ids
+        )
+
+
+@lru_cache(maxsize=256)
+def _row_html(name: str, rank: str, is_captain: bool, flash: bool) -> str:
+    flash_class = "player-flash" if flash else ""
+    label = f"{escape(name)} ({escape(rank)})"
+    if is_captain:
+        label = f"<b>{label} (Captain)</b>"
+    return f'<div class="{flash_class}">• {label}</div>'
+
+
+@lru_cache(maxsize=128)
+def _column_html(title: str, css_class: str, rows: Tuple[PlayerRow, ...]) -> str:
+    body = "".join(_row_html(*row) for row in rows)
+    return f'<div class="{css_class}"><h3 style="margin-top:0">{title}</h3>{body}</div>'
+
+
+def _on_board_change(board: DraftBoard, action, *args):
+    """Apply a board action from a widget callback, flagging a full rerun if the draft (un)completes."""
+    was_complete = board.is_complete()
+    action(*args)
+    if board.is_complete() != was_complete:
+        st.session_state.manual_board_layout_changed = True
+
+
+def _pick_from_widget(board: DraftBoard, side: str):
+    board.pick(side, board.id_of[st.session_state[f"manual_pick_{side}"]])
+
+
+def _advice_caption(board: DraftBoard, advice: Advice) -> str:
+    # Rank totals are whole tiers, so the gap can't exceed the bound rounded down
+    bound = f"at most {int(advice.worst_gap)}" if advice.exhaustive else f"about {advice.worst_gap:.0f}"
+    return (f"Suggested pick: **{board.name(advice.player_id)}** "
+            f"(final rank gap {bound} tiers, whatever the other captain picks)")
+
+
+def _team_column(board: DraftBoard, side: str, title: str, css_class: str, flash: Optional[tuple],
+                 advice: Optional[Advice]):
+    st.markdown(_column_html(title, css_class, board.rows(board.state.team(side), side, flash)),
+                unsafe_allow_html=True)
+    if board.can_pick(side):
+        suggested = advice is not None and advice.side == side
+        if suggested:
+            st.caption(_advice_caption(board, advice))
+        st.selectbox(
+            f"Add to {title}",
+            [board.name(i) for i in board.state.pool],
+            # The captain whose turn it is starts from the suggested player
+            index=board.state.pool.index(advice.player_id) if suggested else 0,
+            key=f"manual_pick_{side}"
+        )
+        st.button(
+            f"Add to {title}",
+            key=f"manual_add_{side}",
+            on_click=_on_board_change,
+            args=(board, _pick_from_widget, board, side)
+        )
+
+
+@_fragment
+def show_draft_board(board: DraftBoard, show_advice: bool = True):
+    """Render the three draft columns. Picks only rerun this fragment when fragments are available."""
+    # Steps below the board depend on whether the draft is complete, so they need a full rerun
+    if st.session_state.pop('manual_board_layout_changed', False) and HAS_FRAGMENTS:
+        st.rerun()
+    # The flash animation only plays on the first render after a pick
+    flash = board.log.last_event if st.session_state.get('manual_board_shown') != len(board.log) else None
+    st.session_state.manual_board_shown = len(board.log)
+    advice = advise_draft(board.state, board.players) if show_advice else None
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        _team_column(board, 'a', "Team A", "team-col", flash, advice)
+    with col2:
+        st.markdown(
+            _column_html("Available Players", "team-col available", board.rows(board.state.pool, None, flash)),
+            unsafe_allow_html=True
+        )
+    with col3:
+        _team_column(board, 'b', "Team B", "team-col team-b", flash, advice)
+    st.button("Reset Draft Teams", on_click=_on_board_change, args=(board, board.reset))
@@ -1,65 +1,97 @@
 import streamlit as st
 import database as db
+from ban_engine import generate_bans
+from player_table import get_player_table
+from player_search import show_player_filter, player_multiselect
+from teammates import pick_split, record_teams, teammate_matrix
+from draft_log import DraftLog, ROLES, TEAMS, ROLE_SET, BANS, select_players, show_draft_tools
+import numpy as np
 import random
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
-# Define roles
-ROLES = ["Top", "Jungle", "Mid", "ADC", "Support"]
+def _draft_log() -> DraftLog:
+    if 'draft_log' not in st.session_state:
+        st.session_state.draft_log = DraftLog()
+    return st.session_state.draft_log
 
-def initialize_session_state(team_rerolls=2, role_rerolls=2):
-    """Initialize session state variables with reroll counts."""
-    st.session_state.selected_players = []
-    st.session_state.team_a = []
-    st.session_state.team_b = []
-    st.session_state.team_a_roles = {}
-    st.session_state.team_b_roles = {}
-    st.session_state.banned_champions = []
-    st.session_state.team_rerolls = team_rerolls
-    st.session_state.role_rerolls_a = role_rerolls
-    st.session_state.role_rerolls_b = role_rerolls
-    st.session_state.team_a_captain = None
-    st.session_state.team_b_captain = None
+def shuffled_roles() -> List[str]:
+    roles = ROLES.copy()
+    random.shuffle(roles)
+    return roles
 
 def randomize_roles(team: List[Dict]) -> Dict[str, str]:
     """Randomly assign roles to team members."""
-    roles = ROLES.copy()
-    random.shuffle(roles)
-    return {player['name']: role for player, role in zip(team, roles)}
+    return {player['name']: role for player, role in zip(team, shuffled_roles())}
 
-def reroll_team_a_roles():
-    if st.session_state.role_rerolls_a > 0:
-        st.session_state.team_a_roles = randomize_roles(st.session_state.team_a)
-        st.session_state.role_rerolls_a -= 1
+def split_teams(players: List[Dict], skill_balancing: bool = False,
+                teammate_counts: Optional[np.ndarray] = None) -> Tuple[List[Dict], List[Dict]]:
+    """Split players into two teams, either at random or balanced by rank.
 
-def reroll_team_b_roles():
-    if st.session_state.role_rerolls_b > 0:
-        st.session_state.team_b_roles = randomize_roles(st.session_state.team_b)
-        st.session_state.role_rerolls_b -= 1
+    Given how often each pair has already been teammates (see teammates.py),
+    splits that put the same people together again are avoided.
+    """
+    if teammate_counts is not None:
+        on_team_a = pick_split([db.get_rank_value(p['rank']) for p in players], teammate_counts, skill_balancing)
+        return ([p for p, a in zip(players, on_team_a) if a],
+                [p for p, a in zip(players, on_team_a) if not a])
+    if skill_balancing:
+        return db.balance_teams(players)
+    players = players.copy()
+    random.shuffle(players)
+    half = len(players) // 2
+    return players[:half], players[half:]
 
-def generate_bans(players: List[Dict], num_bans: int, additional_random_bans: int = 0) -> List[str]:
-    """Generate champion bans from players' primary champions."""
-    # Collect all primary champions
-    potential_bans = set()
-    for player in players:
-        for champ in [player['primary_champion_1'], player['primary_champion_2'], player['primary_champion_3']]:
-            if champ:
-                potential_bans.add(champ)
-    
-    # Convert to list and shuffle
-    potential_bans = list(potential_bans)
-    random.shuffle(potential_bans)
-    
-    # Select bans from primary champions
-    bans = potential_bans[:num_bans]
-    
-    # Add random bans if requested
-    if additional_random_bans > 0:
-        all_champions = db.get_champions()
-        available_champions = [champ for champ in all_champions if champ not in bans]
-        random.shuffle(available_champions)
-        bans.extend(available_champions[:additional_random_bans])
-    
-    return bans
+def deal_teams(players: List[Dict], skill_balancing: bool, avoid_repeats: bool):
+    """Deal (or reroll) the teams. Rerolls keep the captains on their teams."""
+    log = _draft_log()
+    state = log.state
+    selected_ids = [p['id'] for p in players]
+    counts = teammate_matrix(selected_ids) if avoid_repeats else None
+    if state.captain_a is None:
+        # First time ever, or after a full reset
+        team_a, team_b = split_teams(players, skill_balancing, counts)
+        captain_a = random.choice(team_a)['id']
+        captain_b = random.choice(team_b)['id']
+        # Always put captain at the top
+        team_a_ids = [captain_a] + [p['id'] for p in team_a if p['id'] != captain_a]
+        team_b_ids = [captain_b] + [p['id'] for p in team_b if p['id'] != captain_b]
+    else:
+        captain_a, captain_b = state.captain_a, state.captain_b
+        # Remove captains from the pool
+        remaining_ids = [pid for pid in selected_ids if pid not in (captain_a, captain_b)]
+        if counts is not None:
+            on_team_a = pick_split([0] * len(selected_ids), counts,
+                                   fixed_a=(selected_ids.index(captain_a),),
+                                   fixed_b=(selected_ids.index(captain_b),))
+            team_a_rest = [pid for pid, a in zip(selected_ids, on_team_a) if a and pid != captain_a]
+            remaining_ids = team_a_rest + [pid for pid in remaining_ids if pid not in team_a_rest]
+        else:
+            random.shuffle(remaining_ids)
+        # Fill the rest of the teams
+        team_a_ids = [captain_a] + remaining_ids[:4]
+        team_b_ids = [captain_b] + remaining_ids[4:]
+    # Random results are final: undoing them would refund the reroll
+    log.append((TEAMS, tuple(team_a_ids), tuple(team_b_ids)), final=True)
+
+def randomize_all_roles():
+    state = _draft_log().state
+    assignments = tuple(zip(state.team_a, shuffled_roles())) + tuple(zip(state.team_b, shuffled_roles()))
+    _draft_log().append((ROLE_SET, assignments, ""), final=True)
+
+def reroll_team_roles(side: str, max_role_rerolls: int):
+    log = _draft_log()
+    if getattr(log.state, f"role_rerolls_{side}") < max_role_rerolls:
+        log.append((ROLE_SET, tuple(zip(log.state.team(side), shuffled_roles())), side), final=True)
+
+def make_bans(players: List[Dict], num_bans: int, additional_random_bans: int, weighted_bans: bool):
+    log = _draft_log()
+    log.append((BANS, tuple(generate_bans(players, num_bans, additional_random_bans, weighted_bans))), final=True)
+    # The draft is final: remember who played together
+    record_teams('draft_recorded_teams', [list(log.state.team_a), list(log.state.team_b)])
+
+def start_new_draft():
+    st.session_state.pop('draft_log', None)
+    st.session_state.pop('draft_recorded_teams', None)
 
 def show_draft_creator():
     # Hide the sidebar by default (in case Streamlit renders this file outside the tab context)
@@ -88,159 +120,93 @@ def show_draft_creator():
     max_team_rerolls = st.sidebar.number_input("Max Team Rerolls Allowed", min_value=0, max_value=5, value=2)
     max_role_rerolls = st.sidebar.number_input("Max Role Rerolls Per Team", min_value=0, max_value=5, value=2)
     additional_random_bans = st.sidebar.number_input("Number of Additional Random Bans", min_value=0, max_value=10, value=0)
+    weighted_bans = st.sidebar.checkbox("Favor Champions Shared by Several Players", value=True)
+    avoid_repeats = st.sidebar.checkbox("Avoid Repeat Teammates", value=True,
+                                        help="Make teams of players who were teammates in earlier drafts less likely.")
 
     # If no db is loaded, show a message and return
-    if 'db_bytes' not in st.session_state:
+    if not db.has_database():
         st.warning("No player database loaded. Please upload a .db file in the Player Management page to begin.")
         return
     
-    # Initialize session state if not present
-    if 'team_rerolls' not in st.session_state or 'role_rerolls_a' not in st.session_state or 'role_rerolls_b' not in st.session_state:
-        initialize_session_state(max_team_rerolls, max_role_rerolls)
-    
     # Step 1: Select Players
     st.header("Step 1: Select Players")
-    players = db.get_all_players()
-    if not players:
+    table = get_player_table()
+    if not table:
         st.error("No players available. Please add players in the Player Management page.")
         return
     
-    player_names = [player['name'] for player in players]
-    selected_names = st.multiselect(
-        "Select 10 Players",
-        player_names,
-        max_selections=10
-    )
+    log = _draft_log()
+    with st.expander("Search Players"):
+        matches = show_player_filter("draft")
+    selected_names = player_multiselect("Select 10 Players", table, matches, key="draft_selected_players", max_selections=10)
     
     if len(selected_names) == 10:
-        st.session_state.selected_players = [p for p in players if p['name'] in selected_names]
+        log = select_players('draft_log', tuple(table.ids_for_names(selected_names)))
         st.success("10 players selected!")
     else:
         st.warning(f"Please select exactly 10 players. Currently selected: {len(selected_names)}")
+    show_draft_tools('draft_log', table, "draft_selected_players")
     
     # Step 2: Team Randomization
-    if st.session_state.selected_players:
+    state = log.state
+    selected_players = table.lookup(state.selected)
+    team_a = table.lookup(state.team_a)
+    team_b = table.lookup(state.team_b)
+    if selected_players:
         st.header("Step 2: Team Randomization")
-        can_reroll = st.session_state.team_rerolls > 0
-        button_label = "Randomize Teams" if not st.session_state.team_a and not st.session_state.team_b else f"Reroll Teams ({st.session_state.team_rerolls} remaining)"
-        st.info(f"Team rerolls remaining: {st.session_state.team_rerolls}")
-        if st.button(button_label, disabled=not can_reroll):
-            first_time = not st.session_state.team_a and not st.session_state.team_b
-            if skill_balancing:
-                team_a, team_b = db.get_balanced_teams(
-                    [p['id'] for p in st.session_state.selected_players]
-                )
-            else:
-                players = st.session_state.selected_players.copy()
-                random.shuffle(players)
-                team_a = players[:5]
-                team_b = players[5:]
-            # Captain logic
-            if st.session_state.team_a_captain is None or st.session_state.team_b_captain is None:
-                # First time ever, or after a full reset
-                st.session_state.team_a_captain = random.choice(team_a)['name']
-                st.session_state.team_b_captain = random.choice(team_b)['name']
-                # Always put captain at the top
-                team_a_captain = next(p for p in team_a if p['name'] == st.session_state.team_a_captain)
-                team_b_captain = next(p for p in team_b if p['name'] == st.session_state.team_b_captain)
-                team_a_rest = [p for p in team_a if p['name'] != st.session_state.team_a_captain]
-                team_b_rest = [p for p in team_b if p['name'] != st.session_state.team_b_captain]
-                st.session_state.team_a = [team_a_captain] + team_a_rest
-                st.session_state.team_b = [team_b_captain] + team_b_rest
-            else:
-                # --- NEW LOGIC: Always keep captains on their original teams ---
-                team_a_captain_name = st.session_state.team_a_captain
-                team_b_captain_name = st.session_state.team_b_captain
-                # Remove captains from the pool
-                remaining_players = [p for p in st.session_state.selected_players if p['name'] not in [team_a_captain_name, team_b_captain_name]]
-                random.shuffle(remaining_players)
-                # Assign captains to their teams
-                team_a_captain = next(p for p in st.session_state.selected_players if p['name'] == team_a_captain_name)
-                team_b_captain = next(p for p in st.session_state.selected_players if p['name'] == team_b_captain_name)
-                # Fill the rest of the teams
-                team_a_rest = remaining_players[:4]
-                team_b_rest = remaining_players[4:]
-                st.session_state.team_a = [team_a_captain] + team_a_rest
-                st.session_state.team_b = [team_b_captain] + team_b_rest
-                st.session_state.team_rerolls -= 1
-            st.session_state.team_a_roles = {}
-            st.session_state.team_b_roles = {}
-            st.session_state.banned_champions = []
-            st.session_state.role_rerolls_a = max_role_rerolls
-            st.session_state.role_rerolls_b = max_role_rerolls
-            st.rerun()
+        rerolls_left = max(0, max_team_rerolls - state.team_rerolls)
+        button_label = "Randomize Teams" if not team_a and not team_b else f"Reroll Teams ({rerolls_left} remaining)"
+        st.info(f"Team rerolls remaining: {rerolls_left}")
+        st.button(button_label, disabled=bool(team_a) and rerolls_left == 0, on_click=deal_teams,
+                  args=(selected_players, skill_balancing, avoid_repeats))
         
         # Display teams
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("Team A")
-            if st.session_state.team_a:
-                for idx, player in enumerate(st.session_state.team_a):
-                    label = " (Captain)" if player['name'] == st.session_state.team_a_captain else ""
-                    st.write(f"• {player['name']} ({player['rank']}){label}")
+            for player in team_a:
+                label = " (Captain)" if player['id'] == state.captain_a else ""
+                st.write(f"• {player['name']} ({player['rank']}){label}")
         
         with col2:
             st.subheader("Team B")
-            if st.session_state.team_b:
-                for idx, player in enumerate(st.session_state.team_b):
-                    label = " (Captain)" if player['name'] == st.session_state.team_b_captain else ""
-                    st.write(f"• {player['name']} ({player['rank']}){label}")
+            for player in team_b:
+                label = " (Captain)" if player['id'] == state.captain_b else ""
+                st.write(f"• {player['name']} ({player['rank']}){label}")
     
     # Step 3: Role Assignment
-    if st.session_state.team_a and st.session_state.team_b:
+    roles = state.role_map()
+    if team_a and team_b:
         st.header("Step 3: Role Assignment")
-        if not st.session_state.team_a_roles:
-            if st.button("Randomize All Roles", key="randomize_all_roles"):
-                st.session_state.team_a_roles = randomize_roles(st.session_state.team_a)
-                st.session_state.team_b_roles = randomize_roles(st.session_state.team_b)
+        if not roles:
+            st.button("Randomize All Roles", key="randomize_all_roles", on_click=randomize_all_roles)
         col1, col2 = st.columns(2)
-        with col1:
-            st.subheader("Team A Roles")
-            for player in st.session_state.team_a:
-                role = st.session_state.team_a_roles.get(player['name'], "Not assigned")
-                st.write(f"• {player['name']}: {role}")
-            st.button(
-                f"Reroll Team A Roles ({st.session_state.role_rerolls_a} remaining)",
-                key="reroll_team_a",
-                disabled=st.session_state.role_rerolls_a <= 0,
-                on_click=reroll_team_a_roles
-            )
-        with col2:
-            st.subheader("Team B Roles")
-            for player in st.session_state.team_b:
-                role = st.session_state.team_b_roles.get(player['name'], "Not assigned")
-                st.write(f"• {player['name']}: {role}")
-            st.button(
-                f"Reroll Team B Roles ({st.session_state.role_rerolls_b} remaining)",
-                key="reroll_team_b",
-                disabled=st.session_state.role_rerolls_b <= 0,
-                on_click=reroll_team_b_roles
-            )
+        for side, team, column in (('a', team_a, col1), ('b', team_b, col2)):
+            rerolls_left = max(0, max_role_rerolls - getattr(state, f"role_rerolls_{side}"))
+            with column:
+                st.subheader(f"Team {side.upper()} Roles")
+                for player in team:
+                    st.write(f"• {player['name']}: {roles.get(player['id'], 'Not assigned')}")
+                st.button(
+                    f"Reroll Team {side.upper()} Roles ({rerolls_left} remaining)",
+                    key=f"reroll_team_{side}",
+                    disabled=rerolls_left <= 0,
+                    on_click=reroll_team_roles,
+                    args=(side, max_role_rerolls)
+                )
     
     # Step 4: Ban Phase
-    if st.session_state.team_a_roles and st.session_state.team_b_roles:
+    if state.roles_complete():
         st.header("Step 4: Ban Phase")
         
-        if not st.session_state.banned_champions:
-            if st.button("Generate Bans"):
-                st.session_state.banned_champions = generate_bans(
-                    st.session_state.selected_players,
-                    num_bans,
-                    additional_random_bans
-                )
-        
-        if st.session_state.banned_champions:
+        if not state.bans:
+            st.button("Generate Bans", on_click=make_bans,
+                      args=(selected_players, num_bans, additional_random_bans, weighted_bans))
+        else:
             st.subheader("Banned Champions")
-            for champ in st.session_state.banned_champions:
+            for champ in state.bans:
                 st.write(f"• {champ}")
     
     # Reset Button
-    if st.button("Start New Draft"):
-        initialize_session_state(max_team_rerolls, max_role_rerolls)
-        st.rerun()
-
-    # --- Handle pending reroll actions (fix double-click issue) ---
-    if 'pending_reroll_a' in st.session_state:
-        del st.session_state['pending_reroll_a']
-    if 'pending_reroll_b' in st.session_state:
-        del st.session_state['pending_reroll_b'] 
\ No newline at end of file
+    st.button("Start New Draft", on_click=start_new_draft)
@@ -0,0 +1,312 @@
+"""Draft progress as an append-only log of small events.
+
+The draft pages don't edit their progress in place. Each action (selecting
+players, captains, a pick, roles, bans, a reroll) appends events to the
+draft's log, and the pages show the state derived from it. Random results
+are stored in the events themselves, so replaying a log always gives the
+same draft. The state after every event is kept (states are small tuples
+sharing their unchanged parts), so an append applies just the new events,
+undo drops the last step, and a draft is shared exactly as its encoded log.
+"""
+import base64
+import binascii
+import json
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import streamlit as st
+from player_search import set_selection
+
+ROLES = ["Top", "Jungle", "Mid", "ADC", "Support"]
+# Players in the drafts the pages make (codes for other sizes aren't loaded)
+DRAFT_PLAYERS = 10
+
+# Event kinds. Events are tuples (kind, *args) of ints, strings and tuples of them.
+SELECT = "s"    # (SELECT, player ids): start a new draft over these players
+CAPTAINS = "c"  # (CAPTAINS, captain a, captain b): the captains start the teams; clears picks
+TEAMS = "t"     # (TEAMS, team a ids, team b ids): deal both teams at once, captains first (a reroll if dealt before)
+PICK = "p"      # (PICK, side, player id): move a player from the pool to team 'a' or 'b'
+ROLE = "r"      # (ROLE, player id, role or None)
+ROLE_SET = "R"  # (ROLE_SET, ((player id, role), ...), side rerolled or ""): assign several roles at once
+BANS = "b"      # (BANS, champions)
+RESET = "x"     # (RESET, part): clear the "picks", "roles" or "bans"
+
+FORMAT_VERSION = 1
+# Limits on shared codes, which come from other people
+MAX_CODE_LENGTH = 20000
+MAX_DECODED_BYTES = 200000
+
+class DraftState(NamedTuple):
+    """A draft at one point of its log, by player id. States are never modified, only replaced."""
+    selected: Tuple[int, ...] = ()
+    captain_a: Optional[int] = None
+    captain_b: Optional[int] = None
+    team_a: Tuple[int, ...] = ()
+    team_b: Tuple[int, ...] = ()
+    # (player id, role) pairs, in the order they were assigned
+    roles: Tuple[Tuple[int, str], ...] = ()
+    bans: Tuple[str, ...] = ()
+    team_rerolls: int = 0
+    role_rerolls_a: int = 0
+    role_rerolls_b: int = 0
+
+    def team(self, side: str) -> Tuple[int, ...]:
+        return self.team_a if side == 'a' else self.team_b
+
+    @property
+    def team_size(self) -> int:
+        return len(self.selected) // 2
+
+    @property
+    def pool(self) -> Tuple[int, ...]:
+        """Selected players on neither team, in selection order."""
+        taken = set(self.team_a) | set(self.team_b)
+        return tuple(player_id for player_id in self.selected if player_id not in taken)
+
+    def can_pick(self, side: str) -> bool:
+        team = self.team(side)
+        return bool(team) and len(team) < self.team_size
+
+    def is_complete(self) -> bool:
+        return bool(self.selected) and len(self.team_a) == len(self.team_b) == self.team_size
+
+    def role_map(self) -> Dict[int, str]:
+        return dict(self.roles)
+
+    def roles_complete(self) -> bool:
+        """Whether the teams are complete and everyone on them has a role."""
+        assigned = self.role_map()
+        return self.is_complete() and all(player_id in assigned for player_id in self.team_a + self.team_b)
+
+def _require(condition: bool, message: str):
+    if not condition:
+        raise ValueError(message)
+
+def _is_ids(value) -> bool:
+    return isinstance(value, tuple) and all(type(item) is int for item in value)
+
+def _select(state: DraftState, player_ids: tuple) -> DraftState:
+    _require(_is_ids(player_ids) and len(set(player_ids)) == len(player_ids) and len(player_ids) % 2 == 0,
+             "A draft needs an even number of different players.")
+    return DraftState(selected=player_ids)
+
+def _captains(state: DraftState, captain_a: int, captain_b: int) -> DraftState:
+    _require(captain_a != captain_b and {captain_a, captain_b} <= set(state.selected),
+             "Captains must be two different selected players.")
+    return state._replace(captain_a=captain_a, captain_b=captain_b, team_a=(captain_a,), team_b=(captain_b,),
+                          roles=(), bans=())
+
+def _teams(state: DraftState, team_a: tuple, team_b: tuple) -> DraftState:
+    _require(_is_ids(team_a) and _is_ids(team_b) and len(team_a) == len(team_b) == state.team_size > 0
+             and sorted(team_a + team_b) == sorted(state.selected), "Teams must split the selected players evenly.")
+    rerolls = state.team_rerolls + (state.captain_a is not None)
+    return state._replace(captain_a=team_a[0], captain_b=team_b[0], team_a=team_a, team_b=team_b, roles=(),
+                          bans=(), team_rerolls=rerolls, role_rerolls_a=0, role_rerolls_b=0)
+
+def _pick(state: DraftState, side: str, player_id: int) -> DraftState:
+    _require(side in ('a', 'b') and player_id in state.pool and state.can_pick(side),
+             f"Player {player_id} can't be picked for team {side}.")
+    return state._replace(**{f"team_{side}": state.team(side) + (player_id,)})
+
+def _check_role(state: DraftState, player_id: int, role: Optional[str]):
+    _require(player_id in state.team_a + state.team_b, f"Player {player_id} is not on a team.")
+    _require(role is None or role in ROLES, f"Unknown role: {role}")
+
+def _with_roles(state: DraftState, assignments: Dict[int, Optional[str]]) -> Tuple[Tuple[int, str], ...]:
+    kept = tuple((player_id, role) for player_id, role in state.roles if player_id not in assignments)
+    return kept + tuple((player_id, role) for player_id, role in assignments.items() if role is not None)
+
+def _role(state: DraftState, player_id: int, role: Optional[str]) -> DraftState:
+    _check_role(state, player_id, role)
+    return state._replace(roles=_with_roles(state, {player_id: role}))
+
+def _role_set(state: DraftState, assignments: tuple, rerolled: str) -> DraftState:
+    _require(rerolled in ('', 'a', 'b'), f"Unknown team: {rerolled}")
+    for player_id, role in assignments:
+        _check_role(state, player_id, role)
+    state = state._replace(roles=_with_roles(state, dict(assignments)))
+    if rerolled:
+        counter = f"role_rerolls_{rerolled}"
+        state = state._replace(**{counter: getattr(state, counter) + 1})
+    return state
+
+def _bans(state: DraftState, champions: tuple) -> DraftState:
+    _require(isinstance(champions, tuple) and all(isinstance(c, str) for c in champions), "Bans must be champion names.")
+    return state._replace(bans=champions)
+
+def _reset(state: DraftState, part: str) -> DraftState:
+    if part == "picks":
+        _require(state.captain_a is not None, "There are no picks to reset.")
+        return state._replace(team_a=(state.captain_a,), team_b=(state.captain_b,), roles=(), bans=())
+    if part == "roles":
+        return state._replace(roles=())
+    _require(part == "bans", f"Unknown part of a draft: {part}")
+    return state._replace(bans=())
+
+_HANDLERS = {SELECT: _select, CAPTAINS: _captains, TEAMS: _teams, PICK: _pick, ROLE: _role,
+             ROLE_SET: _role_set, BANS: _bans, RESET: _reset}
+
+def apply(state: DraftState, event: tuple) -> DraftState:
+    """The state after `event`. Raises ValueError if the event is malformed or doesn't fit the state."""
+    try:
+        handler = _HANDLERS[event[0]]
+        return handler(state, *event[1:])
+    except (KeyError, IndexError, TypeError):
+        raise ValueError(f"Malformed draft event: {event!r}")
+
+def _freeze(value):
+    """JSON lists back to the tuples events are made of."""
+    return tuple(_freeze(item) for item in value) if isinstance(value, list) else value
+
+class DraftLog:
+    """The events of one draft, grouped into steps (one user action each), and the state after each event."""
+
+    def __init__(self):
+        self.events: List[tuple] = []
+        # _states[n] is the state after the first n events
+        self._states: List[DraftState] = [DraftState()]
+        # Number of events at the end of each step
+        self._steps: List[int] = []
+        # Steps up to here are final: undo stops after them
+        self._final_steps = 0
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def state(self) -> DraftState:
+        return self._states[-1]
+
+    @property
+    def last_event(self) -> Optional[tuple]:
+        return self.events[-1] if self.events else None
+
+    def append(self, *events: tuple, final: bool = False) -> DraftState:
+        """Apply `events` as one step. If any doesn't apply, raises ValueError and leaves the log unchanged.
+
+        A `final` step, and every step before it, can't be undone. Pages use
+        this for random results they limit, so undo can't refund a reroll.
+        """
+        states = []
+        state = self.state
+        for event in events:
+            state = apply(state, event)
+            states.append(state)
+        self.events.extend(events)
+        self._states.extend(states)
+        self._steps.append(len(self.events))
+        if final:
+            self._final_steps = len(self._steps)
+        return state
+
+    def can_undo(self) -> bool:
+        return len(self._steps) > self._final_steps
+
+    def undo(self) -> DraftState:
+        """Drop the last step and return the state before it."""
+        _require(self.can_undo(), "The last step can't be undone.")
+        self._steps.pop()
+        keep = self._steps[-1] if self._steps else 0
+        del self.events[keep:]
+        del self._states[keep + 1:]
+        return self.state
+
+    def player_ids(self) -> Set[int]:
+        """Every player the log has selected, including for steps that could be undone back to."""
+        return {player_id for event in self.events if event[0] == SELECT for player_id in event[1]}
+
+    def encode(self) -> str:
+        """The whole log, undo steps included, as a short URL-safe string."""
+        steps, start = [], 0
+        for end in self._steps:
+            steps.append(self.events[start:end])
+            start = end
+        data = json.dumps([FORMAT_VERSION, steps, self._final_steps], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(zlib.compress(data, 9)).decode().rstrip('=')
+
+    @classmethod
+    def decode(cls, code: str) -> "DraftLog":
+        """Rebuild a log from encode(). Raises ValueError if the code is damaged or describes an impossible draft."""
+        code = code.strip()
+        try:
+            _require(len(code) <= MAX_CODE_LENGTH, "too long")
+            compressed = base64.urlsafe_b64decode(code + "=" * (-len(code) % 4))
+            decompressor = zlib.decompressobj()
+            data = decompressor.decompress(compressed, MAX_DECODED_BYTES)
+            _require(not decompressor.unconsumed_tail, "too long")
+            # Codes from before final steps existed have no count of them
+            version, steps, *final_steps = json.loads(data)
+            final_steps = final_steps[0] if final_steps else 0
+        except (ValueError, TypeError, binascii.Error, zlib.error):
+            raise ValueError("This is not a valid draft code.")
+        _require(version == FORMAT_VERSION, "This draft code is from a different version of the app.")
+        log = cls()
+        for step in _freeze(steps):
+            _require(isinstance(step, tuple) and step and all(isinstance(e, tuple) and e for e in step),
+                     "This is not a valid draft code.")
+            log.append(*step)
+        _require(type(final_steps) is int and 0 <= final_steps <= len(log._steps), "This is not a valid draft code.")
+        log._final_steps = final_steps
+        return log
+
+# --- Streamlit controls ---
+
+def select_players(key: str, player_ids: Tuple[int, ...], *events: tuple) -> DraftLog:
+    """Point the draft log in st.session_state[key] at these selected players, returning the log.
+
+    Selecting the players of the log's last draft again after dropping one
+    resumes that draft. Any other selection replaces the log with a new one,
+    so undo and share codes only cover the current draft. `events` (e.g. the
+    default captains) are added in the same step as the selection.
+    """
+    log: DraftLog = st.session_state[key]
+    if log.state.selected == player_ids:
+        return log
+    if log.last_event == (SELECT, ()) and log.undo().selected == player_ids:
+        return log
+    log = st.session_state[key] = DraftLog()
+    log.append((SELECT, player_ids), *events)
+    return log
+
+def _restore_selection(table, selection_key: str, state: DraftState):
+    """Point the page's player multiselect at the state's players, so the page doesn't start a new draft."""
+    set_selection(selection_key, [player['name'] for player in table.lookup(state.selected)])
+
+def _undo(key: str, table, selection_key: str):
+    log: DraftLog = st.session_state[key]
+    # The button can be clicked on a stale page after a final step
+    if log.can_undo():
+        _restore_selection(table, selection_key, log.undo())
+
+def _load(key: str, table, selection_key: str):
+    code = st.session_state.get(f"{key}_code", "")
+    try:
+        log = DraftLog.decode(code)
+        unknown = log.player_ids() - {player['id'] for player in table.lookup(sorted(log.player_ids()))}
+        _require(not unknown, "This draft has players who aren't in your roster.")
+        _require(all(len(event[1]) in (0, DRAFT_PLAYERS) for event in log.events if event[0] == SELECT),
+                 f"Drafts here are for {DRAFT_PLAYERS} players.")
+    except ValueError as e:
+        st.session_state[f"{key}_message"] = str(e)
+        return
+    st.session_state[key] = log
+    st.session_state[f"{key}_code"] = ""
+    _restore_selection(table, selection_key, log.state)
+
+def show_draft_tools(key: str, table, selection_key: str):
+    """Undo and share controls for the draft log in st.session_state[key].
+
+    `selection_key` is the page's player multiselect, which undo and loading
+    keep in step with the draft.
+    """
+    log: DraftLog = st.session_state[key]
+    st.button("Undo Last Step", key=f"{key}_undo", disabled=not log.can_undo(),
+              on_click=_undo, args=(key, table, selection_key))
+    with st.expander("Share Draft"):
+        if log.can_undo():
+            st.caption("Anyone with the same roster can load this code to see the draft exactly as it is.")
+            st.code(log.encode(), language=None)
+        st.text_input("Load a Shared Draft", key=f"{key}_code", placeholder="Paste a draft code")
+        st.button("Load Draft", key=f"{key}_load", on_click=_load, args=(key, table, selection_key))
+    if f"{key}_message" in st.session_state:
+        st.error(st.session_state.pop(f"{key}_message"))
@@ -0,0 +1,129 @@
+"""Undo/redo history for player database edits, stored as row-level deltas.
+
+Each recorded edit keeps only the rows it touched (their values before and
+after), so undoing or redoing it costs time and memory proportional to the
+change rather than to the roster. Histories are bounded by a step count and a
+memory budget covering both stacks. Steps that could be redone are evicted
+first, then the oldest undo steps.
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+MAX_STEPS = 50
+# Approximate bytes of row data kept across all steps of one history
+MEMORY_BUDGET = 2 * 1024 * 1024
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+# (operation, row before, row after); rows are full rows in `columns` order, id first
+RowChange = Tuple[str, Optional[tuple], Optional[tuple]]
+Statement = Tuple[str, tuple]
+
+class Change:
+    """The rows changed by one committed transaction."""
+
+    def __init__(self, label: str, columns: Sequence[str], rows: List[RowChange]):
+        self.label = label
+        self.columns = tuple(columns)
+        self.rows = rows
+        self.size = sum(64 + sum(len(str(value)) for row in (before, after) if row for value in row)
+                        for _, before, after in rows)
+
+    def _insert(self, row: tuple) -> Statement:
+        placeholders = ", ".join("?" for _ in self.columns)
+        return f"INSERT INTO players ({', '.join(self.columns)}) VALUES ({placeholders})", row
+
+    def _update(self, row: tuple) -> Statement:
+        assignments = ", ".join(f"{col} = ?" for col in self.columns[1:])
+        return f"UPDATE players SET {assignments} WHERE id = ?", row[1:] + row[:1]
+
+    def _delete(self, row: tuple) -> Statement:
+        return "DELETE FROM players WHERE id = ?", row[:1]
+
+    def expected_rows(self, undo: bool) -> Dict[int, Optional[tuple]]:
+        """Row contents by id (None if absent) the database must still have for undo/redo to apply."""
+        expected = {}
+        # A row changed several times must match its last state (undo) or its first state (redo)
+        for _, before, after in (self.rows if undo else reversed(self.rows)):
+            expected[(before or after)[0]] = after if undo else before
+        return expected
+
+    def undo_statements(self) -> List[Statement]:
+        """Statements that restore the rows to how they were before the change."""
+        statements = []
+        for op, before, after in reversed(self.rows):
+            if op == INSERT:
+                statements.append(self._delete(after))
+            elif op == DELETE:
+                statements.append(self._insert(before))
+            else:
+                statements.append(self._update(before))
+        return statements
+
+    def redo_statements(self) -> List[Statement]:
+        """Statements that re-apply the change."""
+        statements = []
+        for op, before, after in self.rows:
+            if op == INSERT:
+                statements.append(self._insert(after))
+            elif op == DELETE:
+                statements.append(self._delete(before))
+            else:
+                statements.append(self._update(after))
+        return statements
+
+class History:
+    """Bounded undo and redo stacks of Changes."""
+
+    def __init__(self, max_steps: int = MAX_STEPS, budget: int = MEMORY_BUDGET):
+        self.max_steps = max_steps
+        self.budget = budget
+        self.undo_stack: Deque[Change] = deque()
+        self.redo_stack: List[Change] = []
+        self.size = 0
+
+    def record(self, change: Change):
+        """Add a newly committed change. This discards anything that could be redone."""
+        self._clear_redo()
+        if change.size > self.budget:
+            # Older steps can't be undone past a step that wasn't kept
+            self.clear()
+            return
+        self.undo_stack.append(change)
+        self.size += change.size
+        self._evict()
+
+    def _evict(self):
+        """Drop steps until both limits hold: `size` counts undo and redo steps alike."""
+        while len(self.undo_stack) > self.max_steps:
+            self.size -= self.undo_stack.popleft().size
+        # Redo steps go first, furthest from the current state first: the next edit discards them anyway
+        while self.redo_stack and self.size > self.budget:
+            self.size -= self.redo_stack.pop(0).size
+        while self.undo_stack and self.size > self.budget:
+            self.size -= self.undo_stack.popleft().size
+
+    def _clear_redo(self):
+        self.size -= sum(change.size for change in self.redo_stack)
+        self.redo_stack.clear()
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+
+    def next_undo(self) -> Optional[Change]:
+        return self.undo_stack[-1] if self.undo_stack else None
+
+    def next_redo(self) -> Optional[Change]:
+        return self.redo_stack[-1] if self.redo_stack else None
+
+    def undone(self):
+        """Move the last change to the redo stack once its undo statements have been applied."""
+        self.redo_stack.append(self.undo_stack.pop())
+
+    def redone(self):
+        """Move the last undone change back once its redo statements have been applied."""
+        self.undo_stack.append(self.redo_stack.pop())
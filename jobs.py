@@ -0,0 +1,112 @@
+"""Background jobs for long tasks such as refreshing ranks from OP.GG.
+
+Jobs run on a worker pool owned by the server process, so a session's page
+stays responsive while they run. Sessions keep only a job id and poll the
+job's progress. Job functions must not touch st.session_state (they run
+outside any script thread); they return their results and the session
+applies them once the job has finished.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+MAX_WORKERS = 4
+# Finished jobs nobody collected are forgotten after this many seconds
+JOB_TTL = 3600
+
+class Job:
+    """State of one background job. Updated by the worker, read by sessions."""
+
+    def __init__(self, kind: str, total: int = 0):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.done = 0
+        self.total = total
+        # (level, text) pairs, where level is one of info/success/warning/error
+        self.messages: List[Tuple[str, str]] = []
+        self.result = None
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def report(self, done: Optional[int] = None, message: Optional[str] = None, level: str = "info"):
+        """Record progress and/or a partial result from inside the job."""
+        with self._lock:
+            if done is not None:
+                self.done = done
+            if message is not None:
+                self.messages.append((level, message))
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def snapshot(self) -> Dict:
+        """A consistent copy of the job's state for rendering."""
+        with self._lock:
+            return {
+                'status': self.status,
+                'done': self.done,
+                'total': self.total,
+                'messages': list(self.messages),
+                'error': self.error,
+            }
+
+_jobs: Dict[str, Job] = {}
+_jobs_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="job")
+
+def _run(job: Job, func, args):
+    job.status = RUNNING
+    try:
+        job.result = func(job, *args)
+        job.status = CANCELLED if job.cancelled else DONE
+    except Exception as e:
+        job.error = str(e)
+        job.status = FAILED
+    finally:
+        job.finished_at = time.time()
+
+def _prune():
+    cutoff = time.time() - JOB_TTL
+    for job_id, job in list(_jobs.items()):
+        if job.finished and job.finished_at < cutoff:
+            del _jobs[job_id]
+
+def submit(kind: str, func, *args, total: int = 0) -> Job:
+    """Run func(job, *args) in the background and return the job handle."""
+    job = Job(kind, total)
+    with _jobs_lock:
+        _prune()
+        _jobs[job.id] = job
+    _executor().submit(_run, job, func, args)
+    return job
+
+def get_job(job_id: str) -> Optional[Job]:
+    return _jobs.get(job_id)
+
+def forget(job_id: str):
+    """Drop a job once its results have been collected."""
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
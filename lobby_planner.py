@@ -0,0 +1,154 @@
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import combinations
+from typing import List, Dict, Tuple, Optional
+
+# Kept free of Streamlit/database imports so worker processes start quickly.
+
+# (imbalance, indexes of team A within the lobby)
+Split = Tuple[int, Tuple[int, ...]]
+
+@lru_cache(maxsize=4096)
+def best_split(values: Tuple[int, ...]) -> Split:
+    """Exhaustively find the most even two-team split of a lobby.
+
+    The first player is pinned to team A, so a 10-player lobby only has
+    C(9, 4) = 126 candidate splits.
+    """
+    team_size = len(values) // 2
+    total = sum(values)
+    best = None
+    for rest in combinations(range(1, len(values)), team_size - 1):
+        team_a = (0,) + rest
+        imbalance = abs(total - 2 * sum(values[i] for i in team_a))
+        if best is None or imbalance < best[0]:
+            best = (imbalance, team_a)
+            if imbalance == total % 2:
+                break  # can't do better than the parity of the total
+    return best
+
+def _lobby_imbalance(values: List[int]) -> int:
+    # Splits only depend on the multiset of values, so sort for better cache hits
+    return best_split(tuple(sorted(values)))[0]
+
+@lru_cache(maxsize=1)
+def _executor() -> ProcessPoolExecutor:
+    # Spawned (not forked) workers: the Streamlit server is multi-threaded
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+
+def partition_lobbies(values: List[int], num_lobbies: int, tiered: bool = False,
+                      seed: Optional[int] = None) -> List[List[int]]:
+    """Assign player indexes to lobbies of equal size.
+
+    Mixed lobbies are filled snake-draft style by descending value so every lobby
+    gets a similar spread of skill; tiered lobbies group players of similar skill.
+    A seed shuffles players of equal value, giving a different starting point.
+    """
+    order = list(range(len(values)))
+    if seed is not None:
+        random.Random(seed).shuffle(order)
+    order.sort(key=lambda i: values[i], reverse=True)
+    lobby_size = len(values) // num_lobbies
+    if tiered:
+        return [order[k * lobby_size:(k + 1) * lobby_size] for k in range(num_lobbies)]
+    lobbies = [[] for _ in range(num_lobbies)]
+    for position, index in enumerate(order):
+        round_number, offset = divmod(position, num_lobbies)
+        lobbies[offset if round_number % 2 == 0 else num_lobbies - 1 - offset].append(index)
+    return lobbies
+
+def improve_lobbies(lobbies: List[List[int]], values: List[int], max_gap: Optional[int] = None,
+                    max_rounds: int = 200) -> List[List[int]]:
+    """Swap players between lobbies while it lowers the worst lobby's team imbalance.
+
+    max_gap limits swaps to players whose values differ by at most that much,
+    which keeps skill-tiered lobbies tiered.
+    """
+    imbalances = [_lobby_imbalance([values[i] for i in lobby]) for lobby in lobbies]
+    for _ in range(max_rounds):
+        worst = max(range(len(lobbies)), key=imbalances.__getitem__)
+        if imbalances[worst] <= 1:
+            break
+        move = None
+        for other in range(len(lobbies)):
+            if other == worst:
+                continue
+            for x in range(len(lobbies[worst])):
+                for y in range(len(lobbies[other])):
+                    a, b = lobbies[worst][x], lobbies[other][y]
+                    if values[a] == values[b] or (max_gap is not None and abs(values[a] - values[b]) > max_gap):
+                        continue
+                    new_worst = [values[i] for i in lobbies[worst]]
+                    new_worst[x] = values[b]
+                    new_other = [values[i] for i in lobbies[other]]
+                    new_other[y] = values[a]
+                    score = (_lobby_imbalance(new_worst), _lobby_imbalance(new_other))
+                    if max(score) < imbalances[worst] and (move is None or max(score) < max(move[3])):
+                        move = (other, x, y, score)
+        if move is None:
+            break
+        other, x, y, score = move
+        lobbies[worst][x], lobbies[other][y] = lobbies[other][y], lobbies[worst][x]
+        imbalances[worst], imbalances[other] = score
+    return lobbies
+
+def search_lobbies(values: Tuple[int, ...], num_lobbies: int, tiered: bool,
+                   seed: Optional[int]) -> Tuple[int, List[List[int]]]:
+    """One partition-and-improve run. Returns (worst lobby imbalance, lobbies)."""
+    lobbies = partition_lobbies(list(values), num_lobbies, tiered, seed)
+    lobbies = improve_lobbies(lobbies, list(values), max_gap=1 if tiered else None)
+    return max(_lobby_imbalance([values[i] for i in lobby]) for lobby in lobbies), lobbies
+
+def plan_lobbies(players: List[Dict], rank_value, lobby_size: int = 10, tiered: bool = False,
+                 restarts: int = 8, parallel: bool = True, rng=random) -> Tuple[List[Dict], List[Dict]]:
+    """Split players into balanced lobbies, each with two balanced teams.
+
+    rank_value maps a player's rank string to a number. Players that don't fill a
+    whole lobby are benched at random. The lobby search is restarted from several
+    starting orders (in a process pool when parallel is set) and the plan with the
+    smallest worst-lobby imbalance wins.
+
+    Returns (lobbies, bench) where each lobby is a dict with 'team_a', 'team_b',
+    'team_a_total', 'team_b_total' and 'imbalance'.
+    """
+    if lobby_size < 2 or lobby_size % 2:
+        raise ValueError("Lobby size must be an even number of at least 2.")
+    num_lobbies = len(players) // lobby_size
+    if num_lobbies == 0:
+        return [], list(players)
+    players = list(players)
+    rng.shuffle(players)
+    bench = players[num_lobbies * lobby_size:]
+    players = players[:num_lobbies * lobby_size]
+    values = [rank_value(p['rank']) for p in players]
+
+    # Restart 0 is the plain snake draft; the rest reshuffle players of equal value
+    seeds = [None] + [rng.randrange(2 ** 32) for _ in range(max(restarts, 1) - 1)]
+    args = (tuple(values), num_lobbies, tiered)
+    results = None
+    if parallel and num_lobbies > 1 and len(seeds) > 1:
+        try:
+            results = list(_executor().map(search_lobbies, *zip(*[args + (seed,) for seed in seeds])))
+        except (BrokenProcessPool, OSError):
+            # Workers can't start in some hosted environments; fall back to this process
+            _executor.cache_clear()
+    if results is None:
+        results = [search_lobbies(*args, seed) for seed in seeds]
+    _, lobbies = min(results, key=lambda result: result[0])
+
+    plan = []
+    for lobby in lobbies:
+        imbalance, team_a_slots = best_split(tuple(values[i] for i in lobby))
+        team_a = [players[lobby[slot]] for slot in team_a_slots]
+        team_b = [players[index] for slot, index in enumerate(lobby) if slot not in team_a_slots]
+        plan.append({
+            'team_a': team_a,
+            'team_b': team_b,
+            'team_a_total': sum(rank_value(p['rank']) for p in team_a),
+            'team_b_total': sum(rank_value(p['rank']) for p in team_b),
+            'imbalance': imbalance,
+        })
+    return plan, bench
@@ -1,259 +1,172 @@
 import streamlit as st
 import database as db
 import random
-from typing import List, Dict
+from typing import List, Dict, Iterable
+from ban_engine import generate_bans
+from draft_board import DraftBoard, BOARD_CSS, show_draft_board
+from draft_log import DraftLog, ROLES, SELECT, CAPTAINS, ROLE, ROLE_SET, BANS, RESET, select_players, show_draft_tools
+from player_table import get_player_table
+from player_search import show_player_filter, player_multiselect
+from teammates import record_teams
 
-ROLES = ["Top", "Jungle", "Mid", "ADC", "Support"]
+ROLE_KEY_PREFIX = "manual_role_"
+NOT_ASSIGNED = "Not assigned"
+
+def _drop_stale_role_keys(keep: Iterable[str] = ()):
+    """Forget role widgets of players no longer in the draft, so their keys don't pile up across drafts."""
+    keep = set(keep)
+    for key in [k for k in st.session_state if k.startswith(ROLE_KEY_PREFIX) and k not in keep]:
+        del st.session_state[key]
+
+def _draft_log() -> DraftLog:
+    if 'manual_draft_log' not in st.session_state:
+        st.session_state.manual_draft_log = DraftLog()
+    return st.session_state.manual_draft_log
+
+def _set_captains(id_of: Dict[str, int]):
+    log = _draft_log()
+    captain_a = id_of[st.session_state.manual_team_a_captain]
+    captain_b = id_of[st.session_state.manual_team_b_captain]
+    if captain_a == captain_b:
+        # Team A took Team B's captain: swap them
+        captain_b = log.state.captain_a
+    if (captain_a, captain_b) != (log.state.captain_a, log.state.captain_b):
+        log.append((CAPTAINS, captain_a, captain_b))
+
+def _randomize_captains():
+    log = _draft_log()
+    log.append((CAPTAINS, *random.sample(log.state.selected, 2)))
+
+def _set_role(player_id: int, key: str):
+    role = st.session_state[key]
+    _draft_log().append((ROLE, player_id, None if role == NOT_ASSIGNED else role))
+
+def _randomize_roles(team: List[Dict]):
+    roles = ROLES.copy()
+    random.shuffle(roles)
+    _draft_log().append((ROLE_SET, tuple((p['id'], role) for p, role in zip(team, roles)), ""))
+
+def _generate_bans(players: List[Dict], num_bans: int, additional_random_bans: int, weighted_bans: bool):
+    log = _draft_log()
+    bans = generate_bans(players, num_bans, additional_random_bans, weighted_bans)
+    log.append((BANS, tuple(bans)))
+    # The draft is final: remember who played together
+    record_teams('manual_recorded_teams', [list(log.state.team_a), list(log.state.team_b)])
+
+def _reset(part: str):
+    log = _draft_log()
+    if (part == "roles" and log.state.roles) or (part == "bans" and log.state.bans):
+        log.append((RESET, part))
+
+def _start_new_draft():
+    _drop_stale_role_keys()
+    for key in ['manual_draft_log', 'manual_team_a_captain', 'manual_team_b_captain', 'manual_recorded_teams']:
+        if key in st.session_state:
+            del st.session_state[key]
+
+def _role_column(board: DraftBoard, side: str, title: str):
+    st.subheader(f"{title} Roles")
+    roles = board.state.role_map()
+    team = board.team_players(side)
+    for p in team:
+        key = f"{ROLE_KEY_PREFIX}{side}_{p['id']}"
+        # The widget shows the draft's role; changing it adds a role event
+        st.session_state[key] = roles.get(p['id'], NOT_ASSIGNED)
+        st.selectbox(f"Role for {p['name']}", [NOT_ASSIGNED] + ROLES, key=key, on_change=_set_role, args=(p['id'], key))
+    # Check for duplicate roles
+    assigned_roles = [roles[p['id']] for p in team if p['id'] in roles]
+    if len(set(assigned_roles)) < len(assigned_roles):
+        st.warning(f"Duplicate roles assigned in {title}!")
+    st.button(f"Randomize {title} Roles", key=f"manual_randomize_roles_{side}", on_click=_randomize_roles, args=(team,))
 
 def show_manual_draft():
     st.title("Manual Team Draft")
     st.sidebar.header("Manual Draft Configuration")
     num_bans = st.sidebar.number_input("Number of Bans to Select from Pool", min_value=0, max_value=20, value=10, key="manual_num_bans")
     additional_random_bans = st.sidebar.number_input("Number of Additional Random Bans", min_value=0, max_value=10, value=0, key="manual_additional_random_bans")
+    weighted_bans = st.sidebar.checkbox("Favor Champions Shared by Several Players", value=True, key="manual_weighted_bans")
+    show_advice = st.sidebar.checkbox("Suggest Picks", value=True, key="manual_show_advice",
+                                      help="Look ahead through the remaining picks and suggest one for the captain whose turn it is")
 
     # Step 1: Select Players (same as draft_creator)
     st.header("Step 1: Select Players")
-    if 'db_bytes' not in st.session_state:
+    if not db.has_database():
         st.warning("No player database loaded. Please upload a .db file in the Player Management page to begin.")
         return
-    players = db.get_all_players()
-    if not players:
+    table = get_player_table()
+    if not table:
         st.error("No players available. Please add players in the Player Management page.")
         return
-    player_names = [player['name'] for player in players]
-    selected_names = st.multiselect(
-        "Select 10 Players",
-        player_names,
-        max_selections=10,
-        key="manual_selected_players"
-    )
+    log = _draft_log()
+    with st.expander("Search Players"):
+        matches = show_player_filter("manual")
+    selected_names = player_multiselect("Select 10 Players", table, matches, key="manual_selected_players", max_selections=10)
     if len(selected_names) == 10:
-        selected_players = [p for p in players if p['name'] in selected_names]
-        st.session_state.manual_selected_players_objs = selected_players
+        selected_ids = tuple(table.ids_for_names(selected_names))
+        # A new selection starts a new draft, captained by the first two players until changed
+        log = select_players('manual_draft_log', selected_ids, (CAPTAINS, selected_ids[0], selected_ids[1]))
+        if log.state.captain_a is None:
+            log.append((CAPTAINS, selected_ids[0], selected_ids[1]))
         st.success("10 players selected!")
     else:
         st.warning(f"Please select exactly 10 players. Currently selected: {len(selected_names)}")
-        st.session_state.manual_selected_players_objs = []
+        if log.state.selected:
+            log.append((SELECT, ()))
+        _drop_stale_role_keys()
+    show_draft_tools('manual_draft_log', table, "manual_selected_players")
+    selected = table.lookup(log.state.selected)
+    if len(selected) == 10:
+        _show_draft_steps(log, selected, num_bans, additional_random_bans, weighted_bans, show_advice)
+    # Reset all
+    st.button("Start New Manual Draft", on_click=_start_new_draft)
 
+def _show_draft_steps(log: DraftLog, selected: List[Dict], num_bans: int, additional_random_bans: int,
+                      weighted_bans: bool, show_advice: bool):
+    """Steps 2-5 for a draft of ten selected players."""
+    state = log.state
     # Step 2: Captain Selection
-    if st.session_state.get('manual_selected_players_objs'):
-        st.header("Step 2: Select Captains")
-        player_names = [p['name'] for p in st.session_state.manual_selected_players_objs]
-        # Handle randomization before widgets are created
-        if st.session_state.get('manual_randomize_captains', False):
-            random_captains = random.sample(player_names, 2)
-            st.session_state.manual_team_a_captain = random_captains[0]
-            st.session_state.manual_team_b_captain = random_captains[1]
-            st.session_state.manual_randomize_captains = False
-        col1, col2 = st.columns(2)
-        with col1:
-            team_a_captain = st.selectbox("Select Team A Captain", player_names, key="manual_team_a_captain")
-        with col2:
-            team_b_captain = st.selectbox("Select Team B Captain", [n for n in player_names if n != team_a_captain], key="manual_team_b_captain")
-        if st.button("Randomly Select Captains"):
-            st.session_state.manual_randomize_captains = True
-            st.rerun()
+    st.header("Step 2: Select Captains")
+    player_names = [p['name'] for p in selected]
+    name_of = {p['id']: p['name'] for p in selected}
+    id_of = {p['name']: p['id'] for p in selected}
+    # The selectboxes show the draft's captains; changing one adds a captains event
+    st.session_state.manual_team_a_captain = name_of[state.captain_a]
+    st.session_state.manual_team_b_captain = name_of[state.captain_b]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.selectbox("Select Team A Captain", player_names, key="manual_team_a_captain",
+                     on_change=_set_captains, args=(id_of,))
+    with col2:
+        st.selectbox("Select Team B Captain", [n for n in player_names if n != name_of[state.captain_a]],
+                     key="manual_team_b_captain", on_change=_set_captains, args=(id_of,))
+    st.button("Randomly Select Captains", on_click=_randomize_captains)
 
     # Step 3: Manual Drafting
-    if st.session_state.get('manual_selected_players_objs') and 'team_a_captain' in locals() and 'team_b_captain' in locals():
-        st.header("Step 3: Draft Teams")
-        # Ensure team and pool lists are always initialized and always reflect current captains if only captains are present
-        just_captains = (
-            len(st.session_state.get('manual_team_a', [])) <= 1 and
-            len(st.session_state.get('manual_team_b', [])) <= 1 and
-            len(st.session_state.get('manual_player_pool', [])) >= 8
-        )
-        if (
-            'manual_team_a' not in st.session_state or
-            'manual_team_b' not in st.session_state or
-            'manual_player_pool' not in st.session_state or
-            just_captains or
-            (st.session_state.manual_team_a and st.session_state.manual_team_a[0]['name'] != team_a_captain) or
-            (st.session_state.manual_team_b and st.session_state.manual_team_b[0]['name'] != team_b_captain)
-        ):
-            st.session_state.manual_team_a = [p for p in st.session_state.manual_selected_players_objs if p['name'] == team_a_captain]
-            st.session_state.manual_team_b = [p for p in st.session_state.manual_selected_players_objs if p['name'] == team_b_captain]
-            st.session_state.manual_player_pool = [p for p in st.session_state.manual_selected_players_objs if p['name'] not in [team_a_captain, team_b_captain]]
-        # Add custom CSS for columns and animation
-        st.markdown(
-            '''
-            <style>
-            .team-col {
-                background: #e3f2fd;
-                border: 2px solid #1976d2;
-                border-radius: 12px;
-                padding: 18px 12px 12px 12px;
-                margin-bottom: 8px;
-                min-height: 320px;
-                box-shadow: 0 2px 8px rgba(25, 118, 210, 0.08);
-                transition: box-shadow 0.3s;
-            }
-            .team-col.team-b {
-                background: #fce4ec;
-                border-color: #d81b60;
-                box-shadow: 0 2px 8px rgba(216, 27, 96, 0.08);
-            }
-            .team-col.available {
-                background: #f3e5f5;
-                border-color: #7b1fa2;
-                box-shadow: 0 2px 8px rgba(123, 31, 162, 0.08);
-            }
-            .player-flash {
-                animation: flash 0.7s;
-            }
-            @keyframes flash {
-                0% { background: #fffde7; }
-                50% { background: #fff176; }
-                100% { background: inherit; }
-            }
-            </style>
-            ''', unsafe_allow_html=True)
-        # Animate if a player was just added
-        flash_a = st.session_state.pop('manual_flash_a', None)
-        flash_b = st.session_state.pop('manual_flash_b', None)
-        col1, col2, col3 = st.columns([1,2,1])
-        with col1:
-            # Build Team A HTML block
-            team_a_html = f'<div class="team-col">'
-            team_a_html += '<h3 style="margin-top:0">Team A</h3>'
-            for p in st.session_state.manual_team_a:
-                flash_class = " player-flash" if flash_a == p['name'] else ""
-                team_a_html += f'<div class="{flash_class}">{"• <b>" if p["name"] == team_a_captain else "• "}{p["name"]} ({p["rank"]}){" (Captain)</b>" if p["name"] == team_a_captain else ""}</div>'
-            team_a_html += '</div>'
-            st.markdown(team_a_html, unsafe_allow_html=True)
-            if st.session_state.manual_player_pool and len(st.session_state.manual_team_a) < 5:
-                pick = st.selectbox("Add to Team A", [p['name'] for p in st.session_state.manual_player_pool], key="manual_pick_a")
-                if st.button("Add to Team A", key="manual_add_a"):
-                    player = next(p for p in st.session_state.manual_player_pool if p['name'] == pick)
-                    st.session_state.manual_team_a.append(player)
-                    st.session_state.manual_player_pool = [p for p in st.session_state.manual_player_pool if p['name'] != pick]
-                    st.session_state.manual_flash_a = pick
-                    st.rerun()
-        with col2:
-            # Build Available Players HTML block
-            avail_html = f'<div class="team-col available">'
-            avail_html += '<h3 style="margin-top:0">Available Players</h3>'
-            for p in st.session_state.manual_player_pool:
-                avail_html += f'<div>• {p["name"]} ({p["rank"]})</div>'
-            avail_html += '</div>'
-            st.markdown(avail_html, unsafe_allow_html=True)
-        with col3:
-            # Build Team B HTML block
-            team_b_html = f'<div class="team-col team-b">'
-            team_b_html += '<h3 style="margin-top:0">Team B</h3>'
-            for p in st.session_state.manual_team_b:
-                flash_class = " player-flash" if flash_b == p['name'] else ""
-                team_b_html += f'<div class="{flash_class}">{"• <b>" if p["name"] == team_b_captain else "• "}{p["name"]} ({p["rank"]}){" (Captain)</b>" if p["name"] == team_b_captain else ""}</div>'
-            team_b_html += '</div>'
-            st.markdown(team_b_html, unsafe_allow_html=True)
-            if st.session_state.manual_player_pool and len(st.session_state.manual_team_b) < 5:
-                pick = st.selectbox("Add to Team B", [p['name'] for p in st.session_state.manual_player_pool], key="manual_pick_b")
-                if st.button("Add to Team B", key="manual_add_b"):
-                    player = next(p for p in st.session_state.manual_player_pool if p['name'] == pick)
-                    st.session_state.manual_team_b.append(player)
-                    st.session_state.manual_player_pool = [p for p in st.session_state.manual_player_pool if p['name'] != pick]
-                    st.session_state.manual_flash_b = pick
-                    st.rerun()
-        # Reset draft
-        if st.button("Reset Draft Teams"):
-            st.session_state.manual_team_a = [p for p in st.session_state.manual_selected_players_objs if p['name'] == team_a_captain]
-            st.session_state.manual_team_b = [p for p in st.session_state.manual_selected_players_objs if p['name'] == team_b_captain]
-            st.session_state.manual_player_pool = [p for p in st.session_state.manual_selected_players_objs if p['name'] not in [team_a_captain, team_b_captain]]
-            st.rerun()
+    st.header("Step 3: Draft Teams")
+    board = DraftBoard(selected, log)
+    # The stylesheet lives outside the board fragment so picks don't resend it
+    st.markdown(BOARD_CSS, unsafe_allow_html=True)
+    show_draft_board(board, show_advice)
 
     # Step 4: Role Selection
-    if len(st.session_state.get('manual_team_a', [])) == 5 and len(st.session_state.get('manual_team_b', [])) == 5:
+    if board.is_complete():
         st.header("Step 4: Assign Roles")
-        if 'manual_team_a_roles' not in st.session_state:
-            st.session_state.manual_team_a_roles = {}
-        if 'manual_team_b_roles' not in st.session_state:
-            st.session_state.manual_team_b_roles = {}
+        _drop_stale_role_keys(f"{ROLE_KEY_PREFIX}{side}_{player_id}"
+                              for side in 'ab' for player_id in board.state.team(side))
         col1, col2 = st.columns(2)
         with col1:
-            st.subheader("Team A Roles")
-            for p in st.session_state.manual_team_a:
-                role = st.selectbox(
-                    f"Role for {p['name']}",
-                    ["Not assigned"] + ROLES,
-                    index=(1 + ROLES.index(st.session_state.manual_team_a_roles[p['name']]) if p['name'] in st.session_state.manual_team_a_roles and st.session_state.manual_team_a_roles[p['name']] in ROLES else 0),
-                    key=f"manual_role_a_{p['name']}"
-                )
-                if role != "Not assigned":
-                    st.session_state.manual_team_a_roles[p['name']] = role
-                elif p['name'] in st.session_state.manual_team_a_roles:
-                    del st.session_state.manual_team_a_roles[p['name']]
-            # Check for duplicate roles
-            assigned_roles = [r for r in st.session_state.manual_team_a_roles.values() if r != "Not assigned"]
-            if len(set(assigned_roles)) < len(assigned_roles):
-                st.warning("Duplicate roles assigned in Team A!")
-            if st.button("Randomize Team A Roles"):
-                roles = ROLES.copy()
-                random.shuffle(roles)
-                st.session_state.manual_team_a_roles = {p['name']: role for p, role in zip(st.session_state.manual_team_a, roles)}
-                st.rerun()
+            _role_column(board, 'a', "Team A")
         with col2:
-            st.subheader("Team B Roles")
-            for p in st.session_state.manual_team_b:
-                role = st.selectbox(
-                    f"Role for {p['name']}",
-                    ["Not assigned"] + ROLES,
-                    index=(1 + ROLES.index(st.session_state.manual_team_b_roles[p['name']]) if p['name'] in st.session_state.manual_team_b_roles and st.session_state.manual_team_b_roles[p['name']] in ROLES else 0),
-                    key=f"manual_role_b_{p['name']}"
-                )
-                if role != "Not assigned":
-                    st.session_state.manual_team_b_roles[p['name']] = role
-                elif p['name'] in st.session_state.manual_team_b_roles:
-                    del st.session_state.manual_team_b_roles[p['name']]
-            # Check for duplicate roles
-            assigned_roles = [r for r in st.session_state.manual_team_b_roles.values() if r != "Not assigned"]
-            if len(set(assigned_roles)) < len(assigned_roles):
-                st.warning("Duplicate roles assigned in Team B!")
-            if st.button("Randomize Team B Roles"):
-                roles = ROLES.copy()
-                random.shuffle(roles)
-                st.session_state.manual_team_b_roles = {p['name']: role for p, role in zip(st.session_state.manual_team_b, roles)}
-                st.rerun()
-        # Reset roles
-        if st.button("Reset Roles"):
-            st.session_state.manual_team_a_roles = {}
-            st.session_state.manual_team_b_roles = {}
-            st.rerun()
+            _role_column(board, 'b', "Team B")
+        st.button("Reset Roles", on_click=_reset, args=("roles",))
 
     # Step 5: Ban Phase
-    if len(st.session_state.get('manual_team_a_roles', {})) == 5 and len(st.session_state.get('manual_team_b_roles', {})) == 5:
+    if board.state.roles_complete():
         st.header("Step 5: Ban Phase")
-        if 'manual_banned_champions' not in st.session_state:
-            st.session_state.manual_banned_champions = []
-        if st.button("Generate Bans"):
-            # Collect all primary champions from both teams
-            all_players = st.session_state.manual_team_a + st.session_state.manual_team_b
-            potential_bans = set()
-            for player in all_players:
-                for champ in [player['primary_champion_1'], player['primary_champion_2'], player['primary_champion_3']]:
-                    if champ:
-                        potential_bans.add(champ)
-            potential_bans = list(potential_bans)
-            random.shuffle(potential_bans)
-            bans = potential_bans[:num_bans]
-            if additional_random_bans > 0:
-                all_champions = db.get_champions()
-                available_champions = [champ for champ in all_champions if champ not in bans]
-                random.shuffle(available_champions)
-                bans.extend(available_champions[:additional_random_bans])
-            st.session_state.manual_banned_champions = bans
-        if st.session_state.manual_banned_champions:
+        st.button("Generate Bans", on_click=_generate_bans,
+                  args=(board.team_players('a') + board.team_players('b'), num_bans, additional_random_bans, weighted_bans))
+        if board.state.bans:
             st.subheader("Banned Champions")
-            for champ in st.session_state.manual_banned_champions:
+            for champ in board.state.bans:
                 st.write(f"• {champ}")
-        if st.button("Reset Bans"):
-            st.session_state.manual_banned_champions = []
-            st.rerun()
-    # Reset all
-    if st.button("Start New Manual Draft"):
-        for key in [
-            'manual_selected_players_objs', 'manual_team_a_captain', 'manual_team_b_captain',
-            'manual_team_a', 'manual_team_b', 'manual_player_pool',
-            'manual_team_a_roles', 'manual_team_b_roles', 'manual_banned_champions']:
-            if key in st.session_state:
-                del st.session_state[key]
-        st.rerun() 
\ No newline at end of file
+        st.button("Reset Bans", on_click=_reset, args=("bans",))
@@ -0,0 +1,223 @@
+"""Pick suggestions for the manual draft that keep the teams even.
+
+Captains pick in turn: the smaller team picks next, Team A on ties. A
+finished draft costs its rank-total gap between the teams, plus a quarter
+tier for every champion two teammates share. The roster has no player roles,
+so champion pools stand in for role coverage: teammates who play the same
+champions cover fewer of them. The advisor plays out the remaining picks
+with minimax and alpha-beta pruning: the captain it advises picks to make
+the cost as low as possible, assuming the other captain picks to make it as
+high as possible. The suggested pick therefore bounds the final gap
+whatever the other captain does. When both captains follow the advice, the
+teams end much closer than when each takes the best-ranked player left
+(see benchmarks/bench_pick_advisor.py).
+
+Positions are keyed on bitmasks of the players still in the pool and those
+on Team A. The many pick orders that reach the same rosters are only searched
+once. A 10-player lobby (8 picks) is searched to the end in a few
+milliseconds. Bigger pools are searched with iterative deepening until the
+time budget runs out. Unfinished drafts are then scored by handing out the
+rest of the pool in turn, best-ranked first.
+"""
+import time
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import database as db
+from draft_log import DraftState
+
+# One rank tier of imbalance costs as much as this many champions shared by teammates
+RANK_WEIGHT = 4
+# Seconds a search may take before it settles for the deepest finished pass
+TIME_BUDGET = 0.08
+# Check the clock every this many positions
+_CLOCK_INTERVAL = 512
+
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+# (player id, rank value, champions)
+Profile = Tuple[int, int, Tuple[str, ...]]
+
+class Advice(NamedTuple):
+    """The suggested pick for the captain whose turn it is."""
+    player_id: int
+    side: str
+    # Highest final cost, in rank tiers, the other captain can force after this pick.
+    # The rank-total gap between the teams ends no larger than this.
+    worst_gap: float
+    # Picks searched ahead, and whether that reached the end of the draft
+    depth: int
+    exhaustive: bool
+
+class _OutOfTime(Exception):
+    pass
+
+def next_side(team_a: int, team_b: int, team_size: int) -> Optional[str]:
+    """The side whose turn it is, given the team sizes: the smaller team picks, Team A on ties."""
+    if team_a < team_size and (team_a <= team_b or team_b == team_size):
+        return 'a'
+    if team_b < team_size:
+        return 'b'
+    return None
+
+def _bits(mask: int) -> int:
+    return bin(mask).count("1")
+
+class _Search:
+    """Minimax over one draft's imbalance. Players are indexes into `values`, teams and the pool are bitmasks.
+
+    The advised captain (`side`) picks to make the final cost as low as
+    possible, and the other captain is assumed to pick to make it as high as
+    possible.
+    """
+
+    def __init__(self, values: Sequence[int], champions: Sequence[int], team_size: int, side: str,
+                 deadline: Optional[float]):
+        self.values = values
+        self.champions = champions
+        self.team_size = team_size
+        self.side = side
+        self.deadline = deadline
+        # Strongest players first: the picks that move the balance most are tried first
+        self.order = sorted(range(len(values)), key=lambda i: (-values[i], -_bits(champions[i]), i))
+        # (pool, team A) -> (depth, value, bound, best move)
+        self.table = {}
+        self.positions = 0
+
+    def estimate(self, pool: int, na: int, nb: int, rank_diff: int, champs_a: int, champs_b: int,
+                 overlap: int) -> int:
+        """Cost of the draft if the rest of the pool were handed out in turn, best-ranked first."""
+        for i in self.order:
+            if pool >> i & 1:
+                champs = self.champions[i]
+                if next_side(na, nb, self.team_size) == 'a':
+                    na, rank_diff, overlap = na + 1, rank_diff + self.values[i], overlap + _bits(champs_a & champs)
+                    champs_a |= champs
+                else:
+                    nb, rank_diff, overlap = nb + 1, rank_diff - self.values[i], overlap + _bits(champs_b & champs)
+                    champs_b |= champs
+        return _cost(rank_diff, overlap)
+
+    def moves(self, pool: int, first: Optional[int]) -> List[int]:
+        moves = [i for i in self.order if pool >> i & 1 and i != first]
+        if first is not None:
+            moves.insert(0, first)
+        return moves
+
+    def search(self, pool: int, team_a: int, na: int, nb: int, rank_diff: int, champs_a: int, champs_b: int,
+               overlap: int, depth: int, alpha: float, beta: float) -> int:
+        if not pool:
+            return _cost(rank_diff, overlap)
+        self.positions += 1
+        if self.deadline is not None and self.positions % _CLOCK_INTERVAL == 0 \
+                and time.perf_counter() > self.deadline:
+            raise _OutOfTime
+        if depth == 0:
+            return self.estimate(pool, na, nb, rank_diff, champs_a, champs_b, overlap)
+        key = (pool, team_a)
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, value, bound, first = entry
+            if entry_depth >= depth and (bound == _EXACT or (bound == _LOWER and value >= beta)
+                                         or (bound == _UPPER and value <= alpha)):
+                return value
+        window = (alpha, beta)
+        turn = next_side(na, nb, self.team_size)
+        minimizing = turn == self.side
+        best, best_move = None, None
+        for i in self.moves(pool, first):
+            bit = 1 << i
+            champs = self.champions[i]
+            if turn == 'a':
+                value = self.search(pool ^ bit, team_a | bit, na + 1, nb, rank_diff + self.values[i],
+                                    champs_a | champs, champs_b, overlap + _bits(champs_a & champs),
+                                    depth - 1, alpha, beta)
+            else:
+                value = self.search(pool ^ bit, team_a, na, nb + 1, rank_diff - self.values[i],
+                                    champs_a, champs_b | champs, overlap + _bits(champs_b & champs),
+                                    depth - 1, alpha, beta)
+            if minimizing:
+                if best is None or value < best:
+                    best, best_move = value, i
+                beta = min(beta, value)
+            else:
+                if best is None or value > best:
+                    best, best_move = value, i
+                alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        bound = _LOWER if best >= window[1] else _UPPER if best <= window[0] else _EXACT
+        self.table[key] = (depth, best, bound, best_move)
+        return best
+
+def _cost(rank_diff: int, overlap: int) -> int:
+    return abs(rank_diff) * RANK_WEIGHT + overlap
+
+def advise(values: Sequence[int], champions: Sequence[Iterable[str]], team_a: Sequence[int],
+           team_b: Sequence[int], time_budget: float = TIME_BUDGET) -> Optional[Tuple[int, str, float, int, bool]]:
+    """Suggest the next pick for players given by rank value and champions.
+
+    `team_a` and `team_b` are indexes of the players already on each team;
+    everyone else is in the pool. Returns (player index, side, worst gap,
+    depth, exhaustive) as in Advice, or None when the teams are full.
+    """
+    team_size = len(values) // 2
+    side = next_side(len(team_a), len(team_b), team_size)
+    if side is None:
+        return None
+    codes = {}
+    masks = [sum(1 << codes.setdefault(c, len(codes)) for c in set(filter(None, player))) for player in champions]
+    taken = set(team_a) | set(team_b)
+    pool = sum(1 << i for i in range(len(values)) if i not in taken)
+    team_mask = sum(1 << i for i in team_a)
+    rank_diff = sum(values[i] for i in team_a) - sum(values[i] for i in team_b)
+    champs_a = champs_b = overlap = 0
+    for i in team_a:
+        overlap += _bits(champs_a & masks[i])
+        champs_a |= masks[i]
+    for i in team_b:
+        overlap += _bits(champs_b & masks[i])
+        champs_b |= masks[i]
+
+    start = time.perf_counter()
+    remaining = _bits(pool)
+    search = _Search(values, masks, team_size, side, None)
+    result = None
+    for depth in range(1, remaining + 1):
+        try:
+            value = search.search(pool, team_mask, len(team_a), len(team_b), rank_diff, champs_a, champs_b,
+                                  overlap, depth, float("-inf"), float("inf"))
+        except _OutOfTime:
+            break
+        result = (search.table[(pool, team_mask)][3], side, value / RANK_WEIGHT, depth, depth == remaining)
+        # The first pass always finishes; deeper ones stop at the deadline
+        search.deadline = start + time_budget
+    return result
+
+@lru_cache(maxsize=256)
+def _cached_advice(team_a: Tuple[Profile, ...], team_b: Tuple[Profile, ...],
+                   pool: Tuple[Profile, ...]) -> Optional[Advice]:
+    players = team_a + team_b + pool
+    result = advise([p[1] for p in players], [p[2] for p in players],
+                    range(len(team_a)), range(len(team_a), len(team_a) + len(team_b)))
+    if result is None:
+        return None
+    index, side, worst_gap, depth, exhaustive = result
+    return Advice(players[index][0], side, worst_gap, depth, exhaustive)
+
+def _profile(player) -> Profile:
+    champions = (player.get('primary_champion_1'), player.get('primary_champion_2'), player.get('primary_champion_3'))
+    return (player['id'], db.get_rank_value(player['rank']), tuple(c for c in champions if c))
+
+def advise_draft(state: DraftState, players) -> Optional[Advice]:
+    """The suggested pick for a manual draft, or None before captains are set or once the teams are full.
+
+    `players` maps the draft's player ids to their rows. Answers are cached,
+    so reruns and other sessions at the same point of a draft don't search again.
+    """
+    if state.captain_a is None:
+        return None
+    return _cached_advice(tuple(_profile(players[i]) for i in state.team_a),
+                          tuple(_profile(players[i]) for i in state.team_b),
+                          tuple(_profile(players[i]) for i in state.pool))
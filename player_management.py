@@ -1,8 +1,12 @@
 import streamlit as st
 import database as db
-from typing import Optional, Dict
+import roster_store
+import roster_io
+import jobs
+from player_search import show_player_filter
+from draft_board import fragment
+from typing import Optional, Dict, List
 import pandas as pd
-import os
 import sqlite3
 import io
 import base64
@@ -10,9 +14,12 @@ import requests
 from bs4 import BeautifulSoup
 import re
 
+# Duplicate groups listed for review at once
+MAX_REVIEW_GROUPS = 50
+
 def get_champion_list():
     # Try to get from DB, else from CSV
-    if 'db_bytes' in st.session_state:
+    if db.has_database():
         return db.get_champions()
     else:
         try:
@@ -21,6 +28,147 @@ def get_champion_list():
         except Exception:
             return []
 
+def show_shared_rosters():
+    """Open or create a roster stored on this server instead of uploading a file."""
+    current = st.session_state.get('roster_name')
+    with st.expander("Shared Rosters", expanded=current is not None):
+        if current:
+            st.info(f"Using shared roster '{current}'. Changes are saved on the server immediately.")
+        col1, col2 = st.columns(2)
+        with col1:
+            rosters = roster_store.list_rosters()
+            choice = st.selectbox("Shared Roster", rosters, key="shared_roster_choice")
+            if st.button("Open Roster", disabled=not rosters):
+                try:
+                    db.attach_roster(choice)
+                    st.rerun()
+                except KeyError as e:
+                    st.error(str(e))
+        with col2:
+            new_name = st.text_input("New Roster Name", key="shared_roster_new_name")
+            label = "Save Current Database as Roster" if db.has_uploaded_database() else "Create Empty Roster"
+            if st.button(label):
+                try:
+                    db.save_session_as_roster(new_name)
+                    st.rerun()
+                except FileExistsError:
+                    st.error(f"A roster named '{new_name}' already exists.")
+                except ValueError as e:
+                    st.error(str(e))
+        if current and st.button("Leave Shared Roster"):
+            db.detach_roster()
+            st.rerun()
+
+def show_export():
+    """Download the database as-is, or compressed/converted on request."""
+    formats = roster_io.export_formats()
+    label = st.selectbox("Export Format", list(formats), key="export_format")
+    unavailable = roster_io.unavailable_formats()
+    if unavailable:
+        st.caption(f"Not available on this server: {', '.join(unavailable)}.")
+    extension, mime = formats[label]
+    file_name = f"exported_lol_custom_organizer{extension}"
+    if extension == ".db":
+        st.download_button(
+            label="Export Current Database (.db)",
+            data=db.get_db_bytes(),
+            file_name=file_name,
+            mime=mime
+        )
+        return
+    # Compressing on every rerun would be wasted work, so build the file once and
+    # keep it until the format or the database changes
+    prepared = st.session_state.get('prepared_export')
+    version = db.export_version()
+    if prepared is None or prepared['label'] != label or prepared['version'] != version:
+        if st.button(f"Prepare {extension} Export"):
+            with st.spinner("Preparing export..."):
+                data = roster_io.export_roster(label)
+            st.session_state['prepared_export'] = {'label': label, 'version': version, 'data': data}
+            st.rerun()
+        return
+    st.download_button(
+        label=f"Export Current Database ({extension}, {len(prepared['data']) / 1024:.0f} KB)",
+        data=prepared['data'],
+        file_name=file_name,
+        mime=mime
+    )
+
+def undo_last_change():
+    try:
+        label = db.undo()
+        if label:
+            st.session_state['undo_message'] = ('info', f"Undid: {label}")
+    except ValueError as e:
+        st.session_state['undo_message'] = ('error', str(e))
+
+def redo_last_change():
+    try:
+        label = db.redo()
+        if label:
+            st.session_state['undo_message'] = ('info', f"Redid: {label}")
+    except ValueError as e:
+        st.session_state['undo_message'] = ('error', str(e))
+
+def show_undo_redo():
+    """Undo/redo buttons for this session's edits. They run as callbacks so the page below shows the result."""
+    changes = db.get_history()
+    next_undo, next_redo = changes.next_undo(), changes.next_redo()
+    col_undo, col_redo = st.columns(2)
+    with col_undo:
+        st.button(f"Undo: {next_undo.label}" if next_undo else "Undo", key="undo_button",
+                  disabled=next_undo is None, on_click=undo_last_change)
+    with col_redo:
+        st.button(f"Redo: {next_redo.label}" if next_redo else "Redo", key="redo_button",
+                  disabled=next_redo is None, on_click=redo_last_change)
+    if 'undo_message' in st.session_state:
+        level, text = st.session_state.pop('undo_message')
+        getattr(st, level)(text)
+
+def _close_review_page(merge: bool):
+    """Merge the ticked groups on the review page (or none), then move on to the next page of groups."""
+    review = st.session_state['duplicate_review']
+    page = review['groups'][:MAX_REVIEW_GROUPS]
+    chosen = [[p['id'] for p in group['players']] for i, group in enumerate(page)
+              if st.session_state.pop(f"duplicate_group_{i}", False)]
+    if merge:
+        removed = db.merge_players(chosen)
+        st.session_state['duplicate_message'] = (
+            f"Merged {len(chosen)} group(s), removing {removed} duplicate player(s).")
+    review['groups'] = review['groups'][MAX_REVIEW_GROUPS:]
+    review['version'] = db.database_version()
+
+def show_duplicate_review():
+    """Offer to merge players that look like duplicates. Runs by itself after every import."""
+    if st.session_state.pop('check_duplicates', False) or st.button("Find Duplicate Players", key="find_duplicates"):
+        groups = db.find_duplicate_players()
+        st.session_state['duplicate_review'] = {'version': db.database_version(), 'groups': groups}
+        if not groups:
+            st.info("No duplicate players found.")
+    if 'duplicate_message' in st.session_state:
+        st.success(st.session_state.pop('duplicate_message'))
+    review = st.session_state.get('duplicate_review')
+    if review is None:
+        return
+    if review['version'] != db.database_version() or not review['groups']:
+        # The roster changed since the check; the groups may no longer be right
+        del st.session_state['duplicate_review']
+        return
+    groups = review['groups']
+    with st.expander(f"Possible duplicate players ({len(groups)})", expanded=True):
+        if len(groups) > MAX_REVIEW_GROUPS:
+            st.caption(f"Showing the first {MAX_REVIEW_GROUPS}. Merge or dismiss them to see the rest.")
+        with st.form("duplicate_review_form"):
+            st.caption("Groups with the same name or OP.GG link are ticked; check the similar-name ones yourself.")
+            for i, group in enumerate(groups[:MAX_REVIEW_GROUPS]):
+                label = " / ".join(f"{p['name']} ({p['rank']})" for p in group['players'])
+                st.checkbox(label, value=group['certain'], key=f"duplicate_group_{i}")
+            col_merge, col_dismiss = st.columns(2)
+            with col_merge:
+                st.form_submit_button("Merge Selected", on_click=_close_review_page, args=(True,))
+            with col_dismiss:
+                st.form_submit_button("Dismiss", on_click=_close_review_page, args=(False,))
+
 def show_player_management():
     st.title("Player Management")
     
@@ -54,7 +202,7 @@ def show_player_management():
             submitted = st.form_submit_button("Add Player")
             if submitted:
                 if name:
-                    if 'db_bytes' in st.session_state:
+                    if db.has_database():
                         success = db.add_player(
                             name=name,
                             rank=rank,
@@ -90,6 +238,10 @@ def show_player_management():
 
     # View/Modify Players Section
     st.header("Current Player List")
+
+    # --- Shared server-side rosters ---
+    if roster_store.enabled():
+        show_shared_rosters()
     
     # --- Upload DB/CSV file section ---
     if st.session_state.get('db_uploaded', False):
@@ -97,15 +249,16 @@ def show_player_management():
         uploaded_db = None
     else:
         uploaded_db = st.file_uploader(
-            "Upload a new player database (.db or .csv)",
-            type=["db", "csv"],
-            help="This will replace the current player database. Accepts .db or .csv files.",
+            "Upload a new player database (.db, .csv, .jsonl or .parquet)",
+            type=["db", "csv", "gz", "zst", "jsonl", "parquet"],
+            help="This will replace the current player database. Accepts .db, .csv, .jsonl or .parquet files; "
+                 ".db and .jsonl files may be gzip (.gz) or zstd (.zst) compressed.",
             accept_multiple_files=False
         )
         if uploaded_db is not None:
             ext = uploaded_db.name.lower().split('.')[-1]
-            if ext == 'db':
-                # Check file extension
+            if ext != 'csv':
+                # Limits the upload itself; roster_io limits its decompressed size
                 max_size_mb = 5
                 uploaded_db.seek(0, 2)  # Move to end of file
                 size_mb = uploaded_db.tell() / (1024 * 1024)
@@ -114,28 +267,21 @@ def show_player_management():
                     st.error(f"File is too large. Maximum allowed size is {max_size_mb} MB.")
                 else:
                     try:
-                        db_bytes = uploaded_db.read()
-                        # Validate the uploaded DB has the 'players' table
-                        mem_conn = sqlite3.connect(":memory:")
-                        mem_conn.row_factory = sqlite3.Row
-                        with open("temp_uploaded.db", "wb") as tempf:
-                            tempf.write(db_bytes)
-                        tempf = sqlite3.connect("temp_uploaded.db")
-                        try:
-                            tempf.execute("SELECT 1 FROM players LIMIT 1")
-                            tempf.close()
-                            # Load into session
-                            import database
-                            database.load_db_file_to_session(db_bytes)
-                            st.success("Database uploaded and loaded into your session! Reloading...")
-                            st.session_state['db_uploaded'] = True
-                            st.rerun()
-                        except Exception as e:
-                            tempf.close()
-                            st.error(f"Uploaded database is invalid or missing the 'players' table: {e}")
+                        db_bytes = roster_io.read_roster_upload(uploaded_db)
+                        # Validates the header, schema and integrity before anything else touches it
+                        db.load_db_file_to_session(db_bytes)
+                    except roster_io.MissingPackageError as e:
+                        st.error(str(e))
+                    except ValueError as e:
+                        st.error(f"Uploaded database is invalid: {e}")
                     except Exception as e:
                         st.error(f"Failed to upload database: {e}")
-            elif ext == 'csv':
+                    else:
+                        st.success("Database uploaded and loaded into your session! Reloading...")
+                        st.session_state['db_uploaded'] = True
+                        st.session_state['check_duplicates'] = True
+                        st.rerun()
+            else:
                 try:
                     df = pd.read_csv(uploaded_db)
                     required_cols = ["name", "rank", "primary_champion_1", "primary_champion_2", "primary_champion_3", "notes"]
@@ -146,40 +292,22 @@ def show_player_management():
                     # Create new in-memory db and insert data
                     mem_conn = sqlite3.connect(":memory:")
                     mem_conn.row_factory = sqlite3.Row
-                    mem_conn.execute('''CREATE TABLE players (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL UNIQUE,
-                        rank TEXT NOT NULL,
-                        primary_champion_1 TEXT,
-                        primary_champion_2 TEXT,
-                        primary_champion_3 TEXT,
-                        notes TEXT
-                    )''')
+                    db.create_schema(mem_conn)
                     for _, row in df.iterrows():
                         mem_conn.execute('''INSERT INTO players (name, rank, primary_champion_1, primary_champion_2, primary_champion_3, notes) VALUES (?, ?, ?, ?, ?, ?)''',
                             (row['name'], row['rank'], row['primary_champion_1'], row['primary_champion_2'], row['primary_champion_3'], row['notes']))
                     mem_conn.commit()
-                    # Export to bytes using backup (correct way)
-                    temp_db_path = "temp_uploaded.db"
-                    # Remove temp file if it exists
-                    if os.path.exists(temp_db_path):
-                        os.remove(temp_db_path)
-                    temp_db = sqlite3.connect(temp_db_path)
-                    mem_conn.backup(temp_db)
-                    temp_db.close()
-                    with open(temp_db_path, "rb") as f:
-                        csv_db_bytes = f.read()
-                    os.remove(temp_db_path)
+                    csv_db_bytes = db.connection_to_bytes(mem_conn)
+                    mem_conn.close()
                     import database
                     database.load_db_file_to_session(csv_db_bytes)
                     st.success("CSV uploaded and loaded into your session as a new database! Reloading...")
                     st.session_state['db_uploaded'] = True
+                    st.session_state['check_duplicates'] = True
                     st.rerun()
                 except Exception as e:
                     st.error(f"Failed to process CSV: {e}")
-            else:
-                st.error("Only .db or .csv files are allowed.")
-    if 'db_bytes' not in st.session_state:
+    if not db.has_database():
         st.warning("No player database loaded. Players will not be saved permanently. Upload a .db or .csv file to enable full features.")
         # Show temp_players as a DataFrame
         if st.session_state.temp_players:
@@ -192,17 +320,28 @@ def show_player_management():
     # --- Export DB button and Update Ranks button ---
     col_left, col_right = st.columns([1, 1])
     with col_left:
-        st.download_button(
-            label="Export Current Database (.db)",
-            data=st.session_state['db_bytes'],
-            file_name="exported_lol_custom_organizer.db",
-            mime="application/octet-stream"
-        )
+        show_export()
     with col_right:
-        if st.button("Update Ranks"):
-            update_ranks_from_opgg()
+        rank_job_running = 'rank_job_id' in st.session_state
+        if st.button("Update Ranks", disabled=rank_job_running):
+            start_rank_update()
+    show_duplicate_review()
+    show_undo_redo()
+    if 'rank_update_summary' in st.session_state:
+        level, text = st.session_state.pop('rank_update_summary')
+        getattr(st, level)(text)
+    if 'rank_job_id' in st.session_state:
+        # Where available, the job progress view reruns on its own every second
+        if fragment is not None:
+            fragment(run_every=1)(show_rank_update_job)()
+        else:
+            show_rank_update_job()
 
     players = db.get_all_players()
+    matches = show_player_filter("manage") if players else None
+    if matches is not None:
+        st.caption(f"Showing {len(matches)} of {len(players)} players.")
+        players = [p for p in players if p['id'] in matches]
     
     if players:
         # Create a DataFrame for display
@@ -244,6 +383,8 @@ def show_player_management():
                         st.success(f"Player {row['name']} updated successfully!")
                     else:
                         st.error(f"Failed to update player {row['name']}.")
+    elif matches is not None:
+        st.info("No players match this search.")
     else:
         st.info("No players added yet. Use the form above to add players.") 
 
@@ -271,43 +412,73 @@ def extract_rank_from_soup(soup):
             return text.title()
     return None
 
-def update_ranks_from_opgg():
-    players = db.get_all_players()
-    updated = 0
-    for player in players:
-        opgg_link = player.get('opgg_link')
-        if opgg_link:
+def fetch_rank_updates(job: jobs.Job, players: List[Dict]) -> Dict[int, str]:
+    """Background job: look up each player's rank on OP.GG. Returns {player_id: new_rank}."""
+    updates = {}
+    with requests.Session() as http:
+        http.headers["User-Agent"] = "Mozilla/5.0"
+        for done, player in enumerate(players, start=1):
+            if job.cancelled:
+                break
             try:
-                response = requests.get(opgg_link, headers={"User-Agent": "Mozilla/5.0"})
+                response = http.get(player['opgg_link'], timeout=15)
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.text, 'html.parser')
                     # Use the robust extraction function
                     rank = extract_rank_from_soup(soup)
-                    if rank:
+                    if rank is None:
+                        job.report(message=f"Could not find rank for {player['name']} (check OP.GG link)", level="warning")
+                    elif rank != player['rank']:
                         # Only update if the rank is valid and different
-                        if rank != player['rank']:
-                            db.update_player(
-                                player_id=player['id'],
-                                name=player['name'],
-                                rank=rank,
-                                primary_champion_1=player['primary_champion_1'],
-                                primary_champion_2=player['primary_champion_2'],
-                                primary_champion_3=player['primary_champion_3'],
-                                notes=player['notes'],
-                                opgg_link=player['opgg_link']
-                            )
-                            updated += 1
-                            st.success(f"Updated {player['name']} to {rank}")
-                        else:
-                            st.info(f"No rank change for {player['name']}")
+                        updates[player['id']] = rank
+                        job.report(message=f"{player['name']}: {player['rank']} → {rank}", level="success")
                     else:
-                        st.warning(f"Could not find rank for {player['name']} (check OP.GG link)")
+                        job.report(message=f"No rank change for {player['name']}")
                 else:
-                    st.error(f"Failed to fetch OP.GG for {player['name']} (HTTP {response.status_code})")
+                    job.report(message=f"Failed to fetch OP.GG for {player['name']} (HTTP {response.status_code})", level="error")
             except Exception as e:
-                st.error(f"Error updating {player['name']}: {e}")
-    if updated == 0:
-        st.info("No ranks were updated.")
-    else:
-        st.success(f"Ranks updated for {updated} player(s).")
-        st.rerun()
\ No newline at end of file
+                job.report(message=f"Error updating {player['name']}: {e}", level="error")
+            job.report(done=done)
+    return updates
+
+def start_rank_update():
+    """Start refreshing ranks from OP.GG in the background."""
+    players = [p for p in db.get_all_players() if p.get('opgg_link')]
+    if not players:
+        st.info("No players have an OP.GG link.")
+        return
+    job = jobs.submit("rank_update", fetch_rank_updates, players, total=len(players))
+    st.session_state.rank_job_id = job.id
+
+def show_rank_update_job():
+    """Progress of the running rank update. Commits all rank changes at once when it finishes."""
+    job = jobs.get_job(st.session_state.rank_job_id)
+    if job is None:
+        del st.session_state['rank_job_id']
+        return
+    state = job.snapshot()
+    if job.finished:
+        if state['status'] == jobs.FAILED:
+            summary = ("error", f"Rank update failed: {state['error']}")
+        elif job.result:
+            # Ranks fetched before a cancel are still applied
+            updated = db.update_player_ranks(job.result)
+            summary = ("success", f"Ranks updated for {updated} player(s).")
+        else:
+            summary = ("info", "No ranks were updated.")
+        jobs.forget(job.id)
+        del st.session_state['rank_job_id']
+        st.session_state.rank_update_summary = summary
+        st.rerun()
+
+    total = max(state['total'], 1)
+    st.progress(state['done'] / total, text=f"Updating ranks from OP.GG: {state['done']}/{state['total']} profiles")
+    with st.expander(f"Results so far ({len(state['messages'])})"):
+        for level, text in state['messages']:
+            st.write(("✅ " if level == "success" else "⚠️ " if level in ("warning", "error") else "• ") + text)
+    col1, col2 = st.columns(2)
+    with col1:
+        if fragment is None:
+            st.button("Refresh Progress", key="rank_job_refresh")
+    with col2:
+        st.button("Cancel Rank Update", key="rank_job_cancel", on_click=job.cancel, disabled=job.cancelled)
@@ -0,0 +1,84 @@
+"""Roster search widgets shared by the player management and draft pages."""
+from typing import Dict, List, Optional, Set, Tuple
+
+import streamlit as st
+import database as db
+
+ANY_CHAMPION = "Any champion"
+# Results kept per session for the current database version
+MAX_CACHED_SEARCHES = 32
+
+def _search_cache() -> Dict:
+    """Per-session search results, dropped whenever the database changes."""
+    shared = db.shared_upload_cache()
+    if shared is not None:
+        # Sessions viewing the same unedited upload share its results
+        st.session_state.pop('player_search_cache', None)
+        return shared.setdefault('search', {'version': None, 'results': {}, 'champions': None})
+    version = db.database_version()
+    cache = st.session_state.get('player_search_cache')
+    if cache is None or cache['version'] != version:
+        cache = st.session_state['player_search_cache'] = {'version': version, 'results': {}, 'champions': None}
+    return cache
+
+def champion_options() -> List[str]:
+    """Champions at least one player lists, for the champion filter."""
+    cache = _search_cache()
+    if cache['champions'] is None:
+        cache['champions'] = list(db.get_champion_player_counts())
+    return cache['champions']
+
+def matching_player_ids(text: str, champion: Optional[str]) -> Set[int]:
+    cache = _search_cache()
+    query: Tuple[str, Optional[str]] = (" ".join(text.lower().split()), champion)
+    results = cache['results']
+    if query not in results:
+        if len(results) >= MAX_CACHED_SEARCHES:
+            results.pop(next(iter(results), None), None)
+        results[query] = set(db.search_players(*query))
+    return results[query]
+
+def show_player_filter(key: str) -> Optional[Set[int]]:
+    """Search box over names/notes plus a champion filter.
+
+    Returns the ids of matching players, or None when no filter is set.
+    """
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        text = st.text_input("Search names and notes", key=f"{key}_search_text",
+                             placeholder="e.g. support weekends")
+    with col2:
+        champion = st.selectbox("Plays Champion", [ANY_CHAMPION] + champion_options(), key=f"{key}_search_champion")
+    if champion == ANY_CHAMPION:
+        champion = None
+    if not text.strip() and champion is None:
+        return None
+    return matching_player_ids(text, champion)
+
+def _filter_options(names: List[str], ids, matches: Optional[Set[int]], selected: List[str]) -> List[str]:
+    """Names to offer: the matches, plus anyone already selected."""
+    if matches is None:
+        return names
+    selected = set(selected)
+    return [name for name, player_id in zip(names, ids) if player_id in matches or name in selected]
+
+def _save_selection(key: str):
+    st.session_state[f"{key}_saved"] = st.session_state[key]
+
+def set_selection(key: str, names: List[str]):
+    """Change what the player_multiselect with this key shows on its next run."""
+    st.session_state[f"{key}_saved"] = list(names)
+
+def player_multiselect(label: str, table, matches: Optional[Set[int]], key: str, max_selections: int) -> List[str]:
+    """A player multiselect whose options a search can narrow without losing the current selection."""
+    # Streamlit treats a widget with different options as a new widget, so carry the selection over by hand
+    selected = [name for name in st.session_state.get(f"{key}_saved", []) if name in table.row_of_name]
+    st.session_state[key] = selected
+    return st.multiselect(
+        label,
+        _filter_options(table.names, table.ids, matches, selected),
+        max_selections=max_selections,
+        key=key,
+        on_change=_save_selection,
+        args=(key,)
+    )
@@ -0,0 +1,119 @@
+"""Compact, read-only copy of the roster for the draft pages.
+
+The draft pages only need each player's id, name, rank and champions. They
+share one PlayerTable (rebuilt only when the database changes) and keep
+drafts as short lists of player ids, rather than copying full player dicts
+(notes and links included) into session state at every step. The table is
+column-oriented: ids, rank codes and champion codes live in flat arrays and
+Player records are only built for the rows a page asks for.
+"""
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import streamlit as st
+import database as db
+
+DRAFT_COLUMNS = ('id', 'name', 'rank', 'primary_champion_1', 'primary_champion_2', 'primary_champion_3')
+CHAMPIONS_PER_PLAYER = 3
+
+class Player:
+    """One roster row. Supports player['name'] and player.get(...) like the dicts it replaces."""
+    __slots__ = DRAFT_COLUMNS
+
+    def __init__(self, id: int, name: str, rank: str, champions: Sequence[Optional[str]]):
+        self.id = id
+        self.name = name
+        self.rank = rank
+        self.primary_champion_1, self.primary_champion_2, self.primary_champion_3 = champions
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self) -> str:
+        return f"Player({self.id}, {self.name!r}, {self.rank!r})"
+
+def _code(value: Optional[str], codes: Dict[Optional[str], int], values: List[Optional[str]]) -> int:
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(values)
+        values.append(value)
+    return code
+
+class PlayerTable:
+    """Every player of one version of the database, ordered by id."""
+    __slots__ = ('ids', 'names', 'rank_codes', 'champion_codes', 'rank_names', 'champion_names',
+                 'row_of_name', 'version')
+
+    def __init__(self, rows: Iterable[Sequence], version=None):
+        self.ids = array('q')
+        self.names: List[str] = []
+        self.rank_codes = array('B')
+        self.champion_codes = array('H')
+        # Code -> value; each distinct rank and champion name is stored once
+        self.rank_names: List[str] = []
+        self.champion_names: List[Optional[str]] = [None]
+        rank_lookup: Dict[Optional[str], int] = {}
+        champion_lookup: Dict[Optional[str], int] = {None: 0}
+        for player_id, name, rank, *champions in rows:
+            self.ids.append(player_id)
+            self.names.append(name)
+            self.rank_codes.append(_code(rank, rank_lookup, self.rank_names))
+            self.champion_codes.extend(_code(c or None, champion_lookup, self.champion_names) for c in champions)
+        self.row_of_name: Dict[str, int] = {name: row for row, name in enumerate(self.names)}
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def player(self, row: int) -> Player:
+        start = row * CHAMPIONS_PER_PLAYER
+        champions = [self.champion_names[code] for code in self.champion_codes[start:start + CHAMPIONS_PER_PLAYER]]
+        return Player(self.ids[row], self.names[row], self.rank_names[self.rank_codes[row]], champions)
+
+    def _row_of_id(self, player_id: int) -> Optional[int]:
+        row = bisect_left(self.ids, player_id)
+        return row if row < len(self.ids) and self.ids[row] == player_id else None
+
+    def ids_for_names(self, names: Iterable[str]) -> List[int]:
+        """Ids of the named players, in roster order."""
+        return sorted(self.ids[self.row_of_name[name]] for name in names if name in self.row_of_name)
+
+    def lookup(self, ids: Iterable[int]) -> List[Player]:
+        """The players with the given ids, in order, skipping any deleted since the ids were stored."""
+        rows = (self._row_of_id(player_id) for player_id in ids)
+        return [self.player(row) for row in rows if row is not None]
+
+# Shared rosters are the same data for every session, so they share one table
+_roster_tables: Dict[str, PlayerTable] = {}
+
+def get_player_table() -> PlayerTable:
+    """The player table for this session's database, reloaded only when the database has changed."""
+    version = db.database_version()
+    roster_name = version[0]
+    if roster_name is not None:
+        # Drop the table of any database this session uploaded before opening the roster
+        st.session_state.pop('player_table', None)
+        table = _roster_tables.get(roster_name)
+        if table is None or table.version != version:
+            table = _roster_tables[roster_name] = PlayerTable(db.get_player_rows(DRAFT_COLUMNS), version)
+        return table
+    # An upload nobody has edited yet is shared too (see upload_store.py)
+    cache = db.shared_upload_cache()
+    if cache is not None:
+        st.session_state.pop('player_table', None)
+        table = cache.get('player_table')
+        if table is None:
+            table = cache['player_table'] = PlayerTable(db.get_player_rows(DRAFT_COLUMNS))
+        return table
+    table = st.session_state.get('player_table')
+    if table is None or table.version != version:
+        table = PlayerTable(db.get_player_rows(DRAFT_COLUMNS), version)
+        st.session_state['player_table'] = table
+    return table
@@ -0,0 +1,237 @@
+"""Compressed and columnar roster export/import formats.
+
+Exports stream players from a cursor in batches into a compressor, so no
+format builds the whole roster in memory as Python objects. Imports
+decompress on the fly, cap the decompressed size and validate row by row,
+so a bad file is rejected at the first bad record.
+"""
+import gzip
+import io
+import json
+import sqlite3
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+import database as db
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Formats needing an optional package, with the package to install (both are in requirements.txt)
+OPTIONAL_FORMATS = {".db.zst": "zstandard", ".parquet": "pyarrow"}
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+PARQUET_MAGIC = b"PAR1"
+
+PLAYER_COLUMNS = ('name', 'rank', 'primary_champion_1', 'primary_champion_2',
+                  'primary_champion_3', 'notes', 'opgg_link')
+BATCH_SIZE = 1000
+CHUNK_SIZE = 256 * 1024
+# Cap on the decompressed size of an upload, checked while decompressing
+MAX_UNCOMPRESSED_MB = 100
+
+class MissingPackageError(ValueError):
+    """A file's format needs an optional package that isn't installed on this server."""
+
+    def __init__(self, kind: str, package: str):
+        super().__init__(f"This server can't read {kind} files because the optional '{package}' package "
+                         f"is not installed (pip install {package}).")
+
+# --- Export ---
+
+def export_formats() -> Dict[str, Tuple[str, str]]:
+    """Available export formats: label -> (file extension, mime type)."""
+    formats = {
+        "SQLite database (.db)": (".db", "application/octet-stream"),
+        "Compressed database (.db.gz)": (".db.gz", "application/gzip"),
+    }
+    if zstandard is not None:
+        formats["Compressed database (.db.zst)"] = (".db.zst", "application/zstd")
+    formats["Roster as JSON Lines (.jsonl.gz)"] = (".jsonl.gz", "application/gzip")
+    if pq is not None:
+        formats["Roster as Parquet (.parquet)"] = (".parquet", "application/vnd.apache.parquet")
+    return formats
+
+def unavailable_formats() -> List[str]:
+    """Extensions of the formats this server can't export or read, each with the package it needs."""
+    installed = {"zstandard": zstandard is not None, "pyarrow": pq is not None}
+    return [f"{extension} (needs {package})" for extension, package in OPTIONAL_FORMATS.items()
+            if not installed[package]]
+
+def _select_columns(conn: sqlite3.Connection) -> str:
+    # Databases made by older CSV imports have no opgg_link column
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(players)")}
+    return ", ".join(col if col in existing else f"NULL AS {col}" for col in PLAYER_COLUMNS)
+
+def iter_player_batches(conn: sqlite3.Connection, batch_size: int = BATCH_SIZE) -> Iterator[List[tuple]]:
+    """Yield player rows (in PLAYER_COLUMNS order) a batch at a time."""
+    cursor = conn.execute(f"SELECT {_select_columns(conn)} FROM players ORDER BY id")
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+def _compressor(out: BinaryIO, compression: str):
+    if compression == "gzip":
+        # mtime=0 keeps exports of the same roster byte-identical
+        return gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6, mtime=0)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=10).stream_writer(out, closefd=False)
+    raise ValueError(f"Unknown compression: {compression}")
+
+def write_db_image(db_bytes: bytes, out: BinaryIO, compression: str):
+    view = memoryview(db_bytes)
+    with _compressor(out, compression) as stream:
+        for start in range(0, len(view), CHUNK_SIZE):
+            stream.write(view[start:start + CHUNK_SIZE])
+
+def write_jsonl(conn: sqlite3.Connection, out: BinaryIO):
+    with _compressor(out, "gzip") as stream:
+        for rows in iter_player_batches(conn):
+            stream.write("".join(
+                json.dumps(dict(zip(PLAYER_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows
+            ).encode("utf-8"))
+
+def write_parquet(conn: sqlite3.Connection, out: BinaryIO):
+    schema = pa.schema([(col, pa.string()) for col in PLAYER_COLUMNS])
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for rows in iter_player_batches(conn):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch([pa.array(col, pa.string()) for col in columns], schema=schema))
+
+def export_roster(label: str) -> bytes:
+    """Export the session database in the given format (a key of export_formats())."""
+    extension = export_formats()[label][0]
+    if extension == ".db":
+        return db.get_db_bytes()
+    out = io.BytesIO()
+    if extension == ".db.gz":
+        write_db_image(db.get_db_bytes(), out, "gzip")
+    elif extension == ".db.zst":
+        write_db_image(db.get_db_bytes(), out, "zstd")
+    else:
+        with db._connection() as conn:
+            if extension == ".jsonl.gz":
+                write_jsonl(conn, out)
+            else:
+                write_parquet(conn, out)
+    return out.getvalue()
+
+# --- Import ---
+
+class _LimitedReader(io.RawIOBase):
+    """Reads from a stream, failing once more than `limit` bytes have come out of it."""
+
+    def __init__(self, stream, limit: int):
+        self.stream = stream
+        self.remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(min(len(buffer), self.remaining + 1))
+        if len(data) > self.remaining:
+            raise ValueError(f"Upload is larger than {MAX_UNCOMPRESSED_MB} MB once decompressed.")
+        self.remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+def open_upload(upload: BinaryIO) -> io.BufferedReader:
+    """Wrap an upload in a size-capped stream, decompressing gzip/zstd on the fly."""
+    head = upload.read(4)
+    upload.seek(0)
+    if head.startswith(GZIP_MAGIC):
+        stream = gzip.GzipFile(fileobj=upload, mode="rb")
+    elif head == ZSTD_MAGIC:
+        if zstandard is None:
+            raise MissingPackageError(".zst", "zstandard")
+        stream = zstandard.ZstdDecompressor().stream_reader(upload)
+    else:
+        stream = upload
+    return io.BufferedReader(_LimitedReader(stream, MAX_UNCOMPRESSED_MB * 1024 * 1024), CHUNK_SIZE)
+
+def _clean(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _validated_rows(records: Iterable[Tuple[int, Dict]]) -> Iterator[tuple]:
+    """Check each (row number, record) pair and yield insertable tuples."""
+    for number, record in records:
+        if not isinstance(record, dict):
+            raise ValueError(f"Row {number}: expected an object with player fields.")
+        row = tuple(_clean(record.get(col)) for col in PLAYER_COLUMNS)
+        if row[0] is None:
+            raise ValueError(f"Row {number}: player name is missing.")
+        if row[1] not in db.RANK_VALUES:
+            raise ValueError(f"Row {number}: unknown rank '{row[1]}'.")
+        yield row
+
+def _build_database(rows: Iterator[tuple]) -> bytes:
+    conn = sqlite3.connect(":memory:")
+    try:
+        db.create_schema(conn)
+        placeholders = ", ".join("?" for _ in PLAYER_COLUMNS)
+        insert = f"INSERT INTO players ({', '.join(PLAYER_COLUMNS)}) VALUES ({placeholders})"
+        inserted = 0
+        while True:
+            batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+            if not batch:
+                break
+            try:
+                conn.executemany(insert, batch)
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Duplicate player name in rows {inserted + 1}-{inserted + len(batch)}.")
+            inserted += len(batch)
+        conn.commit()
+        return db.connection_to_bytes(conn)
+    finally:
+        conn.close()
+
+def _jsonl_records(stream: BinaryIO) -> Iterator[Tuple[int, Dict]]:
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Row {number}: invalid JSON ({e.msg}).")
+
+def _parquet_records(data: bytes) -> Iterator[Tuple[int, Dict]]:
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    columns = [col for col in PLAYER_COLUMNS if col in parquet.schema_arrow.names]
+    number = 0
+    for batch in parquet.iter_batches(batch_size=BATCH_SIZE, columns=columns):
+        for record in batch.to_pylist():
+            number += 1
+            yield number, record
+
+def read_roster_upload(upload: BinaryIO) -> bytes:
+    """Turn a .db/.jsonl/.parquet upload (optionally gzip/zstd compressed) into a database image.
+
+    Raises ValueError describing the first problem found.
+    """
+    stream = open_upload(upload)
+    head = stream.peek(len(SQLITE_MAGIC))[:len(SQLITE_MAGIC)]
+    if head.startswith(SQLITE_MAGIC):
+        return stream.read()
+    if head.startswith(PARQUET_MAGIC):
+        if pq is None:
+            raise MissingPackageError("Parquet", "pyarrow")
+        # Parquet keeps its index at the end of the file, so it needs random access
+        return _build_database(_validated_rows(_parquet_records(stream.read())))
+    if head.lstrip().startswith(b"{"):
+        return _build_database(_validated_rows(_jsonl_records(stream)))
+    raise ValueError("Unrecognized file: expected a SQLite database, JSON Lines or Parquet roster.")
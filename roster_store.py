@@ -0,0 +1,110 @@
+"""Server-side roster storage: named SQLite files shared by every session of this server.
+
+Each roster is `<LOL_ROSTER_DIR>/<name>.db`, opened in WAL mode so readers never
+block the organizer's writes (and vice versa). Connections are pooled per roster
+and cached for the life of the process.
+"""
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional
+
+ROSTER_DIR = os.environ.get("LOL_ROSTER_DIR", "rosters")
+ROSTER_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+POOL_SIZE = 8
+
+def enabled() -> bool:
+    """Shared rosters are only offered in the UI when the server opts in with LOL_ROSTER_DIR."""
+    return "LOL_ROSTER_DIR" in os.environ
+
+def roster_path(name: str) -> str:
+    if not ROSTER_NAME_PATTERN.match(name):
+        raise ValueError("Roster names may only contain letters, digits, '_' and '-'.")
+    return os.path.join(ROSTER_DIR, f"{name}.db")
+
+def roster_exists(name: str) -> bool:
+    return os.path.exists(roster_path(name))
+
+def list_rosters() -> List[str]:
+    if not os.path.isdir(ROSTER_DIR):
+        return []
+    return sorted(name[:-3] for name in os.listdir(ROSTER_DIR) if name.endswith(".db"))
+
+class ConnectionPool:
+    """WAL-mode connections to one roster database file.
+
+    Up to `size` idle connections are kept for reuse. Busy periods open extra
+    connections rather than making sessions queue for one, and those are
+    closed again when returned.
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=size)
+        # Never writes, so its data_version changes whenever anyone else commits
+        self._probe = self._connect()
+        self._probe_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: a power loss can only drop the last commits, never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the block."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def data_version(self) -> int:
+        """A number that changes whenever the roster is modified, by any connection or process."""
+        with self._probe_lock:
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name: str, create: bool = False) -> ConnectionPool:
+    """Return the process-wide pool for a roster.
+
+    Raises KeyError if the roster does not exist and create is False.
+    """
+    path = roster_path(name)
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            if not create and not os.path.exists(path):
+                raise KeyError(f"Roster '{name}' not found.")
+            os.makedirs(ROSTER_DIR, exist_ok=True)
+            pool = _pools[name] = ConnectionPool(path)
+    return pool
+
+def create_roster(name: str, db_bytes: Optional[bytes] = None) -> ConnectionPool:
+    """Create a roster, either empty or from an existing database image.
+
+    Raises FileExistsError if a roster with this name already exists.
+    """
+    path = roster_path(name)
+    os.makedirs(ROSTER_DIR, exist_ok=True)
+    # 'x' mode fails if the file exists, so two sessions can't both create the same roster
+    with open(path, "xb") as f:
+        if db_bytes:
+            f.write(db_bytes)
+    return get_pool(name, create=True)
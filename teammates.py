@@ -0,0 +1,92 @@
+"""Remember who has played on a team with whom, so generated teams mix people up.
+
+Each finished draft adds one to a per-pair count in the roster's
+teammate_counts table (only pairs that have actually played together are
+stored). An uploaded database keeps new counts in the session until its next
+edit or export, so finishing a draft doesn't copy a shared upload. Team
+generation loads the counts of the ten selected players as a small matrix
+and scores every possible split at once with NumPy.
+"""
+import itertools
+import random
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import streamlit as st
+import database as db
+
+# Random teams: each earlier game two teammates shared halves the split's chance
+REPEAT_ODDS = 0.5
+# Balanced teams: one earlier game together weighs as much as one rank tier of imbalance
+REPEAT_PENALTY = 1.0
+
+def pair_matrix(player_ids: Sequence[int], rows: Sequence[Tuple[int, int, int]]) -> np.ndarray:
+    """Symmetric matrix of games played together, indexed like player_ids."""
+    ids = np.asarray(player_ids, dtype=np.int64)
+    counts = np.zeros((len(ids), len(ids)), dtype=np.int32)
+    if len(rows):
+        order = np.argsort(ids)
+        a, b, n = np.asarray(rows, dtype=np.int64).T
+        i = order[np.searchsorted(ids, a, sorter=order)]
+        j = order[np.searchsorted(ids, b, sorter=order)]
+        counts[i, j] = n
+        counts[j, i] = n
+    return counts
+
+def teammate_matrix(player_ids: Sequence[int]) -> np.ndarray:
+    return pair_matrix(player_ids, db.get_teammate_counts(player_ids))
+
+@lru_cache(maxsize=16)
+def team_splits(size: int, fixed_a: Tuple[int, ...] = (), fixed_b: Tuple[int, ...] = ()) -> np.ndarray:
+    """Every way to split `size` players into two equal teams, as rows of a bool matrix (True = team A).
+
+    Players at the fixed_a/fixed_b positions always land on team A/B. Without
+    them, player 0 is kept on team A so each split appears once, not mirrored.
+    """
+    if not fixed_a and not fixed_b:
+        fixed_a = (0,)
+    rows = [combo for combo in itertools.combinations(range(size), size // 2)
+            if set(fixed_a) <= set(combo) and not set(fixed_b) & set(combo)]
+    splits = np.zeros((len(rows), size), dtype=bool)
+    for row, combo in enumerate(rows):
+        splits[row, list(combo)] = True
+    splits.flags.writeable = False
+    return splits
+
+def repeat_counts(splits: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """For each split, the games its same-team pairs have already played together."""
+    team_a = splits.astype(np.int64)
+    team_b = 1 - team_a
+    # x·C·x sums both (i, j) and (j, i) for each same-team pair
+    return (np.einsum('ki,ij,kj->k', team_a, counts, team_a)
+            + np.einsum('ki,ij,kj->k', team_b, counts, team_b)) // 2
+
+def pick_split(ranks: Sequence[int], counts: np.ndarray, skill_balancing: bool = False,
+               fixed_a: Tuple[int, ...] = (), fixed_b: Tuple[int, ...] = ()) -> np.ndarray:
+    """Choose a split (bool mask, True = team A) that avoids repeat teammates.
+
+    With skill balancing, the split with the lowest rank difference plus repeat
+    penalty wins (ties broken at random). Otherwise splits are drawn at random,
+    with repeats making a split less likely rather than impossible.
+    """
+    splits = team_splits(len(ranks), fixed_a, fixed_b)
+    repeats = repeat_counts(splits, counts)
+    if skill_balancing:
+        ranks = np.asarray(ranks)
+        imbalance = np.abs(splits @ ranks - ~splits @ ranks)
+        score = imbalance + REPEAT_PENALTY * repeats
+        best = np.flatnonzero(score == score.min())
+        return splits[random.choice(best.tolist())]
+    weights = REPEAT_ODDS ** (repeats - repeats.min())
+    return splits[random.choices(range(len(splits)), weights=weights.tolist())[0]]
+
+def record_teams(key: str, teams: List[List[int]]):
+    """Count a finished draft's teammates once, however often its bans are regenerated.
+
+    `key` is the session entry remembering which teams this page last recorded.
+    """
+    recorded = tuple(tuple(sorted(team)) for team in teams)
+    if st.session_state.get(key) != recorded:
+        db.record_teammates(teams)
+        st.session_state[key] = recorded
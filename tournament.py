@@ -0,0 +1,75 @@
+import streamlit as st
+import database as db
+from lobby_planner import plan_lobbies
+from player_table import get_player_table
+
+def show_tournament_planner():
+    st.title("Tournament Lobby Planner")
+
+    if not db.has_database():
+        st.warning("No player database loaded. Please upload a .db file in the Player Management page to begin.")
+        return
+    table = get_player_table()
+    if not table:
+        st.error("No players available. Please add players in the Player Management page.")
+        return
+
+    # Step 1: Select Players
+    st.header("Step 1: Select Players")
+    select_all = st.checkbox("Select All Players", key="tournament_select_all")
+    selected_names = st.multiselect(
+        "Select Players",
+        table.names,
+        default=table.names if select_all else None,
+        key="tournament_selected_players"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        lobby_size = st.number_input("Players per Lobby", min_value=2, max_value=20, value=10, step=2, key="tournament_lobby_size")
+    with col2:
+        tiered = st.radio(
+            "Lobby Grouping",
+            ["Mixed skill", "Similar skill"],
+            horizontal=True,
+            help="Mixed spreads ranks evenly over lobbies; Similar groups players of close rank together.",
+            key="tournament_grouping"
+        ) == "Similar skill"
+
+    num_lobbies = len(selected_names) // lobby_size
+    benched = len(selected_names) - num_lobbies * lobby_size
+    if num_lobbies == 0:
+        st.warning(f"Select at least {lobby_size} players. Currently selected: {len(selected_names)}")
+        return
+    st.info(f"{len(selected_names)} players selected: {num_lobbies} lobby(s), {benched} player(s) sitting out.")
+
+    # Step 2: Plan Lobbies
+    st.header("Step 2: Plan Lobbies")
+    if st.button("Plan Lobbies", key="tournament_plan_button"):
+        with st.spinner("Balancing lobbies..."):
+            st.session_state.tournament_plan = plan_lobbies(
+                table.lookup(table.ids_for_names(selected_names)),
+                db.get_rank_value,
+                lobby_size=lobby_size,
+                tiered=tiered
+            )
+
+    if 'tournament_plan' not in st.session_state:
+        return
+    lobbies, bench = st.session_state.tournament_plan
+    worst = max(lobby['imbalance'] for lobby in lobbies)
+    st.success(f"Planned {len(lobbies)} lobby(s). Largest team rank difference in any lobby: {worst}")
+    for number, lobby in enumerate(lobbies, start=1):
+        st.subheader(f"Lobby {number}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown(f"**Team A** (rank total {lobby['team_a_total']})")
+            for player in lobby['team_a']:
+                st.write(f"• {player['name']} ({player['rank']})")
+        with col2:
+            st.markdown(f"**Team B** (rank total {lobby['team_b_total']})")
+            for player in lobby['team_b']:
+                st.write(f"• {player['name']} ({player['rank']})")
+    if bench:
+        st.subheader("Sitting Out")
+        for player in bench:
+            st.write(f"• {player['name']} ({player['rank']})")
@@ -0,0 +1,112 @@
+"""Process-wide store of uploaded databases, shared by every session that uploads the same file.
+
+Uploads are keyed by a hash of their bytes, so when a whole community
+uploads the same roster the server holds one copy instead of one per
+session. Sessions hold a small SharedDatabase handle; an upload stays
+referenced while any handle to it is alive (a handle dies with its session,
+or when the session loads something else or first edits the upload and
+switches to a private copy). Unreferenced uploads stay cached for re-uploads
+until the store passes its memory budget, then the least recently used go first.
+"""
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+MEMORY_BUDGET_MB = int(os.environ.get("LOL_UPLOAD_CACHE_MB", "256"))
+
+class SharedDatabase:
+    """A session's read-only reference to one stored upload."""
+    __slots__ = ('digest', '__weakref__')
+
+    def __init__(self, digest: str):
+        self.digest = digest
+
+    def __repr__(self) -> str:
+        return f"SharedDatabase({self.digest[:12]})"
+
+class _Entry:
+    __slots__ = ('data', 'refs', 'cache')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.refs = 0
+        # Data derived from this upload that every session can share, e.g. the player table
+        self.cache: Dict = {}
+
+class UploadStore:
+    def __init__(self, budget_bytes: int = MEMORY_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def add(self, data: bytes, prepare: Optional[Callable[[bytes], bytes]] = None) -> SharedDatabase:
+        """Store `data` (or find the identical upload already stored) and return a new reference to it.
+
+        `prepare` turns a new upload into the image actually stored (e.g. adds
+        missing indexes); it only runs the first time a file is uploaded.
+        """
+        digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+        with self._lock:
+            stored = digest in self._entries
+        # Prepare outside the lock so other sessions aren't held up meanwhile
+        prepared = None if stored else _Entry(prepare(data) if prepare else bytes(data))
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                # Evicted since the check above (rare): prepare it after all
+                entry = prepared or _Entry(prepare(data) if prepare else bytes(data))
+                self._entries[digest] = entry
+                self._size += len(entry.data)
+            entry.refs += 1
+            self._entries.move_to_end(digest)
+            self._evict()
+        handle = SharedDatabase(digest)
+        weakref.finalize(handle, self._release, digest)
+        return handle
+
+    def _entry(self, handle: SharedDatabase) -> _Entry:
+        with self._lock:
+            self._entries.move_to_end(handle.digest)
+            return self._entries[handle.digest]
+
+    def get(self, handle: SharedDatabase) -> bytes:
+        return self._entry(handle).data
+
+    def cache(self, handle: SharedDatabase) -> Dict:
+        return self._entry(handle).cache
+
+    def _release(self, digest: str):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.refs -= 1
+                self._evict()
+
+    def _evict(self):
+        """Drop unreferenced uploads, least recently used first, until the store fits its budget."""
+        for digest in list(self._entries):
+            if self._size <= self.budget_bytes:
+                break
+            entry = self._entries[digest]
+            if entry.refs == 0:
+                del self._entries[digest]
+                self._size -= len(entry.data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'uploads': len(self._entries), 'bytes': self._size,
+                    'references': sum(entry.refs for entry in self._entries.values())}
+
+_store: Optional[UploadStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> UploadStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = UploadStore()
+        return _store